@@ -4,12 +4,9 @@ import os
 import json
 from typing import List, Dict
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
 from pydantic import BaseModel
-import chromadb
-from chromadb.utils import embedding_functions
-from chromadb.config import Settings
 from lib.tooling import tool
+from lib.resources import get_collection, get_embedding_model
 from lib.game_agent import GameAgent
 
 # 🛠 Corrige SQLite no Udacity workspace (ou outros ambientes com pysqlite3)
@@ -22,14 +19,13 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 
-# 🤖 Modelo de embedding local
-modelo_local = SentenceTransformer("all-MiniLM-L6-v2")
+# 🤖 Modelo de embedding local (carregado uma única vez por processo)
+modelo_local = get_embedding_model("all-MiniLM-L6-v2")
 
 @tool(name="retrieve_game", description="Semantic search: Finds most results in the vector DB")
 def retrieve_game(query: str) -> List[Dict]:
     """Search game information from the local vector database."""
-    client = chromadb.PersistentClient(path="chromadb")
-    collection = client.get_or_create_collection(name="udaplay")
+    collection = get_collection("udaplay", server_url="", persist_directory="chromadb")
 
     # Gera embedding manualmente
     query_embedding = modelo_local.encode([query])[0].tolist()
@@ -9,7 +9,7 @@ def main():
     manager = VectorStoreManager(persist_directory="chromadb")
     loader = CorpusLoaderService(manager)
 
-    store = loader.load_games("udaplay", "games")
+    store = loader.sync_games("udaplay", "games")
     manager.persist()
 
     query = "When was Pokémon Gold released?"
@@ -1,11 +1,21 @@
-from typing import TypedDict, List, Optional, Union, TypeVar
+from typing import Any, Callable, Dict, TypedDict, List, Optional, Union, TypeVar
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import nullcontext
+import asyncio
+import contextvars
+import functools
+import hashlib
 import json
+import time
 
-from lib.state_machine import StateMachine, Step, EntryPoint, Termination, Run
-from lib.llm import LLM
+from lib.state_machine import StateMachine, Step, EntryPoint, Termination, Run, RetentionPolicy
+from lib.llm import LLM, stream_tokens
 from lib.messages import AIMessage, UserMessage, SystemMessage, ToolMessage
 from lib.tooling import Tool, ToolCall
 from lib.memory import ShortTermMemory
+from lib.session_store import SessionStore, get_session_store
+from lib.context_window import ContextWindow
+from lib.resources import DEFAULT_TOOL_WORKERS, get_tool_executor, retire_tool_executor
 
 # Define the state schema
 class AgentState(TypedDict):
@@ -14,13 +24,23 @@ class AgentState(TypedDict):
     messages: List[dict]  # List of conversation messages
     current_tool_calls: Optional[List[ToolCall]]  # Current pending tool calls
     total_tokens: int  # Track the cumulative total
+    prompt_tokens: int  # Cumulative prompt part of total_tokens
+    completion_tokens: int  # Cumulative completion part of total_tokens
+    context_tokens_saved: int  # Prompt tokens per call saved by context window compaction
     
 class Agent:
     def __init__(self, 
                  model_name: str,
                  instructions: str, 
                  tools: List[Tool] = None,
-                 temperature: float = 0.7):
+                 temperature: float = 0.7,
+                 retention: Optional[RetentionPolicy] = None,
+                 max_tool_workers: int = DEFAULT_TOOL_WORKERS,
+                 tool_timeout: Optional[float] = 30.0,
+                 context_window: Optional[ContextWindow] = None,
+                 max_session_runs: Optional[int] = None,
+                 session_store: Optional[SessionStore] = None,
+                 agent_id: Optional[str] = None):
         """
         Initialize an Agent
         
@@ -29,16 +49,54 @@ class Agent:
             instructions: System instructions for the agent
             tools: Optional list of tools available to the agent
             temperature: Temperature parameter for LLM (default: 0.7)
+            retention: Snapshot retention for each run (default: keep all).
+                Long-lived sessions can use e.g. `RetentionPolicy.final_only()`
+                to bound memory; evaluations need the full trajectory.
+            max_tool_workers: Size of the thread pool running the tool calls
+                of one LLM turn concurrently (default: 8)
+            tool_timeout: Seconds to wait for a tool call before answering the
+                LLM with a timeout error (default: 30, None waits forever).
+                A tool's own `timeout` takes precedence. A timed-out call keeps
+                running in its thread until it returns; the shared pool is then
+                replaced, so later tool calls never queue behind it.
+            context_window: Optional token budget for the conversation sent to
+                the LLM; older turns are dropped (or summarized) once it is
+                exceeded. Without one the whole session history is resent.
+            max_session_runs: Optional cap on the runs kept per session; the
+                oldest runs are evicted (the next turn only needs the last)
+            session_store: Where session runs are kept; defaults to the store
+                configured by `SESSION_STORE_URL`, else in-process memory.
+                A shared SQLite or Redis store lets any process continue a
+                session.
+            agent_id: Namespace of this agent's sessions in the store. Defaults
+                to a digest of the model and instructions, so agents sharing a
+                store never see each other's sessions, while the same agent
+                running in another process finds its own.
         """
         self.instructions = instructions
         self.tools = tools if tools else []
+        self.tools_by_name: Dict[str, Tool] = {t.name: t for t in self.tools}
+        self.max_tool_workers = max_tool_workers
+        self.tool_timeout = tool_timeout
+        self.context_window = context_window
         self.model_name = model_name
         self.temperature = temperature
+        self.retention = retention
+        self._llm: Optional[LLM] = None
         
         # Initialize memory and state machine
-        self.memory = ShortTermMemory()
+        self.agent_id = agent_id or self._default_agent_id()
+        self.memory = ShortTermMemory(
+            store=session_store or get_session_store(),
+            max_items=max_session_runs,
+            namespace=self.agent_id,
+        )
         self.workflow = self._create_state_machine()
 
+    def _default_agent_id(self) -> str:
+        digest = hashlib.sha256(f"{self.model_name}\0{self.instructions}".encode()).hexdigest()
+        return f"agent-{digest[:16]}"
+
     def _prepare_messages_step(self, state: AgentState) -> AgentState:
         """Step logic: Prepare messages for LLM consumption"""
         messages = state.get("messages", [])
@@ -47,29 +105,38 @@ class Agent:
         if not messages:
             messages = [SystemMessage(content=state["instructions"])]
             
-        # Add the new user message
-        messages.append(UserMessage(content=state["user_query"]))
+        # Add the new user message (a new list: the previous run's history is shared)
+        messages = messages + [UserMessage(content=state["user_query"])]
         
         return {
             "messages": messages,
             "session_id": state["session_id"]
         }
 
-    def _llm_step(self, state: AgentState) -> AgentState:
-        """Step logic: Process the current state through the LLM"""
-        # Initialize LLM
-        llm = LLM(
+    def _create_llm(self) -> LLM:
+        return LLM(
             model=self.model_name,
             temperature=self.temperature,
             tools=self.tools
         )
 
-        response = llm.invoke(state["messages"])
+    @property
+    def llm(self) -> LLM:
+        """The agent's LLM, created on first use and reused by every turn and session"""
+        if self._llm is None:
+            self._llm = self._create_llm()
+        return self._llm
+
+    def _llm_update(self, state: AgentState, response: AIMessage) -> AgentState:
         tool_calls = response.tool_calls if response.tool_calls else None
 
         current_total = state.get("total_tokens", 0)
+        prompt_tokens = state.get("prompt_tokens", 0)
+        completion_tokens = state.get("completion_tokens", 0)
         if response.token_usage:
             current_total += response.token_usage.total_tokens
+            prompt_tokens += response.token_usage.prompt_tokens
+            completion_tokens += response.token_usage.completion_tokens
 
         # Create AI message with content and tool calls
         ai_message = AIMessage(
@@ -82,29 +149,50 @@ class Agent:
             "current_tool_calls": tool_calls,
             "session_id": state["session_id"],
             "total_tokens": current_total,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "context_tokens_saved": state.get("context_tokens_saved", 0),
         }
 
-    def _tool_step(self, state: AgentState) -> AgentState:
-        """Step logic: Execute any pending tool calls"""
-        tool_calls = state["current_tool_calls"] or []
-        tool_messages = []
-        
-        for call in tool_calls:
-            # Access tool call data correctly
-            function_name = call.function.name
-            function_args = json.loads(call.function.arguments)
-            tool_call_id = call.id
-            # Find the matching tool
-            tool = next((t for t in self.tools if t.name == function_name), None)
-            if tool:
-                result = str(tool(**function_args))
-                tool_message = ToolMessage(
-                    content=json.dumps(result), 
-                    tool_call_id=tool_call_id, 
-                    name=function_name, 
-                )
-                tool_messages.append(tool_message)
-        
+    def _compact(self, state: AgentState) -> AgentState:
+        """Fit the conversation into the context window, if one is configured"""
+        if self.context_window is None:
+            return state
+        messages, report = self.context_window.fit(state["messages"])
+        if report is None:
+            return state
+        return {
+            **state,
+            "messages": messages,
+            "context_tokens_saved": state.get("context_tokens_saved", 0) + report.tokens_saved,
+        }
+
+    def _llm_step(self, state: AgentState) -> AgentState:
+        """Step logic: Process the current state through the LLM (streamed when a token callback is set)"""
+        state = self._compact(state)
+        response = self.llm.respond(state["messages"])
+        return self._llm_update(state, response)
+
+    async def _allm_step(self, state: AgentState) -> AgentState:
+        """Async step logic: same as `_llm_step`, awaiting the shared async client"""
+        if self.context_window is not None:
+            # Summarizing may call the LLM synchronously
+            state = await asyncio.to_thread(self._compact, state)
+        response = await self.llm.arespond(state["messages"])
+        return self._llm_update(state, response)
+
+    def _tool_timeout(self, tool: Tool) -> Optional[float]:
+        return tool.timeout if tool.timeout is not None else self.tool_timeout
+
+    @staticmethod
+    def _tool_message(call: ToolCall, result: Any) -> ToolMessage:
+        return ToolMessage(
+            content=json.dumps(str(result)),
+            tool_call_id=call.id,
+            name=call.function.name,
+        )
+
+    def _tool_update(self, state: AgentState, tool_messages: List[ToolMessage]) -> AgentState:
         # Clear tool calls and add results to messages
         return {
             "messages": state["messages"] + tool_messages,
@@ -112,15 +200,92 @@ class Agent:
             "session_id": state["session_id"]
         }
 
+    def _tool_step(self, state: AgentState) -> AgentState:
+        """
+        Step logic: Execute any pending tool calls
+
+        The calls of one turn run concurrently on the shared tool pool, so a
+        turn costs its slowest tool rather than the sum of all of them.
+        Results keep the order of the calls. Unknown tools and calls that
+        exceed their timeout are answered with an error message so that the
+        LLM can recover; exceptions raised by a tool propagate.
+
+        Threads cannot be interrupted, so a timed-out call still occupies its
+        worker. The pool is retired after a timeout, and later calls in the
+        process run on a fresh one instead of waiting behind hung tools.
+        """
+        tool_calls = state["current_tool_calls"] or []
+        results: List[Any] = [None] * len(tool_calls)
+        pending = []
+        started = time.monotonic()
+        executor = None
+        
+        for index, call in enumerate(tool_calls):
+            tool = self.tools_by_name.get(call.function.name)
+            if tool is None:
+                results[index] = f"Error: unknown tool '{call.function.name}'"
+                continue
+            function_args = json.loads(call.function.arguments)
+            if len(tool_calls) == 1 and self._tool_timeout(tool) is None:
+                results[index] = tool(**function_args)
+                continue
+            # Tools run in worker threads under the current tracing/profiling context
+            context = contextvars.copy_context()
+            executor = executor or get_tool_executor(self.max_tool_workers)
+            future = executor.submit(context.run, functools.partial(tool, **function_args))
+            pending.append((index, tool, future))
+
+        timed_out = False
+        for index, tool, future in pending:
+            timeout = self._tool_timeout(tool)
+            try:
+                remaining = None if timeout is None else max(timeout - (time.monotonic() - started), 0)
+                results[index] = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                # Still running: its worker stays busy until the tool returns
+                if not future.cancel():
+                    timed_out = True
+                results[index] = f"Error: tool '{tool.name}' timed out after {timeout}s"
+        if timed_out:
+            retire_tool_executor(executor, self.max_tool_workers)
+
+        return self._tool_update(state, [
+            self._tool_message(call, result) for call, result in zip(tool_calls, results)
+        ])
+
+    async def _atool_step(self, state: AgentState) -> AgentState:
+        """Async step logic: same as `_tool_step`, gathering the calls on the event loop"""
+        tool_calls = state["current_tool_calls"] or []
+        loop = asyncio.get_running_loop()
+        executor = get_tool_executor(self.max_tool_workers)
+
+        async def execute(call: ToolCall) -> Any:
+            tool = self.tools_by_name.get(call.function.name)
+            if tool is None:
+                return f"Error: unknown tool '{call.function.name}'"
+            function_args = json.loads(call.function.arguments)
+            context = contextvars.copy_context()
+            future = loop.run_in_executor(executor, context.run, functools.partial(tool, **function_args))
+            try:
+                return await asyncio.wait_for(future, self._tool_timeout(tool))
+            except asyncio.TimeoutError:
+                retire_tool_executor(executor, self.max_tool_workers)
+                return f"Error: tool '{tool.name}' timed out after {self._tool_timeout(tool)}s"
+
+        results = await asyncio.gather(*(execute(call) for call in tool_calls))
+        return self._tool_update(state, [
+            self._tool_message(call, result) for call, result in zip(tool_calls, results)
+        ])
+
     def _create_state_machine(self) -> StateMachine[AgentState]:
         """Create the internal state machine for the agent"""
-        machine = StateMachine[AgentState](AgentState)
+        machine = StateMachine[AgentState](AgentState, self.retention)
         
         # Create steps
         entry = EntryPoint[AgentState]()
         message_prep = Step[AgentState]("message_prep", self._prepare_messages_step)
-        llm_processor = Step[AgentState]("llm_processor", self._llm_step)
-        tool_executor = Step[AgentState]("tool_executor", self._tool_step)
+        llm_processor = Step[AgentState]("llm_processor", self._llm_step, async_logic=self._allm_step)
+        tool_executor = Step[AgentState]("tool_executor", self._tool_step, async_logic=self._atool_step)
         termination = Termination[AgentState]()
         
         machine.add_steps([entry, message_prep, llm_processor, tool_executor, termination])
@@ -141,45 +306,80 @@ class Agent:
         
         return machine
 
-    def invoke(self, query: str, session_id: Optional[str] = None) -> Run:
-        """
-        Run the agent on a query
-        
-        Args:
-            query: The user's query to process
-            session_id: Optional session identifier (uses "default" if None)
-            
-        Returns:
-            The final run object after processing
-        """
-        session_id = session_id or "default"
-
+    def _initial_state(self, query: str, session_id: str) -> AgentState:
         # Create session if it doesn't exist
         self.memory.create_session(session_id)
 
         # Get previous messages from last run if available
         previous_messages = []
+        tokens_saved = 0
         last_run: Run = self.memory.get_last_object(session_id)
         if last_run:
             last_state = last_run.get_final_state()
             if last_state:
                 previous_messages = last_state["messages"]
+                # Compacted history stays compacted: its savings carry over
+                tokens_saved = last_state.get("context_tokens_saved", 0)
 
-        initial_state: AgentState = {
+        return {
             "user_query": query,
             "instructions": self.instructions,
             "messages": previous_messages,
             "current_tool_calls": None,
             "session_id": session_id,
+            "context_tokens_saved": tokens_saved,
         }
 
-        run_object = self.workflow.run(initial_state)
+    def invoke(self, query: str, session_id: Optional[str] = None,
+               on_token: Optional[Callable[[str], None]] = None) -> Run:
+        """
+        Run the agent on a query
+        
+        Args:
+            query: The user's query to process
+            session_id: Optional session identifier (uses "default" if None)
+            on_token: Optional callback receiving the LLM's text as it streams
+            
+        Returns:
+            The final run object after processing
+        """
+        session_id = session_id or "default"
+        initial_state = self._initial_state(query, session_id)
+
+        with stream_tokens(on_token) if on_token else nullcontext():
+            run_object = self.workflow.run(initial_state)
         
         # Store the complete run object in memory
         self.memory.add(run_object, session_id)
         
         return run_object
 
+    async def ainvoke(self, query: str, session_id: Optional[str] = None,
+                      on_token: Optional[Callable[[str], None]] = None) -> Run:
+        """
+        Asynchronous version of `invoke`
+        
+        LLM calls await the shared async OpenAI client and tools run in the
+        loop's thread pool, so many sessions can be served concurrently from
+        one event loop.
+        
+        Args:
+            query: The user's query to process
+            session_id: Optional session identifier (uses "default" if None)
+            on_token: Optional callback receiving the LLM's text as it streams
+            
+        Returns:
+            The final run object after processing
+        """
+        session_id = session_id or "default"
+        initial_state = self._initial_state(query, session_id)
+
+        with stream_tokens(on_token) if on_token else nullcontext():
+            run_object = await self.workflow.arun(initial_state)
+        self.memory.add(run_object, session_id)
+        
+        return run_object
+
     def get_session_runs(self, session_id: Optional[str] = None) -> List[Run]:
         """Get all Run objects for a session
         
@@ -0,0 +1,170 @@
+"""Token-budgeted conversation windows for long agent sessions.
+
+Every turn of an `Agent` session feeds the whole history back to the LLM, so
+prompt tokens, cost and latency grow linearly with the session. A
+`ContextWindow` keeps the history under a token budget: once it is exceeded,
+the oldest messages are dropped (a tool-calling assistant message and its
+tool results always go together) and, optionally, summarized into a system
+note placed right after the instructions.
+
+Compaction trims down to `target_ratio * max_tokens` rather than to the
+budget itself, so it happens every few turns instead of on every call and
+the unchanged history prefix stays cacheable in between.
+"""
+from typing import Callable, List, Optional, Sequence, Tuple
+from dataclasses import dataclass
+
+from lib.messages import BaseMessage, SystemMessage, ToolMessage, UserMessage
+from lib.tokens import DEFAULT_MODEL, get_token_counter
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+def is_summary(message: BaseMessage) -> bool:
+    return isinstance(message, SystemMessage) and (message.content or "").startswith(SUMMARY_PREFIX)
+
+
+@dataclass
+class CompactionReport:
+    """What one compaction removed from the history"""
+    tokens_before: int
+    tokens_after: int
+    dropped_messages: int
+    summarized: bool
+
+    @property
+    def tokens_saved(self) -> int:
+        """Prompt tokens no longer sent with every following call"""
+        return self.tokens_before - self.tokens_after
+
+
+class LLMSummarizer:
+    """
+    Summarizer for `ContextWindow` that asks an LLM for a compact note.
+
+    Args:
+        llm: LLM used for the summaries (anything with `invoke`)
+        max_words: Length the summary is asked to stay within
+    """
+
+    def __init__(self, llm, max_words: int = 150):
+        self.llm = llm
+        self.max_words = max_words
+
+    def __call__(self, messages: List[BaseMessage]) -> str:
+        transcript = []
+        for message in messages:
+            content = message.content or ""
+            if is_summary(message):
+                content = content[len(SUMMARY_PREFIX):]
+            for call in getattr(message, "tool_calls", None) or []:
+                content += f" [called {call.function.name}({call.function.arguments})]"
+            transcript.append(f"{message.role}: {content}")
+        prompt = (
+            f"Summarize this conversation in at most {self.max_words} words. Keep the facts, "
+            "names, numbers and open questions a later answer may depend on.\n\n"
+            + "\n".join(transcript)
+        )
+        return self.llm.invoke(prompt).content or ""
+
+
+class ContextWindow:
+    """
+    Keeps a conversation under a token budget.
+
+    Args:
+        max_tokens: Budget of the messages sent to the LLM
+        target_ratio: Fraction of the budget a compaction trims down to
+        summarizer: Optional callable turning the dropped messages (preceded
+            by the previous summary note, if any) into summary text. Without
+            it, dropped messages are simply forgotten.
+        model: Model whose tokenizer counts the messages
+        count_tokens: Optional per-message token counter overriding `model`'s
+
+    Example:
+        >>> window = ContextWindow(max_tokens=4000, summarizer=LLMSummarizer(llm))
+        >>> agent = Agent("gpt-4o-mini", instructions, context_window=window)
+    """
+
+    def __init__(self, max_tokens: int,
+                 target_ratio: float = 0.75,
+                 summarizer: Optional[Callable[[List[BaseMessage]], str]] = None,
+                 model: str = DEFAULT_MODEL,
+                 count_tokens: Optional[Callable[[BaseMessage], int]] = None):
+        if not 0 < target_ratio <= 1:
+            raise ValueError("target_ratio must be in (0, 1]")
+        self.max_tokens = max_tokens
+        self.target_ratio = target_ratio
+        self.summarizer = summarizer
+        self.count_tokens = count_tokens or get_token_counter(model).message_tokens
+
+    def count(self, messages: Sequence[BaseMessage]) -> int:
+        return sum(self.count_tokens(m) for m in messages)
+
+    @staticmethod
+    def _units(messages: Sequence[BaseMessage]) -> List[List[BaseMessage]]:
+        """Split messages into droppable units; tool results stay with their call."""
+        units: List[List[BaseMessage]] = []
+        for message in messages:
+            if isinstance(message, ToolMessage) and units:
+                units[-1].append(message)
+            else:
+                units.append([message])
+        return units
+
+    def fit(self, messages: Sequence[BaseMessage]) -> Tuple[List[BaseMessage], Optional[CompactionReport]]:
+        """
+        Return `messages` compacted to the budget, and a report of the
+        compaction (None and the messages unchanged when within budget).
+
+        Leading system instructions and the latest user turn (the user
+        message and everything after it) are always kept.
+        """
+        tokens_before = self.count(messages)
+        if tokens_before <= self.max_tokens:
+            return messages, None
+
+        original, messages = messages, list(messages)
+        start = 0
+        while start < len(messages) and isinstance(messages[start], SystemMessage) and not is_summary(messages[start]):
+            start += 1
+        head = messages[:start]
+        previous_summary = None
+        if start < len(messages) and is_summary(messages[start]):
+            previous_summary = messages[start]
+            start += 1
+
+        last_user = max((i for i in range(start, len(messages)) if isinstance(messages[i], UserMessage)),
+                        default=len(messages))
+        units = self._units(messages[start:last_user])
+        current_turn = messages[last_user:]
+
+        target = int(self.max_tokens * self.target_ratio)
+        fixed = self.count(head) + self.count(current_turn)
+        if previous_summary is not None:
+            fixed += self.count_tokens(previous_summary)
+        unit_tokens = [self.count(unit) for unit in units]
+        kept_tokens = sum(unit_tokens)
+
+        dropped_units = 0
+        while dropped_units < len(units) and fixed + kept_tokens > target:
+            kept_tokens -= unit_tokens[dropped_units]
+            dropped_units += 1
+        dropped = [m for unit in units[:dropped_units] for m in unit]
+        kept = [m for unit in units[dropped_units:] for m in unit]
+        if not dropped:
+            return original, None
+
+        summary = previous_summary
+        if self.summarizer is not None:
+            text = self.summarizer(([previous_summary] if previous_summary else []) + dropped)
+            summary = SystemMessage(content=SUMMARY_PREFIX + text)
+
+        compacted = head + ([summary] if summary is not None else []) + kept + current_turn
+        return compacted, CompactionReport(
+            tokens_before=tokens_before,
+            tokens_after=self.count(compacted),
+            dropped_messages=len(dropped),
+            summarized=self.summarizer is not None,
+        )
+
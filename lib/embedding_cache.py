@@ -0,0 +1,223 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from collections import OrderedDict
+import json
+import os
+import re
+import threading
+import unicodedata
+
+from lib.profiling import timed_operation
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is required by the cache only
+    np = None
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used as cache key: NFKC, case-folded, single-spaced."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip().casefold()
+
+
+class _DiskStore:
+    """
+    Append-only on-disk embedding store for one model.
+
+    Vectors live in a raw float32 file that is memory-mapped for reads, and
+    their keys in a JSON-lines index (`{"k": key, "r": row}`) that is loaded
+    into a dict on open. Both files are only ever appended to, so a crash can
+    at worst lose the last few entries.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._vectors_path = os.path.join(directory, "vectors.f32")
+        self._index_path = os.path.join(directory, "keys.jsonl")
+        self._rows: Dict[str, int] = {}
+        self._dim: Optional[int] = None
+        self._mapped: Optional["np.ndarray"] = None
+
+        meta_path = os.path.join(directory, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                self._dim = json.load(f)["dim"]
+        if os.path.exists(self._index_path) and self._dim:
+            stored_rows = os.path.getsize(self._vectors_path) // (4 * self._dim)
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # torn final line
+                    if entry["r"] < stored_rows:
+                        self._rows[entry["k"]] = entry["r"]
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get(self, key: str) -> Optional["np.ndarray"]:
+        row = self._rows.get(key)
+        if row is None:
+            return None
+        if self._mapped is None or row >= len(self._mapped):
+            rows = os.path.getsize(self._vectors_path) // (4 * self._dim)
+            self._mapped = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self._dim))
+        return np.array(self._mapped[row])
+
+    def put_many(self, items: List[Tuple[str, "np.ndarray"]]):
+        items = [(key, vector) for key, vector in items if key not in self._rows]
+        if not items:
+            return
+        if self._dim is None:
+            self._dim = int(items[0][1].shape[0])
+            with open(os.path.join(self.directory, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump({"dim": self._dim}, f)
+
+        start = os.path.getsize(self._vectors_path) // (4 * self._dim) if os.path.exists(self._vectors_path) else 0
+        with open(self._vectors_path, "ab") as f:
+            np.stack([vector for _, vector in items]).astype(np.float32).tofile(f)
+        with open(self._index_path, "a", encoding="utf-8") as f:
+            for offset, (key, _) in enumerate(items):
+                f.write(json.dumps({"k": key, "r": start + offset}, ensure_ascii=False) + "\n")
+                self._rows[key] = start + offset
+
+
+class EmbeddingCache:
+    """
+    LRU cache of text embeddings keyed by (model name, normalized text).
+
+    The in-memory tier holds at most `max_entries` vectors and evicts the least
+    recently used one first. When `directory` is given, every computed vector
+    is also appended to a per-model on-disk store (memory-mapped float32
+    array plus key index) so that a restarted process starts warm. Lookups
+    are thread-safe.
+
+    Attributes:
+        hits (int): Lookups answered from memory
+        disk_hits (int): Lookups answered from the on-disk store
+        misses (int): Lookups that required model inference
+    """
+
+    def __init__(self, max_entries: int = 10_000, directory: Optional[str] = None):
+        if np is None:  # pragma: no cover - dependency unavailable
+            raise ImportError("numpy package is required for EmbeddingCache")
+        self.max_entries = max_entries
+        self.directory = directory
+        self._entries: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._disk: Dict[str, _DiskStore] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return f"EmbeddingCache(size={len(self)}, hits={self.hits}, disk_hits={self.disk_hits}, misses={self.misses})"
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.disk_hits + self.misses
+        return (self.hits + self.disk_hits) / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
+
+    def clear(self):
+        """Drop the in-memory tier and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def _disk_store(self, model_name: str) -> Optional[_DiskStore]:
+        if not self.directory:
+            return None
+        store = self._disk.get(model_name)
+        if store is None:
+            safe_name = re.sub(r"[^A-Za-z0-9._-]", "_", model_name)
+            store = self._disk[model_name] = _DiskStore(os.path.join(self.directory, safe_name))
+        return store
+
+    def _remember(self, key: Tuple[str, str], vector: "np.ndarray"):
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def embed(self, model_name: str, texts: List[str],
+              encoder: Callable[[List[str]], Any]) -> "np.ndarray":
+        """
+        Return embeddings for `texts`, computing only the ones not cached.
+
+        Missing texts are deduplicated and encoded together in one call to
+        `encoder`, so a batch with several uncached queries still costs a
+        single forward pass.
+        """
+        keys = [(model_name, normalize_text(text)) for text in texts]
+        vectors: List[Optional["np.ndarray"]] = [None] * len(texts)
+        missing: Dict[Tuple[str, str], List[int]] = {}
+
+        with self._lock:
+            disk = self._disk_store(model_name)
+            for i, key in enumerate(keys):
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                elif disk is not None and (vector := disk.get(key[1])) is not None:
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+                else:
+                    if key in missing:
+                        self.hits += 1  # duplicate within the batch, encoded once
+                    else:
+                        self.misses += 1
+                    missing.setdefault(key, []).append(i)
+                    continue
+                vectors[i] = vector
+
+        if missing:
+            first_indices = [indices[0] for indices in missing.values()]
+            computed = np.asarray(encoder([texts[i] for i in first_indices]), dtype=np.float32)
+            with self._lock:
+                for (key, indices), vector in zip(missing.items(), computed):
+                    self._remember(key, vector)
+                    for i in indices:
+                        vectors[i] = vector
+                if disk is not None:
+                    disk.put_many([(key[1], vector) for key, vector in zip(missing, computed)])
+
+        return np.stack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+
+
+class CachedEncoder:
+    """
+    Embedding function that serves repeated texts from an `EmbeddingCache`.
+
+    Wraps any callable mapping a list of texts to embeddings (e.g. a
+    `TextEncoder`) and can be used wherever a query embedding function is
+    expected, such as `VectorStore(..., embedding_function=...)`.
+    """
+
+    def __init__(self, model_name: str, encoder: Callable[[List[str]], Any], cache: EmbeddingCache):
+        self.model_name = model_name
+        self.encoder = encoder
+        self.cache = cache
+
+    def __call__(self, input: List[str]) -> "np.ndarray":
+        with timed_operation("embedding", self.model_name):
+            return self.cache.embed(self.model_name, list(input), self.encoder)
+
+    def __repr__(self) -> str:
+        return f"CachedEncoder('{self.model_name}', {self.cache!r})"
@@ -23,6 +23,7 @@ except ImportError:  # pragma: no cover - fallback when pydantic not installed
 from lib.agents import AgentState
 from lib.state_machine import Run
 from lib.llm import LLM
+from lib.tokens import DEFAULT_MODEL, estimate_cost
 from lib.messages import AIMessage, BaseMessage
 from lib.parsers import PydanticOutputParser
 
@@ -89,9 +90,15 @@ class AgentEvaluator:
                           test_case: TestCase, 
                           agent_response: str,
                           execution_time: float,
-                          total_tokens: int) -> EvaluationResult:
+                          total_tokens: int,
+                          prompt_tokens: Optional[int] = None,
+                          completion_tokens: Optional[int] = None,
+                          model: str = DEFAULT_MODEL) -> EvaluationResult:
         """
         Evaluate the final response from the agent (black box approach)
+
+        The cost estimate uses the prompt/completion split when given, and
+        a blended rate otherwise.
         """
         # Use LLM as judge to evaluate the response
         judge_prompt = f"""
@@ -158,7 +165,7 @@ class AgentEvaluator:
             total_tokens=total_tokens,
             execution_time=execution_time,
             tool_call_latency=0.0,  # Not tracked in final response
-            cost_estimate=self._estimate_cost(total_tokens)
+            cost_estimate=self._estimate_cost(total_tokens, prompt_tokens, completion_tokens, model)
         )
         
         # Calculate overall score
@@ -254,6 +261,14 @@ class AgentEvaluator:
             feedback=feedback
         )
     
+    @staticmethod
+    def _tool_call_latency(run: Run) -> float:
+        """Average measured duration of the run's tool calls, in seconds"""
+        tool_calls = run.profile.tool_calls
+        if not tool_calls:
+            return 0.0
+        return sum(call.duration_ms for call in tool_calls) / len(tool_calls) / 1000
+
     def evaluate_trajectory(self, 
                           test_case: TestCase,
                           run: Run) -> EvaluationResult:
@@ -314,11 +329,13 @@ class AgentEvaluator:
         if run.end_timestamp and run.start_timestamp:
             execution_time = (run.end_timestamp - run.start_timestamp).total_seconds()
         
+        run_cost = self._run_cost(run)
         system_metrics = SystemMetrics(
             total_tokens=total_tokens,
             execution_time=execution_time,
-            tool_call_latency=execution_time / max(len(tool_calls_made), 1),
-            cost_estimate=self._estimate_cost(total_tokens)
+            tool_call_latency=self._tool_call_latency(run),
+            cost_estimate=run_cost if run_cost is not None else self._estimate_cost(
+                total_tokens, final_state.get("prompt_tokens"), final_state.get("completion_tokens"))
         )
         
         # Calculate overall score
@@ -341,13 +358,28 @@ class AgentEvaluator:
             feedback=feedback
         )
     
-    def _estimate_cost(self, total_tokens: int) -> float:
-        """Estimate cost based on token usage (rough estimate for GPT-4o-mini)"""
-        # Rough estimate: $0.15 per 1M input tokens, $0.60 per 1M output tokens
-        # Assuming 50/50 split for simplicity
-        cost_per_token = (0.15 + 0.60) / 2 / 1_000_000
-        return total_tokens * cost_per_token
-    
+    def _estimate_cost(self, total_tokens: int,
+                       prompt_tokens: Optional[int] = None,
+                       completion_tokens: Optional[int] = None,
+                       model: str = DEFAULT_MODEL) -> float:
+        """Estimate cost from the model's price table entry and the prompt/completion split"""
+        if prompt_tokens is None or completion_tokens is None:
+            # Split unknown: price every token at the mean of both rates
+            return estimate_cost(model, total_tokens, total_tokens) / 2
+        return estimate_cost(model, prompt_tokens, completion_tokens)
+
+    @staticmethod
+    def _run_cost(run: Run) -> Optional[float]:
+        """Cost of the LLM calls recorded in the run profile, each priced for its model
+        
+        Calls answered from the response cache never reached the API and cost nothing.
+        """
+        calls = run.profile.llm_calls
+        if not calls:
+            return None
+        return sum(estimate_cost(call.model, call.prompt_tokens, call.completion_tokens)
+                   for call in calls if not call.cached)
+
     def _create_failed_evaluation(self, reason: str) -> EvaluationResult:
         """Create a failed evaluation result"""
         return EvaluationResult(
@@ -1,8 +1,9 @@
 from __future__ import annotations
-from typing import List, Dict, TypedDict, Optional
+from typing import Callable, List, Dict, TypedDict, Optional
+from contextlib import nullcontext
 
-from lib.state_machine import StateMachine, Step, EntryPoint, Termination, Run
-from lib.llm import LLM
+from lib.state_machine import StateMachine, Step, EntryPoint, Termination, Join, Run
+from lib.llm import LLM, stream_tokens
 from lib.messages import SystemMessage, UserMessage
 from lib.game_tools import retrieve_game, evaluate_retrieval, game_web_search, EvaluationReport
 
@@ -16,9 +17,25 @@ class GameAgentState(TypedDict):
 
 
 class GameAgent:
-    def __init__(self):
+    def __init__(self, parallel_web_search: bool = False):
+        """
+        Args:
+            parallel_web_search: Run the Tavily web search concurrently with
+                the vector retrieval instead of only after a negative
+                retrieval evaluation. Saves a network round trip on the
+                critical path at the cost of one web search per question.
+        """
+        self.parallel_web_search = parallel_web_search
+        self._llm: Optional[LLM] = None
         self.workflow = self._create_state_machine()
 
+    @property
+    def llm(self) -> LLM:
+        """Answer-generation LLM, created on first use and shared by all runs"""
+        if self._llm is None:
+            self._llm = LLM(model="gpt-4o-mini")
+        return self._llm
+
     # Step implementations
     def _retrieve(self, state: GameAgentState) -> GameAgentState:
         docs = retrieve_game(state["question"])
@@ -33,24 +50,31 @@ class GameAgent:
         results = game_web_search(state["question"])
         return {"web_results": results}
 
-    def _generate(self, state: GameAgentState) -> GameAgentState:
-        llm = LLM(model="gpt-4o-mini")
+    def _generation_messages(self, state: GameAgentState) -> List:
         context_parts = []
         for d in state.get("retrieved_docs", []):
             context_parts.append(
                 f"[{d.get('Platform')}] {d.get('Name')} ({d.get('YearOfRelease')}) - {d.get('Description')}"
             )
-        for r in state.get("web_results", []):
+        evaluation = state.get("evaluation")
+        web_results = state.get("web_results", []) if not evaluation or not evaluation.useful else []
+        for r in web_results:
             if isinstance(r, dict):
                 context_parts.append(r.get("content") or str(r))
             else:
                 context_parts.append(str(r))
         context = "\n".join(context_parts)
-        messages = [
+        return [
             SystemMessage(content="You are a helpful assistant for video game questions."),
             UserMessage(content=f"Question: {state['question']}\nContext:\n{context}\nAnswer:")
         ]
-        ai_msg = llm.invoke(messages)
+
+    def _generate(self, state: GameAgentState) -> GameAgentState:
+        ai_msg = self.llm.respond(self._generation_messages(state))
+        return {"answer": ai_msg.content}
+
+    async def _agenerate(self, state: GameAgentState) -> GameAgentState:
+        ai_msg = await self.llm.arespond(self._generation_messages(state))
         return {"answer": ai_msg.content}
 
     def _create_state_machine(self) -> StateMachine[GameAgentState]:
@@ -59,9 +83,20 @@ class GameAgent:
         retrieve = Step[GameAgentState]("retrieve", self._retrieve)
         evaluate = Step[GameAgentState]("evaluate", self._evaluate)
         web = Step[GameAgentState]("web_search", self._web_search)
-        generate = Step[GameAgentState]("generate", self._generate)
+        generate = Step[GameAgentState]("generate", self._generate, async_logic=self._agenerate)
         termination = Termination[GameAgentState]()
 
+        if self.parallel_web_search:
+            gather = Join[GameAgentState]("gather")
+            machine.add_steps([entry, retrieve, web, gather, evaluate, generate, termination])
+            machine.connect(entry, [retrieve, web])
+            machine.connect(retrieve, gather)
+            machine.connect(web, gather)
+            machine.connect(gather, evaluate)
+            machine.connect(evaluate, generate)
+            machine.connect(generate, termination)
+            return machine
+
         machine.add_steps([entry, retrieve, evaluate, web, generate, termination])
         machine.connect(entry, retrieve)
         machine.connect(retrieve, evaluate)
@@ -76,19 +111,37 @@ class GameAgent:
         machine.connect(generate, termination)
         return machine
 
-    def invoke(self, question: str) -> Run:
+    def invoke(self, question: str, on_token: Optional[Callable[[str], None]] = None) -> Run:
+        """
+        Answer `question`.
+
+        Args:
+            on_token: Optional callback receiving the answer's text deltas as
+                they are generated, e.g. to render them in a UI
+        """
         initial_state: GameAgentState = {"question": question}
-        run = self.workflow.run(initial_state)
+        with stream_tokens(on_token) if on_token else nullcontext():
+            run = self.workflow.run(initial_state)
         return run
 
+    async def ainvoke(self, question: str, on_token: Optional[Callable[[str], None]] = None) -> Run:
+        """Answer `question` without blocking the event loop (see `StateMachine.arun`)."""
+        initial_state: GameAgentState = {"question": question}
+        with stream_tokens(on_token) if on_token else nullcontext():
+            return await self.workflow.arun(initial_state)
 
-def report_run(run: Run) -> None:
-    print("\n=== RUN REPORT ===")
+
+def format_run(run: Run) -> str:
+    lines = ["=== RUN REPORT ==="]
     for snap in run.snapshots:
-        print(f"Step: {snap.step_id}")
+        lines.append(f"Step: {snap.step_id}")
         for k, v in snap.state_data.items():
-            print(f"  {k}: {v}")
+            lines.append(f"  {k}: {v}")
     final = run.get_final_state()
     if final and final.get("answer"):
-        print("\nAnswer:\n" + final["answer"])
+        lines.append("\nAnswer:\n" + final["answer"])
+    return "\n".join(lines)
+
 
+def report_run(run: Run) -> None:
+    print("\n" + format_run(run))
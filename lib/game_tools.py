@@ -2,8 +2,11 @@ from __future__ import annotations
 import os
 import json
 from typing import List, Dict
-from sentence_transformers import SentenceTransformer
 from lib.tooling import tool
+from lib.resources import get_collection, get_query_encoder
+from lib.tracing import get_tracer
+from lib.profiling import timed_operation
+from lib.vector_db import SearchResults
 
 try:
     from pydantic import BaseModel
@@ -21,68 +24,57 @@ except ImportError:  # pragma: no cover - fallback when pydantic is missing
 
         def dict(self):
             return self.__dict__
-try:
-    import chromadb
-    if not hasattr(chromadb, "PersistentClient"):
-        # Handle case where a local directory named 'chromadb' shadows the
-        # actual package or an outdated version is installed.
-        chromadb = None
-except ImportError:  # pragma: no cover - allow running without chromadb
-    chromadb = None
 
 
-# We expect the vector DB to be persisted in ./chromadb and the collection named 'udaplay'
+# The vector DB is served by the Chroma server at CHROMA_URL and the
+# collection is named 'udaplay'. The client, collection handle and embedding
+# model are process-wide singletons (see lib/resources.py).
+GAMES_COLLECTION = "udaplay"
 
 
+def search_games(queries: List[str], n_results: int = 3) -> List[List[Dict]]:
+    """Search the games collection for several queries in one round trip.
 
+    All queries are embedded in a single forward pass (repeated queries are
+    served from the shared embedding cache) and sent to Chroma as one
+    request. Returns one list of game dicts per query, in input order.
+    """
+    if not queries:
+        return []
 
+    collection = get_collection(GAMES_COLLECTION)
+    query_embeddings = get_query_encoder()(queries)
+
+    # 🔎 Realizar a busca com os embeddings gerados
+    with timed_operation("vector_search", GAMES_COLLECTION):
+        result = collection.query(
+            query_embeddings=query_embeddings,
+            n_results=n_results,
+            include=["documents", "metadatas"]
+        )
+
+    return [
+        [
+            {
+                "Name": hit.metadata.get("Name"),
+                "Platform": hit.metadata.get("Platform"),
+                "YearOfRelease": hit.metadata.get("YearOfRelease"),
+                "Description": hit.metadata.get("Description"),
+            }
+            for hit in results
+        ]
+        for results in SearchResults.from_query_result(list(queries), result)
+    ]
 
-import chromadb
-from chromadb.config import Settings
 
 @tool(name="retrieve_game", description="Semantic search: Finds most results in the vector DB")
 def retrieve_game(query: str) -> List[Dict]:
     """Search game information from the local vector database."""
-    print("🔍 Iniciando busca por:", query)
-
-    # 🔌 Conectar ao ChromaDB
-    server_url = os.getenv("CHROMA_URL", "http://localhost:8000")
-    from urllib.parse import urlparse
-    parsed = urlparse(server_url)
-    host = parsed.hostname or "localhost"
-    port = parsed.port or 8000
-    use_ssl = parsed.scheme == "https"
-
-    chroma_client = chromadb.HttpClient(host=host, port=port, ssl=use_ssl)
-
-    # 🧱 Recuperar a coleção
-    collection = chroma_client.get_or_create_collection(name="udaplay")
-
-    # 🤖 Gerar embedding com modelo local
-    modelo_local = SentenceTransformer("all-MiniLM-L6-v2")
-    query_embedding = modelo_local.encode([query])[0].tolist()
-
-    # 🔎 Realizar a busca com o embedding gerado
-    result = collection.query(
-        query_embeddings=[query_embedding],
-        n_results=3,
-        include=["documents", "metadatas"]
-    )
-
-    documents = result.get("documents", [[]])[0]
-    metadatas = result.get("metadatas", [[]])[0]
-
-    games = []
-    for doc, meta in zip(documents, metadatas):
-        game = {
-            "Name": meta.get("Name"),
-            "Platform": meta.get("Platform"),
-            "YearOfRelease": meta.get("YearOfRelease"),
-            "Description": meta.get("Description"),
-        }
-        games.append(game)
-
-    print(f"✅ Resultados encontrados: {len(games)}")
+    # 🔍 Busca registrada como span (ver lib.tracing) em vez de prints
+    with get_tracer().span("search_games", kind="retrieval", query=query) as span:
+        games = search_games([query])[0]
+        if span is not None:
+            span.set(results=len(games))
     return games
 
 
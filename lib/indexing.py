@@ -0,0 +1,198 @@
+from typing import Any, Dict, Iterator, List, Optional
+from dataclasses import dataclass, field
+import hashlib
+import json
+import os
+import time
+
+from lib.documents import Document
+from lib.loaders import JSONGameLoader
+
+
+@dataclass
+class ManifestEntry:
+    """Fingerprint of one indexed source file."""
+    hash: str
+    mtime_ns: int
+    size: int
+
+
+@dataclass
+class IndexManifest:
+    """
+    Record of which source files are currently indexed in a vector store.
+
+    The manifest maps document IDs to the content hash, modification time and
+    size of the file they were built from. It is tied to one collection
+    through `collection_id`: when the collection is recreated the manifest no
+    longer matches and everything is treated as new.
+
+    Attributes:
+        path (str): JSON file the manifest is persisted to
+        collection_id (Optional[str]): ID of the collection the entries describe
+        entries (Dict[str, ManifestEntry]): Fingerprints keyed by document ID
+    """
+    path: str
+    collection_id: Optional[str] = None
+    entries: Dict[str, ManifestEntry] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: str) -> "IndexManifest":
+        if not os.path.exists(path):
+            return cls(path=path)
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        entries = {
+            doc_id: ManifestEntry(*values)
+            for doc_id, values in data.get("entries", {}).items()
+        }
+        return cls(path=path, collection_id=data.get("collection_id"), entries=entries)
+
+    def save(self):
+        """Atomically write the manifest to `path`."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = {
+            "collection_id": self.collection_id,
+            "entries": {
+                doc_id: [entry.hash, entry.mtime_ns, entry.size]
+                for doc_id, entry in self.entries.items()
+            },
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    def reset(self, collection_id: Optional[str]):
+        self.collection_id = collection_id
+        self.entries = {}
+
+
+@dataclass
+class SyncStats:
+    """Outcome of an incremental re-index."""
+    added: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    skipped: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def changed(self) -> int:
+        return self.added + self.updated + self.deleted
+
+
+def _fingerprint(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()
+
+
+def sync_games(store: Any, directory: str, manifest_path: str,
+               encoder: Optional[Any] = None,
+               encode_batch_size: int = 64,
+               chunk_size: int = 1000,
+               report_progress: bool = True) -> SyncStats:
+    """
+    Bring a vector store in line with a directory of JSON game files.
+
+    Each file is first compared with the manifest by modification time and
+    size; only files whose stat changed are read and hashed, and only files
+    whose content hash changed are embedded and upserted. Documents whose file
+    disappeared are deleted from the store. An unchanged corpus is therefore
+    re-indexed with one `stat` per file and no embedding work at all.
+
+    Unreadable or malformed files are reported and skipped: they are left out
+    of the manifest (so the next sync retries them), and a document indexed
+    from an earlier valid version of the file is kept.
+
+    The manifest is saved only after every write succeeded, so an interrupted
+    sync is simply redone on the next run.
+
+    Args:
+        store (VectorStore): Store to synchronize
+        directory (str): Directory containing one JSON file per game
+        manifest_path (str): Where the manifest for this store is kept
+        encoder (Optional[Any]): SentenceTransformer-compatible model used for
+            embeddings (the collection's embedding function when omitted)
+        encode_batch_size (int): Texts per embedding forward pass
+        chunk_size (int): Documents per upsert request
+        report_progress (bool): Print throughput while upserting
+
+    Returns:
+        SyncStats: Counts of added, updated, deleted, unchanged and skipped documents
+    """
+    started = time.perf_counter()
+    stats = SyncStats()
+    manifest = IndexManifest.load(manifest_path)
+    if manifest.collection_id != store.collection_id:
+        manifest.reset(store.collection_id)
+
+    loader = JSONGameLoader(directory)
+    seen = set()
+    pending: Dict[str, ManifestEntry] = {}
+    refreshed: Dict[str, ManifestEntry] = {}
+
+    def changed_documents() -> Iterator[Document]:
+        for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+            if not entry.is_file() or not entry.name.endswith(".json"):
+                continue
+            doc_id = os.path.splitext(entry.name)[0]
+            seen.add(doc_id)
+
+            st = entry.stat()
+            previous = manifest.entries.get(doc_id)
+            if previous and previous.mtime_ns == st.st_mtime_ns and previous.size == st.st_size:
+                stats.unchanged += 1
+                continue
+
+            try:
+                with open(entry.path, "rb") as f:
+                    raw = f.read()
+            except OSError as e:
+                print(f"Skipping `{entry.name}`: {e}")
+                stats.skipped += 1
+                continue
+            fingerprint = ManifestEntry(_fingerprint(raw), st.st_mtime_ns, st.st_size)
+            if previous and previous.hash == fingerprint.hash:
+                # Touched but not modified: refresh the stat data only.
+                refreshed[doc_id] = fingerprint
+                stats.unchanged += 1
+                continue
+
+            try:
+                document = loader.parse(entry.name, raw)
+            except (ValueError, KeyError) as e:
+                print(f"Skipping `{entry.name}`: {e}")
+                stats.skipped += 1
+                continue
+
+            if previous:
+                stats.updated += 1
+            else:
+                stats.added += 1
+            pending[doc_id] = fingerprint
+            yield document
+
+    store.upsert_stream(
+        changed_documents(),
+        encoder=encoder,
+        encode_batch_size=encode_batch_size,
+        chunk_size=chunk_size,
+        report_progress=report_progress,
+    )
+    manifest.entries.update(refreshed)
+    manifest.entries.update(pending)
+
+    deleted: List[str] = [doc_id for doc_id in manifest.entries if doc_id not in seen]
+    for start in range(0, len(deleted), chunk_size):
+        store.delete(ids=deleted[start:start + chunk_size])
+    for doc_id in deleted:
+        del manifest.entries[doc_id]
+    stats.deleted = len(deleted)
+
+    if stats.changed or refreshed or not os.path.exists(manifest_path):
+        manifest.save()
+    stats.elapsed_seconds = time.perf_counter() - started
+    return stats
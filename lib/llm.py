@@ -1,4 +1,14 @@
-from typing import List, Optional, Dict, Any
+from typing import AsyncIterator, Awaitable, Callable, Iterator, List, Optional, Dict, Any, Tuple
+from collections import OrderedDict
+from contextlib import contextmanager
+import asyncio
+import contextvars
+import inspect
+import os
+import random
+import threading
+import time
+import weakref
 try:
     from pydantic import BaseModel
 except ImportError:  # pragma: no cover - fallback for environments without pydantic
@@ -9,6 +19,12 @@ try:
     from openai import OpenAI
 except Exception:  # pragma: no cover - fallback when openai is unavailable
     OpenAI = None
+
+try:
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient, APIConnectionError
+    import httpx
+except Exception:  # pragma: no cover - async client unavailable
+    AsyncOpenAI = None
 from lib.messages import (
     AnyMessage,
     TokenUsage,
@@ -16,7 +32,99 @@ from lib.messages import (
     BaseMessage,
     UserMessage,
 )
-from lib.tooling import Tool
+from lib.tooling import Tool, ToolCall
+from lib.persistent import PersistentList
+from lib.llm_cache import ResponseCache, get_response_cache
+from lib.resources import registry
+from lib.tracing import get_tracer
+from lib.profiling import record_llm_call
+from lib.tokens import PromptBudgetExceeded, context_window, get_token_counter
+
+
+# Upper bound of concurrent OpenAI requests per event loop
+MAX_IN_FLIGHT = int(os.getenv("OPENAI_MAX_IN_FLIGHT", 16))
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 20.0
+# Conversations whose serialized messages an LLM keeps for incremental payloads
+MESSAGE_CACHE_SIZE = 64
+
+# Receives the text deltas of completions made through `LLM.respond`; see `stream_tokens`
+_token_callback: contextvars.ContextVar[Optional[Callable[[str], None]]] = contextvars.ContextVar(
+    "token_callback", default=None
+)
+
+# Async clients and semaphores are bound to the loop they were created on;
+# entries disappear together with their loop.
+_loop_resources: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+
+
+def get_openai_client(api_key: Optional[str] = None):
+    """Return the shared synchronous OpenAI client for `api_key`."""
+    if OpenAI is None:  # pragma: no cover - openai not installed
+        return None
+    # Keyed on the client class too, so a patched `openai` module gets its own client
+    return registry.get_or_create(
+        ("openai_client", api_key, id(OpenAI)),
+        lambda: OpenAI(api_key=api_key) if api_key else OpenAI(),
+    )
+
+
+def _current_loop_resources() -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    resources = _loop_resources.get(loop)
+    if resources is None:
+        resources = _loop_resources[loop] = {
+            "clients": {},
+            "semaphore": asyncio.Semaphore(MAX_IN_FLIGHT),
+        }
+    return resources
+
+
+def get_async_openai_client(api_key: Optional[str] = None):
+    """
+    Return the AsyncOpenAI client shared by every caller on the running loop.
+
+    The client owns one pooled HTTP transport (keep-alive connections are
+    reused across requests); its built-in retries are disabled because
+    `LLM.ainvoke` retries with jittered backoff itself.
+    """
+    if AsyncOpenAI is None:  # pragma: no cover - openai not installed
+        return None
+    clients = _current_loop_resources()["clients"]
+    client = clients.get(api_key)
+    if client is None:
+        http_client = DefaultAsyncHttpxClient(limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        ))
+        client = clients[api_key] = AsyncOpenAI(api_key=api_key, http_client=http_client, max_retries=0)
+    return client
+
+
+def set_max_in_flight(limit: int):
+    """Change the limit of concurrent requests for the running event loop."""
+    _current_loop_resources()["semaphore"] = asyncio.Semaphore(limit)
+
+
+def _is_retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    return AsyncOpenAI is not None and isinstance(error, APIConnectionError)
+
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), RETRY_MAX_DELAY)
+        except ValueError:
+            pass
+    # Full jitter: spreads retries of many concurrent sessions apart
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
 
 
 class LLM:
@@ -25,30 +133,85 @@ class LLM:
         model: str = "gpt-4o-mini",
         temperature: float = 0.0,
         tools: Optional[List[Tool]] = None,
-        api_key: Optional[str] = None
+        api_key: Optional[str] = None,
+        cache: Optional[ResponseCache] = None,
+        max_retries: int = 3,
+        max_prompt_tokens: Optional[int] = None
     ):
         self.model = model
         self.temperature = temperature
-        if OpenAI is not None:
-            self.client = OpenAI(api_key=api_key) if api_key else OpenAI()
-        else:  # pragma: no cover - openai not installed
-            self.client = None
+        self.api_key = api_key
+        self.max_retries = max_retries
+        # Requests over budget are rejected locally; defaults to the model's context window
+        self.max_prompt_tokens = max_prompt_tokens if max_prompt_tokens is not None else context_window(model)
+        self.token_counter = get_token_counter(model)
+        # Falls back to the shared cache configured through LLM_CACHE_PATH, if any
+        self.cache = cache if cache is not None else get_response_cache()
+        self.client = get_openai_client(api_key)
         self.tools: Dict[str, Tool] = {
             tool.name: tool for tool in (tools or [])
         }
+        self._tool_schemas: Optional[List[Dict[str, Any]]] = None
+        self._tool_tokens: Optional[int] = None
+        # id(PersistentList buffer) -> (buffer, serialized messages); see `_serialize_messages`
+        self._serialized: "OrderedDict[int, Tuple[list, List[Dict]]]" = OrderedDict()
+        self._serialized_lock = threading.Lock()
 
     def register_tool(self, tool: Tool):
         self.tools[tool.name] = tool
+        self._tool_schemas = None
+        self._tool_tokens = None
+
+    @property
+    def tool_schemas(self) -> List[Dict[str, Any]]:
+        """JSON schemas of the registered tools, built once per tool set."""
+        if self._tool_schemas is None:
+            self._tool_schemas = [tool.dict() for tool in self.tools.values()]
+        return self._tool_schemas
+
+    @staticmethod
+    def _serialize(message: Any) -> Dict:
+        if not isinstance(message, BaseMessage):
+            raise ValueError(f"Invalid input type {type(message)}.")
+        return message.dict()
+
+    def _serialize_messages(self, messages: List[BaseMessage]) -> List[Dict]:
+        """
+        Serialize `messages` for the API payload.
+
+        Agent histories are PersistentLists that only ever grow by appending
+        to a shared buffer, so the serialized prefix of a buffer is kept and
+        each turn only serializes the messages added since the previous call.
+        """
+        if not isinstance(messages, PersistentList):
+            return [self._serialize(m) for m in messages]
+
+        buffer = messages._items
+        with self._serialized_lock:
+            entry = self._serialized.get(id(buffer))
+            if entry is not None:
+                self._serialized.move_to_end(id(buffer))
+        serialized = entry[1] if entry is not None else []
+
+        if len(serialized) < len(messages):
+            serialized = serialized + [self._serialize(m) for m in messages[len(serialized):]]
+            with self._serialized_lock:
+                # The entry holds the buffer, so its id cannot be reused meanwhile
+                self._serialized[id(buffer)] = (buffer, serialized)
+                self._serialized.move_to_end(id(buffer))
+                while len(self._serialized) > MESSAGE_CACHE_SIZE:
+                    self._serialized.popitem(last=False)
+        return serialized[:len(messages)]
 
     def _build_payload(self, messages: List[BaseMessage]) -> Dict[str, Any]:
         payload = {
             "model": self.model,
             "temperature": self.temperature,
-            "messages": [m.dict() for m in messages],
+            "messages": self._serialize_messages(messages),
         }
 
         if self.tools:
-            payload["tools"] = [tool.dict() for tool in self.tools.values()]
+            payload["tools"] = self.tool_schemas
             payload["tool_choice"] = "auto"
 
         return payload
@@ -58,24 +221,30 @@ class LLM:
             return [UserMessage(content=input)]
         elif isinstance(input, BaseMessage):
             return [input]
-        elif isinstance(input, list) and all(isinstance(m, BaseMessage) for m in input):
+        elif isinstance(input, (list, PersistentList)):
+            # Message types are checked while serializing
             return input
         else:
             raise ValueError(f"Invalid input type {type(input)}.")
 
-    def invoke(self, 
-               input: str | BaseMessage | List[BaseMessage],
-               response_format: BaseModel = None,) -> AIMessage:
-        if self.client is None:
-            raise RuntimeError("OpenAI client is not available")
+    def count_tokens(self, input: str | BaseMessage | List[BaseMessage]) -> int:
+        """Estimated prompt tokens of `input`, tool definitions included, without calling the API."""
+        if self._tool_tokens is None:
+            self._tool_tokens = self.token_counter.tool_tokens(self.tool_schemas)
+        return self.token_counter.count_messages(self._convert_input(input)) + self._tool_tokens
 
+    def _prepare_payload(self, input: Any, response_format: BaseModel = None) -> Dict[str, Any]:
         messages = self._convert_input(input)
         payload = self._build_payload(messages)
+        if self.max_prompt_tokens is not None:
+            prompt_tokens = self.count_tokens(messages)
+            if prompt_tokens > self.max_prompt_tokens:
+                raise PromptBudgetExceeded(prompt_tokens, self.max_prompt_tokens, self.model)
         if response_format:
             payload.update({"response_format": response_format})
-            response = self.client.beta.chat.completions.parse(**payload)
-        else:
-            response = self.client.chat.completions.create(**payload)
+        return payload
+
+    def _to_message(self, response) -> AIMessage:
         choice = response.choices[0]
         message = choice.message
 
@@ -92,3 +261,359 @@ class LLM:
             tool_calls=getattr(message, "tool_calls", None),
             token_usage=token_usage
         )
+
+    def _record(self, span, message: AIMessage, start: float, cached: bool, ttft_ms: Optional[float] = None):
+        """Report a finished call to the run profile and the active trace span."""
+        usage = message.token_usage
+        record_llm_call(self.model, (time.perf_counter() - start) * 1000, usage, cached, ttft_ms)
+        if span is None:
+            return
+        span.set(
+            cached=cached,
+            prompt_tokens=usage.prompt_tokens if usage else None,
+            completion_tokens=usage.completion_tokens if usage else None,
+            total_tokens=usage.total_tokens if usage else None,
+            tool_calls=len(message.tool_calls or []),
+        )
+        if ttft_ms is not None:
+            span.set(time_to_first_token_ms=ttft_ms)
+
+    def invoke(self, 
+               input: str | BaseMessage | List[BaseMessage],
+               response_format: BaseModel = None,) -> AIMessage:
+        payload = self._prepare_payload(input, response_format)
+        start = time.perf_counter()
+
+        with get_tracer().span("chat.completions", kind="llm", model=self.model) as span:
+            if self.cache is not None:
+                cached = self.cache.get(payload)
+                if cached is not None:
+                    self._record(span, cached, start, cached=True)
+                    return cached
+
+            if self.client is None:
+                raise RuntimeError("OpenAI client is not available")
+
+            if response_format:
+                response = self.client.beta.chat.completions.parse(**payload)
+            else:
+                response = self.client.chat.completions.create(**payload)
+
+            ai_message = self._to_message(response)
+            self._record(span, ai_message, start, cached=False)
+
+        if self.cache is not None:
+            self.cache.put(payload, ai_message)
+        return ai_message
+
+    async def _request_with_retries(self, request: Callable[[], Awaitable[Any]],
+                                    keep_slot: bool = False) -> Any:
+        """
+        Send `request` within the per-loop in-flight limit, retrying transient errors.
+
+        With `keep_slot`, returns `(response, release)` and the slot stays held
+        until `release()` is called, e.g. once a streamed response is consumed.
+        """
+        for attempt in range(self.max_retries + 1):
+            # Only the request itself holds a slot; backoff sleeps do not
+            semaphore = _current_loop_resources()["semaphore"]
+            await semaphore.acquire()
+            try:
+                response = await request()
+            except BaseException as e:
+                semaphore.release()
+                if attempt == self.max_retries or not isinstance(e, Exception) or not _is_retryable(e):
+                    raise
+                error = e
+            else:
+                if keep_slot:
+                    return response, semaphore.release
+                semaphore.release()
+                return response
+            await asyncio.sleep(_retry_delay(error, attempt))
+
+    async def ainvoke(self,
+                      input: str | BaseMessage | List[BaseMessage],
+                      response_format: BaseModel = None,) -> AIMessage:
+        """
+        Asynchronous counterpart of `invoke`.
+
+        Uses the AsyncOpenAI client shared by all callers on the running event
+        loop, waits for a free slot of the per-loop in-flight limit
+        (`OPENAI_MAX_IN_FLIGHT`, see `set_max_in_flight`) and retries rate
+        limits (429), server errors (5xx) and connection failures up to
+        `max_retries` times with jittered exponential backoff.
+        """
+        payload = self._prepare_payload(input, response_format)
+        start = time.perf_counter()
+
+        with get_tracer().span("chat.completions", kind="llm", model=self.model) as span:
+            if self.cache is not None:
+                cached = await asyncio.to_thread(self.cache.get, payload)
+                if cached is not None:
+                    self._record(span, cached, start, cached=True)
+                    return cached
+
+            client = get_async_openai_client(self.api_key)
+            if client is None:
+                raise RuntimeError("OpenAI client is not available")
+
+            if response_format:
+                response = await self._request_with_retries(lambda: client.beta.chat.completions.parse(**payload))
+            else:
+                response = await self._request_with_retries(lambda: client.chat.completions.create(**payload))
+
+            ai_message = self._to_message(response)
+            self._record(span, ai_message, start, cached=False)
+
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put, payload, ai_message)
+        return ai_message
+
+    def _stream_payload(self, input: Any) -> Dict[str, Any]:
+        payload = self._prepare_payload(input)
+        return {**payload, "stream": True, "stream_options": {"include_usage": True}}
+
+    @staticmethod
+    def _cache_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+        # Streamed and regular calls share cache entries
+        return {k: v for k, v in payload.items() if k not in ("stream", "stream_options")}
+
+    def stream(self, input: str | BaseMessage | List[BaseMessage]) -> "ChatStream":
+        """
+        Start a streamed completion.
+
+        The request is sent (or answered from the cache) immediately; iterate
+        the returned `ChatStream` for the text deltas as they arrive. Tool
+        call names and arguments are assembled from their fragments, and
+        `ChatStream.message` holds the complete AIMessage once the stream is
+        exhausted.
+
+        Example:
+            >>> stream = llm.stream("Who developed Gran Turismo?")
+            >>> for text in stream:
+            ...     print(text, end="", flush=True)
+            >>> stream.message.token_usage
+        """
+        payload = self._stream_payload(input)
+        start = time.perf_counter()
+        cached = self.cache.get(self._cache_payload(payload)) if self.cache is not None else None
+        if cached is not None:
+            return ChatStream(self, payload, start, cached=cached)
+
+        if self.client is None:
+            raise RuntimeError("OpenAI client is not available")
+        return ChatStream(self, payload, start, chunks=self.client.chat.completions.create(**payload))
+
+    async def astream(self, input: str | BaseMessage | List[BaseMessage]) -> "AsyncChatStream":
+        """
+        Asynchronous counterpart of `stream`; iterate the result with `async for`.
+
+        The stream holds a slot of the per-loop in-flight limit until it is
+        exhausted, fails or is closed with `aclose()` (or `async with`).
+        """
+        payload = self._stream_payload(input)
+        start = time.perf_counter()
+        cached = None
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, self._cache_payload(payload))
+        if cached is not None:
+            return AsyncChatStream(self, payload, start, cached=cached)
+
+        client = get_async_openai_client(self.api_key)
+        if client is None:
+            raise RuntimeError("OpenAI client is not available")
+        chunks, release = await self._request_with_retries(
+            lambda: client.chat.completions.create(**payload), keep_slot=True)
+        return AsyncChatStream(self, payload, start, chunks=chunks, release=release)
+
+    def _finish_stream(self, stream: "_BaseChatStream"):
+        # The span is emitted once the stream completes, but covers the whole call
+        with get_tracer().span("chat.completions", kind="llm", model=self.model, stream=True) as span:
+            if span is not None:
+                span.start_time -= time.perf_counter() - stream.start
+            self._record(span, stream.message, stream.start, stream.cached, stream.ttft_ms)
+
+    def respond(self, input: str | BaseMessage | List[BaseMessage]) -> AIMessage:
+        """
+        `invoke`, or `stream` to the callback installed with `stream_tokens`.
+
+        Workflow steps call this so that front ends can opt into token
+        streaming without the steps knowing about it.
+        """
+        on_token = _token_callback.get()
+        if on_token is None:
+            return self.invoke(input)
+        stream = self.stream(input)
+        for text in stream:
+            on_token(text)
+        return stream.message
+
+    async def arespond(self, input: str | BaseMessage | List[BaseMessage]) -> AIMessage:
+        """Asynchronous counterpart of `respond`."""
+        on_token = _token_callback.get()
+        if on_token is None:
+            return await self.ainvoke(input)
+        stream = await self.astream(input)
+        async for text in stream:
+            on_token(text)
+        return stream.message
+
+
+@contextmanager
+def stream_tokens(on_token: Callable[[str], None]):
+    """
+    Send the text deltas of every `LLM.respond`/`arespond` call made in the
+    enclosed code (including workflow steps run in worker threads) to
+    `on_token`.
+
+    Example:
+        >>> with stream_tokens(lambda text: print(text, end="")):
+        ...     run = agent.invoke("Who made Mario?")
+    """
+    token = _token_callback.set(on_token)
+    try:
+        yield on_token
+    finally:
+        _token_callback.reset(token)
+
+
+class _BaseChatStream:
+    """Assembles streamed chunks into the final AIMessage."""
+
+    def __init__(self, llm: LLM, payload: Dict[str, Any], start: float,
+                 chunks: Any = None, cached: Optional[AIMessage] = None):
+        self._llm = llm
+        self._payload = payload
+        self._chunks = chunks
+        self.start = start
+        self.cached = cached is not None
+        self.message: Optional[AIMessage] = cached
+        self.ttft_ms: Optional[float] = None
+        self._content: List[str] = []
+        self._tool_calls: Dict[int, Dict[str, Any]] = {}
+        self._usage: Optional[TokenUsage] = None
+
+    @property
+    def content(self) -> str:
+        """Text received so far"""
+        return self.message.content or "" if self.message is not None else "".join(self._content)
+
+    @property
+    def tool_calls(self) -> List[Dict[str, Any]]:
+        """Tool calls received so far; arguments may still be incomplete"""
+        return [self._tool_calls[index] for index in sorted(self._tool_calls)]
+
+    def _add(self, chunk) -> Optional[str]:
+        usage = getattr(chunk, "usage", None)
+        if usage:
+            self._usage = TokenUsage(
+                prompt_tokens=usage.prompt_tokens,
+                completion_tokens=usage.completion_tokens,
+                total_tokens=usage.total_tokens
+            )
+        if not chunk.choices:
+            return None
+
+        delta = chunk.choices[0].delta
+        for call in getattr(delta, "tool_calls", None) or []:
+            entry = self._tool_calls.setdefault(call.index, {
+                "id": None, "type": "function", "function": {"name": "", "arguments": ""}
+            })
+            if call.id:
+                entry["id"] = call.id
+            if call.function is not None:
+                entry["function"]["name"] += call.function.name or ""
+                entry["function"]["arguments"] += call.function.arguments or ""
+
+        text = getattr(delta, "content", None)
+        if text:
+            if self.ttft_ms is None:
+                self.ttft_ms = (time.perf_counter() - self.start) * 1000
+            self._content.append(text)
+        return text or None
+
+    def _complete(self) -> AIMessage:
+        tool_calls = self.tool_calls
+        if tool_calls and hasattr(ToolCall, "model_validate"):
+            tool_calls = [ToolCall.model_validate(call) for call in tool_calls]
+        self.message = AIMessage(
+            content="".join(self._content) or None,
+            tool_calls=tool_calls or None,
+            token_usage=self._usage,
+        )
+        self._llm._finish_stream(self)
+        return self.message
+
+
+class ChatStream(_BaseChatStream):
+    """Iterator over the text deltas of `LLM.stream`"""
+
+    def __iter__(self) -> Iterator[str]:
+        if self.cached:
+            if self.message.content:
+                yield self.message.content
+            self._llm._finish_stream(self)
+            return
+
+        for chunk in self._chunks:
+            text = self._add(chunk)
+            if text:
+                yield text
+        message = self._complete()
+        if self._llm.cache is not None:
+            self._llm.cache.put(self._llm._cache_payload(self._payload), message)
+
+
+class AsyncChatStream(_BaseChatStream):
+    """Async iterator over the text deltas of `LLM.astream`
+
+    Holds an in-flight slot until exhausted or closed; use `aclose()` (or
+    `async with`) when abandoning a stream early.
+    """
+
+    def __init__(self, llm: LLM, payload: Dict[str, Any], start: float,
+                 chunks: Any = None, cached: Optional[AIMessage] = None,
+                 release: Optional[Callable[[], None]] = None):
+        super().__init__(llm, payload, start, chunks, cached)
+        self._release = release
+
+    def _release_slot(self):
+        release, self._release = self._release, None
+        if release is not None:
+            release()
+
+    async def aclose(self):
+        """Stop receiving the response and free its in-flight slot."""
+        try:
+            close = getattr(self._chunks, "aclose", None) or getattr(self._chunks, "close", None)
+            if close is not None:
+                result = close()
+                if inspect.isawaitable(result):
+                    await result
+        finally:
+            self._release_slot()
+
+    async def __aenter__(self) -> "AsyncChatStream":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        if self.cached:
+            if self.message.content:
+                yield self.message.content
+            self._llm._finish_stream(self)
+            return
+
+        try:
+            async for chunk in self._chunks:
+                text = self._add(chunk)
+                if text:
+                    yield text
+        finally:
+            self._release_slot()
+        message = self._complete()
+        if self._llm.cache is not None:
+            await asyncio.to_thread(self._llm.cache.put, self._llm._cache_payload(self._payload), message)
@@ -0,0 +1,277 @@
+"""SQLite-backed response cache for `LLM.invoke`.
+
+Regression runs and evaluations send the same prompts over and over; caching
+the responses makes those repeats free and instantaneous. Requests are keyed
+by the SHA-256 of their canonical JSON payload (model, temperature, messages,
+tools, response format). Optionally, a request that misses the exact key can
+be answered by a previous request with the same settings whose prompt is a
+near duplicate, measured by cosine similarity of prompt embeddings.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - only needed for semantic lookups
+    np = None
+
+from lib.messages import AIMessage, TokenUsage
+from lib.resources import get_query_encoder, registry
+from lib.tooling import ToolCall
+
+
+def _to_jsonable(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if isinstance(value, type):
+        # Structured output classes: key on their schema, not their identity
+        schema = value.model_json_schema() if hasattr(value, "model_json_schema") else None
+        return {"class": f"{value.__module__}.{value.__qualname__}", "schema": schema}
+    if hasattr(value, "__dict__"):
+        return value.__dict__
+    return str(value)
+
+
+def _canonical(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, default=_to_jsonable, ensure_ascii=False)
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def payload_key(payload: Dict[str, Any]) -> str:
+    """Exact-match cache key of a chat completion payload."""
+    return _sha256(_canonical(payload))
+
+
+def _scope_key(payload: Dict[str, Any]) -> str:
+    """Key of everything but the messages; semantic hits must share it."""
+    return _sha256(_canonical({k: v for k, v in payload.items() if k != "messages"}))
+
+
+def prompt_text(payload: Dict[str, Any]) -> str:
+    """Flatten the payload messages into the text that gets embedded."""
+    return "\n".join(
+        f"{message.get('role')}: {message.get('content') or ''}"
+        for message in payload.get("messages", [])
+    )
+
+
+def _dump_message(message: AIMessage) -> str:
+    tool_calls = message.tool_calls
+    return json.dumps({
+        "content": message.content,
+        "tool_calls": [_to_jsonable(call) for call in tool_calls] if tool_calls else None,
+        "token_usage": _to_jsonable(message.token_usage) if message.token_usage else None,
+    })
+
+
+def _load_message(raw: str) -> AIMessage:
+    data = json.loads(raw)
+    tool_calls = data.get("tool_calls")
+    if tool_calls and hasattr(ToolCall, "model_validate"):
+        tool_calls = [ToolCall.model_validate(call) for call in tool_calls]
+    token_usage = data.get("token_usage")
+    return AIMessage(
+        content=data.get("content"),
+        tool_calls=tool_calls,
+        token_usage=TokenUsage(**token_usage) if token_usage else None,
+    )
+
+
+class ResponseCache:
+    """
+    Size-bounded, TTL-aware cache of LLM responses stored in SQLite.
+
+    Entries are evicted least-recently-used first once `max_entries` is
+    exceeded, and ignored (then deleted) once older than `ttl_seconds`.
+    Semantic lookups are disabled unless `semantic_threshold` is set; they
+    embed the flattened prompt with `encoder` and return the most similar
+    cached response for the same model/tools/settings if its cosine
+    similarity reaches the threshold.
+
+    Cached responses keep the token usage of the original call, so cost and
+    token metrics stay comparable between cold and warm runs.
+
+    Attributes:
+        hits (int): Exact-match hits
+        semantic_hits (int): Near-duplicate hits
+        misses (int): Lookups that fell through to the API
+
+    Example:
+        >>> cache = ResponseCache(".llm_cache.sqlite", ttl_seconds=86400)
+        >>> llm = LLM(model="gpt-4o-mini", cache=cache)
+        >>> llm.invoke("Who developed Gran Turismo?")  # API call
+        >>> llm.invoke("Who developed Gran Turismo?")  # served from the cache
+    """
+
+    def __init__(self, path: str = ":memory:",
+                 ttl_seconds: Optional[float] = None,
+                 max_entries: int = 10_000,
+                 semantic_threshold: Optional[float] = None,
+                 encoder: Optional[Callable[[List[str]], Any]] = None):
+        if semantic_threshold is not None and np is None:  # pragma: no cover - dependency unavailable
+            raise ImportError("numpy package is required for semantic lookups")
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.semantic_threshold = semantic_threshold
+        self._encoder = encoder
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                scope TEXT NOT NULL,
+                embedding BLOB,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_scope ON responses (scope);
+            CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at);
+        """)
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def __repr__(self) -> str:
+        return (f"ResponseCache(path='{self.path}', hits={self.hits}, "
+                f"semantic_hits={self.semantic_hits}, misses={self.misses})")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self),
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+        }
+
+    def _embed(self, text: str) -> "np.ndarray":
+        if self._encoder is None:
+            self._encoder = get_query_encoder()
+        vector = np.asarray(self._encoder([text]), dtype=np.float32)[0]
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def _expired_before(self) -> float:
+        return time.time() - self.ttl_seconds if self.ttl_seconds is not None else float("-inf")
+
+    def _touch(self, key: str):
+        self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        self._conn.commit()
+
+    def _semantic_match(self, scope: str, vector: "np.ndarray") -> Optional[Tuple[str, str]]:
+        rows = self._conn.execute(
+            "SELECT key, embedding, response FROM responses "
+            "WHERE scope = ? AND embedding IS NOT NULL AND created_at >= ?",
+            (scope, self._expired_before()),
+        ).fetchall()
+        if not rows:
+            return None
+        matrix = np.frombuffer(b"".join(row[1] for row in rows), dtype=np.float32).reshape(len(rows), -1)
+        similarities = matrix @ vector
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.semantic_threshold:
+            return None
+        return rows[best][0], rows[best][2]
+
+    def get(self, payload: Dict[str, Any]) -> Optional[AIMessage]:
+        """Return the cached response for `payload`, or None on a miss."""
+        key = payload_key(payload)
+        vector = None
+        if self.semantic_threshold is not None:
+            vector = self._embed(prompt_text(payload))
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[1] < self._expired_before():
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if row is not None:
+                self._touch(key)
+                self.hits += 1
+                return _load_message(row[0])
+
+            if vector is not None:
+                match = self._semantic_match(_scope_key(payload), vector)
+                if match is not None:
+                    self._touch(match[0])
+                    self.semantic_hits += 1
+                    return _load_message(match[1])
+
+            self.misses += 1
+            return None
+
+    def put(self, payload: Dict[str, Any], message: AIMessage):
+        """Store the response for `payload`, evicting old entries if needed."""
+        embedding = None
+        if self.semantic_threshold is not None:
+            embedding = self._embed(prompt_text(payload)).tobytes()
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (payload_key(payload), _scope_key(payload), embedding, _dump_message(message), now, now),
+            )
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (self._expired_before(),))
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self.hits = self.semantic_hits = self.misses = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_response_cache(path: Optional[str] = None) -> Optional[ResponseCache]:
+    """
+    Return the shared response cache stored at `path`.
+
+    Defaults to the `LLM_CACHE_PATH` environment variable; returns None when
+    neither is set, i.e. caching is opt-in. `LLM_CACHE_TTL` (seconds) and
+    `LLM_CACHE_SEMANTIC_THRESHOLD` configure the shared instance.
+    """
+    path = path or os.getenv("LLM_CACHE_PATH")
+    if not path:
+        return None
+
+    def factory():
+        ttl = os.getenv("LLM_CACHE_TTL")
+        threshold = os.getenv("LLM_CACHE_SEMANTIC_THRESHOLD")
+        return ResponseCache(
+            path,
+            ttl_seconds=float(ttl) if ttl else None,
+            semantic_threshold=float(threshold) if threshold else None,
+        )
+
+    return registry.get_or_create(("response_cache", os.path.abspath(path)), factory)
@@ -1,7 +1,10 @@
-from typing import List
+from typing import Iterator, List
 import os
 import json
-import pdfplumber
+try:
+    import pdfplumber
+except ImportError:  # pragma: no cover - PDF loading is optional
+    pdfplumber = None
 from lib.documents import Corpus, Document
 
 
@@ -30,6 +33,8 @@ class PDFLoader:
         self.pdf_path = pdf_path
 
     def load(self) -> Document:
+        if pdfplumber is None:  # pragma: no cover - dependency unavailable
+            raise ImportError("pdfplumber package is required to load PDFs")
         corpus = Corpus()
 
         with pdfplumber.open(self.pdf_path) as pdf:
@@ -52,24 +57,48 @@ class JSONGameLoader:
         self.directory = directory
 
     def load(self) -> Corpus:
-        corpus = Corpus()
-        for file_name in sorted(os.listdir(self.directory)):
-            if not file_name.endswith('.json'):
-                continue
+        return Corpus(list(self.iter_documents()))
 
-            file_path = os.path.join(self.directory, file_name)
-            with open(file_path, 'r', encoding='utf-8') as f:
-                game = json.load(f)
+    def iter_documents(self, skip_invalid: bool = False) -> Iterator[Document]:
+        """
+        Lazily yield one Document per JSON file, sorted by file name.
 
-            content = f"[{game['Platform']}] {game['Name']} ({game['YearOfRelease']}) - {game['Description']}"
-            doc_id = os.path.splitext(file_name)[0]
+        Only the file names are listed up front; each file is opened and parsed
+        when its document is requested, so memory use does not depend on the
+        size of the directory's contents.
 
-            corpus.append(
-                Document(
-                    id=doc_id,
-                    content=content,
-                    metadata=game
-                )
-            )
+        Args:
+            skip_invalid (bool): Report and skip unreadable or incomplete files
+                instead of raising.
+        """
+        file_names = sorted(
+            entry.name for entry in os.scandir(self.directory)
+            if entry.is_file() and entry.name.endswith('.json')
+        )
+        for file_name in file_names:
+            try:
+                yield self.load_file(file_name)
+            except (OSError, ValueError, KeyError) as e:
+                if not skip_invalid:
+                    raise
+                print(f"Skipping `{file_name}`: {e}")
 
-        return corpus
+    def load_file(self, file_name: str) -> Document:
+        file_path = os.path.join(self.directory, file_name)
+        with open(file_path, 'rb') as f:
+            return self.parse(file_name, f.read())
+
+    def parse(self, file_name: str, raw: bytes) -> Document:
+        """Build the Document for `file_name` from its raw JSON bytes."""
+        game = json.loads(raw.decode('utf-8'))
+        if not isinstance(game, dict):
+            raise ValueError(f"expected a JSON object, got {type(game).__name__}")
+
+        content = f"[{game['Platform']}] {game['Name']} ({game['YearOfRelease']}) - {game['Description']}"
+        doc_id = os.path.splitext(file_name)[0]
+
+        return Document(
+            id=doc_id,
+            content=content,
+            metadata=game
+        )
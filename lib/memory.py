@@ -1,10 +1,22 @@
-from typing import Any, Dict, List, Optional
-from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from dataclasses import dataclass, field, replace
 from datetime import datetime, timedelta
-import copy
+import logging
+import queue
+import threading
+import time
+import weakref
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - only needed for reranked searches
+    np = None
 
 from lib.documents import Document, Corpus
-from lib.vector_db import VectorStoreManager,QueryResult
+from lib.vector_db import VectorStoreManager, SearchResults
+from lib.session_store import InMemorySessionStore, SessionStore
+
+logger = logging.getLogger(__name__)
 
 
 class SessionNotFoundError(Exception):
@@ -14,33 +26,75 @@ class SessionNotFoundError(Exception):
 
 @dataclass
 class ShortTermMemory():
-    """Manage the history of objects across multiple sessions"""
-    sessions: Dict[str, List[Any]] = field(default_factory=lambda: {})
+    """Manage the history of objects across multiple sessions
+
+    Sessions live in a pluggable `SessionStore`: in-process by default, or a
+    SQLite/Redis store shared by several processes (see
+    `lib.session_store.get_session_store`). The in-process store keeps
+    objects as they are, not copied: they are shared with the caller and
+    every reader, so treat them as read-only (completed `Run`s are).
+    `get_last_object` reads only the newest object, however long the
+    session grows. When a session reaches its size cap, adding an object
+    evicts the oldest one.
+
+    Objects leaving the memory (evicted by a cap, reset or deleted with their
+    session) are released: their `close()` method, if any, is called, e.g.
+    to delete a `Run`'s spilled snapshot log.
+
+    Memories sharing a store keep their sessions apart with a `namespace`:
+    session "default" of namespace "pirate" is stored as "pirate/default".
+
+    Attributes:
+        store: Session storage backend (default: in-process)
+        max_items: Default cap on the objects kept per session (None: unbounded)
+        namespace: Prefix of this memory's sessions in the store (None: no prefix)
+    """
+    store: Optional[SessionStore] = None
+    max_items: Optional[int] = None
+    namespace: Optional[str] = None
 
     def __post_init__(self):
-        """Initialize the default session"""
+        """Initialize the store and the default session"""
+        if self.store is None:
+            self.store = InMemorySessionStore()
         self.create_session("default")
 
     def __str__(self) -> str:
-        session_ids = list(self.sessions.keys())
+        session_ids = self.get_all_sessions()
         return f"Memory(sessions={session_ids})"
 
     def __repr__(self) -> str:
         return self.__str__()
 
-    def create_session(self, session_id: str) -> bool:
+    def _key(self, session_id: str) -> str:
+        """Store key of a session"""
+        return f"{self.namespace}/{session_id}" if self.namespace else session_id
+
+    def create_session(self, session_id: str, max_items: Optional[int] = None) -> bool:
         """Create a new session
         
         Args:
             session_id: Unique identifier for the session
+            max_items: Cap on the objects kept in this session (defaults to
+                the memory's `max_items`). A cap also applies to an existing
+                session, evicting its oldest objects beyond it.
             
         Returns:
             bool: True if session was created, False if it already existed
         """
-        if session_id in self.sessions:
-            return False
-        self.sessions[session_id] = []
-        return True
+        max_items = max_items if max_items is not None else self.max_items
+        created = self.store.create_session(self._key(session_id), max_items)
+        if not created and max_items is not None:
+            self._release(self.store.set_max_items(self._key(session_id), max_items))
+        return created
+
+    @staticmethod
+    def _release(objects: Iterable[Any]):
+        """Let objects leaving the memory free their resources"""
+        for obj in objects:
+            close = getattr(obj, "close", None)
+            if callable(close):
+                close()
 
     def delete_session(self, session_id: str) -> bool:
         """Delete a session
@@ -56,10 +110,9 @@ class ShortTermMemory():
         """
         if session_id == "default":
             raise ValueError("Cannot delete the default session")
-        if session_id not in self.sessions:
-            return False
-        del self.sessions[session_id]
-        return True
+        if self.store.has_session(self._key(session_id)):
+            self._release(self.store.iter_objects(self._key(session_id)))
+        return self.store.delete_session(self._key(session_id))
 
     def _validate_session(self, session_id: str):
         """Validate that a session exists
@@ -70,12 +123,14 @@ class ShortTermMemory():
         Raises:
             SessionNotFoundError: If session doesn't exist
         """
-        if session_id not in self.sessions:
+        if not self.store.has_session(self._key(session_id)):
             raise SessionNotFoundError(f"Session '{session_id}' not found")
 
     def add(self, object: Any, session_id: Optional[str] = None):
         """Add a new object to the history
         
+        Once the session is full, the oldest object is evicted.
+        
         Args:
             object: Object to add to history
             session_id: Optional session ID to add to (uses default if None)
@@ -85,7 +140,7 @@ class ShortTermMemory():
         """
         session_id = session_id or "default"
         self._validate_session(session_id)
-        self.sessions[session_id].append(copy.deepcopy(object))
+        self._release(self.store.append(self._key(session_id), object))
 
     def get_all_objects(self, session_id: Optional[str] = None) -> List[Any]:
         """Get all objects for a session
@@ -94,17 +149,30 @@ class ShortTermMemory():
             session_id: Optional session ID (uses default if None)
             
         Returns:
-            List of objects in the session
+            New list of the (read-only) objects in the session
             
         Raises:
             SessionNotFoundError: If specified session doesn't exist
         """
         session_id = session_id or "default"
         self._validate_session(session_id)
-        return [copy.deepcopy(obj) for obj in self.sessions[session_id]]
+        return self.store.all(self._key(session_id))
+
+    def iter_objects(self, session_id: Optional[str] = None) -> Iterator[Any]:
+        """Iterate over the objects of a session, oldest first, loading them lazily
+        
+        Args:
+            session_id: Optional session ID (uses default if None)
+            
+        Raises:
+            SessionNotFoundError: If specified session doesn't exist
+        """
+        session_id = session_id or "default"
+        self._validate_session(session_id)
+        return self.store.iter_objects(self._key(session_id))
 
     def get_last_object(self, session_id: Optional[str] = None) -> Optional[Any]:
-        """Get the most recent object for a session
+        """Get the most recent object for a session without loading the others
         
         Args:
             session_id: Optional session ID (uses default if None)
@@ -115,12 +183,16 @@ class ShortTermMemory():
         Raises:
             SessionNotFoundError: If specified session doesn't exist
         """
-        objects = self.get_all_objects(session_id)
-        return objects[-1] if objects else None
+        session_id = session_id or "default"
+        self._validate_session(session_id)
+        return self.store.last(self._key(session_id))
 
     def get_all_sessions(self) -> List[str]:
         """Get all session IDs"""
-        return list(self.sessions.keys())
+        if not self.namespace:
+            return self.store.session_ids()
+        prefix = f"{self.namespace}/"
+        return [sid[len(prefix):] for sid in self.store.session_ids() if sid.startswith(prefix)]
 
     def reset(self, session_id: Optional[str] = None):
         """Reset memory for a specific session or all sessions
@@ -132,12 +204,14 @@ class ShortTermMemory():
             SessionNotFoundError: If specified session doesn't exist
         """
         if session_id is None:
-            # Reset all sessions to empty lists
-            for sid in self.sessions:
-                self.sessions[sid] = []
+            # Empty every session, keeping their caps
+            for sid in self.get_all_sessions():
+                self._release(self.store.iter_objects(self._key(sid)))
+                self.store.clear(self._key(sid))
         else:
             self._validate_session(session_id)
-            self.sessions[session_id] = []
+            self._release(self.store.iter_objects(self._key(session_id)))
+            self.store.clear(self._key(session_id))
 
     def pop(self, session_id: Optional[str] = None) -> Optional[Any]:
         """Remove and return the last object from a session
@@ -153,10 +227,7 @@ class ShortTermMemory():
         """
         session_id = session_id or "default"
         self._validate_session(session_id)
-        
-        if not self.sessions[session_id]:
-            return None
-        return self.sessions[session_id].pop()
+        return self.store.pop(self._key(session_id))
 
 @dataclass
 class MemoryFragment:
@@ -193,6 +264,34 @@ class MemorySearchResult:
     fragments: List[MemoryFragment]
     metadata: Dict
 
+@dataclass
+class MemoryStats:
+    """
+    Number of memories of one owner in one namespace, and their time range.
+    
+    Attributes:
+        count (int): Number of memory fragments
+        first_timestamp (int, optional): Unix timestamp of the oldest fragment
+        last_timestamp (int, optional): Unix timestamp of the newest fragment
+    """
+    count: int = 0
+    first_timestamp: Optional[int] = None
+    last_timestamp: Optional[int] = None
+
+    @classmethod
+    def of(cls, timestamp:Optional[int]) -> "MemoryStats":
+        return cls(count=1, first_timestamp=timestamp, last_timestamp=timestamp)
+
+    def add(self, timestamp:Optional[int]):
+        self.count += 1
+        self.touch(timestamp)
+
+    def touch(self, timestamp:Optional[int]):
+        """Extend the time range without counting a new fragment"""
+        if timestamp is not None:
+            self.first_timestamp = timestamp if self.first_timestamp is None else min(self.first_timestamp, timestamp)
+            self.last_timestamp = timestamp if self.last_timestamp is None else max(self.last_timestamp, timestamp)
+
 @dataclass
 class TimestampFilter:
     """
@@ -208,6 +307,133 @@ class TimestampFilter:
     greater_than_value: int = None
     lower_than_value: int = None
 
+@dataclass
+class RecencyRanking:
+    """
+    Rerank memory search candidates by relevance, recency and use.
+    
+    The search over-fetches `overfetch * limit` nearest neighbours and scores
+    each candidate as
+    
+        similarity_weight * 1 / (1 + distance)
+        + recency_weight * 0.5 ** (age / half_life_seconds)
+        + frequency_weight * log(1 + uses) / log(1 + max uses among candidates)
+    
+    where `uses` counts how many near-duplicates were merged into the memory
+    and how often this process has returned it. The best `limit` candidates
+    are returned.
+    
+    Attributes:
+        half_life_seconds (float): Age at which the recency term halves (default: 7 days)
+        similarity_weight (float): Weight of the vector similarity
+        recency_weight (float): Weight of the exponential recency decay
+        frequency_weight (float): Weight of the access frequency
+        overfetch (int): Candidates fetched per requested result
+    """
+    half_life_seconds: float = 7 * 24 * 3600
+    similarity_weight: float = 1.0
+    recency_weight: float = 0.5
+    frequency_weight: float = 0.2
+    overfetch: int = 4
+
+    def scores(self, distances:List[float], timestamps:List[Optional[int]],
+               uses:List[int], now:Optional[float]=None) -> "np.ndarray":
+        """Vectorized scores of the candidates, higher is better."""
+        if np is None:  # pragma: no cover - dependency unavailable
+            raise ImportError("numpy package is required for reranked searches")
+        now = time.time() if now is None else now
+        distances = np.asarray(distances, dtype=np.float64)
+        stamps = np.array([now if t is None else t for t in timestamps], dtype=np.float64)
+        uses = np.log1p(np.asarray(uses, dtype=np.float64))
+
+        similarity = 1.0 / (1.0 + np.maximum(distances, 0.0))
+        recency = np.exp2(-np.maximum(now - stamps, 0.0) / self.half_life_seconds)
+        frequency = uses / uses.max() if uses.size and uses.max() > 0 else np.zeros_like(uses)
+        return (self.similarity_weight * similarity
+                + self.recency_weight * recency
+                + self.frequency_weight * frequency)
+
+
+class _WriteBehindQueue:
+    """
+    Background thread applying queued writes in batches.
+
+    Documents are collected until `batch_size` are pending or
+    `flush_interval` seconds pass, then handed to `write` in one call.
+    Failed batches are logged and dropped, so a vector store outage never
+    reaches the agent turn that queued them.
+
+    The thread only references its owner through the pending writes: an idle
+    writer whose memory is dropped is collected and its thread stops.
+    """
+
+    def __init__(self, write:Callable[[List[Document]], None], batch_size:int, flush_interval:float):
+        self._write = write
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=_write_behind_loop,
+            args=(self._queue, batch_size, flush_interval),
+            name="memory-writer",
+            daemon=True,
+        )
+        self._thread.start()
+        # Queued memories survive interpreter shutdown; the exit hook goes away with the writer
+        self._finalizer = weakref.finalize(self, _stop_writer, self._queue, self._thread)
+
+    def put_many(self, documents:List[Document]):
+        # Under the lock, so nothing is queued behind close()'s stop sentinel
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The memory writer is closed")
+            for document in documents:
+                self._queue.put((self._write, document))
+
+    def flush(self):
+        self._queue.join()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        self._finalizer()
+
+
+def _stop_writer(jobs:"queue.Queue[Optional[tuple]]", thread:threading.Thread):
+    if thread.is_alive():
+        jobs.put(None)
+        thread.join()
+
+
+def _write_behind_loop(jobs:"queue.Queue[Optional[tuple]]", batch_size:int, flush_interval:float):
+    stopping = False
+    while not stopping:
+        batch = [jobs.get()]
+        deadline = time.monotonic() + flush_interval
+        while len(batch) < batch_size and batch[-1] is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(jobs.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        jobs_in_batch = [job for job in batch if job is not None]
+        stopping = len(jobs_in_batch) < len(batch)
+        size = len(batch)
+        documents = [document for _, document in jobs_in_batch]
+        try:
+            if jobs_in_batch:
+                jobs_in_batch[0][0](documents)
+        except Exception:
+            logger.exception("Dropped %d memory writes", len(documents))
+        # Don't keep the owner alive while waiting for the next writes
+        del batch, jobs_in_batch, documents
+        for _ in range(size):
+            jobs.task_done()
+
+
 class LongTermMemory:
     """
     Manages persistent memory storage and retrieval using vector embeddings.
@@ -222,22 +448,111 @@ class LongTermMemory:
     - Time-based filtering
     - Semantic similarity search
     """
-    def __init__(self, db:VectorStoreManager):
-        self.vector_store = db.create_store("long_term_memory", force=True)
+    def __init__(self, db:VectorStoreManager, store_name:str="long_term_memory",
+                 reset:bool=False, write_behind:bool=False,
+                 batch_size:int=64, flush_interval:float=0.5,
+                 ranking:Optional[RecencyRanking]=None,
+                 merge_distance:Optional[float]=None):
+        """
+        Attach to the memory store, creating it if needed.
+        
+        Args:
+            db (VectorStoreManager): Vector database holding the store
+            store_name (str): Name of the store (default: "long_term_memory")
+            reset (bool): Delete all existing memories first (default: False)
+            write_behind (bool): Queue `register`/`register_many` writes and
+                apply them in batches from a background thread, so callers do
+                not wait for embedding and insertion (default: False)
+            batch_size (int): Maximum fragments per embedding/insert batch
+            flush_interval (float): Seconds the background writer waits to
+                fill a batch before writing what it has
+            ranking (Optional[RecencyRanking]): Default reranking of searches
+                (None: plain nearest neighbours)
+            merge_distance (Optional[float]): Compact the store on insert: a
+                fragment whose nearest memory of the same owner and namespace
+                is within this distance replaces that memory instead of adding
+                a new one. The distance is in the store's `distance_metric`
+                (cosine for the local backend, squared L2 for a default
+                Chroma collection), so tune it per backend. Fragments written in the same batch are
+                not compared with each other.
+        """
+        if reset:
+            self.vector_store = db.create_store(store_name, force=True)
+        else:
+            self.vector_store = db.get_or_create_store(store_name)
+        self.batch_size = batch_size
+        self.ranking = ranking
+        self.merge_distance = merge_distance
+        # Document id -> times returned by reranked searches in this process
+        self._access_counts: Dict[str, int] = {}
+        # namespace -> owner -> MemoryStats; built lazily, then kept up to date by writes.
+        # It reflects this process's writes plus the store's content when it was built.
+        self._index: Optional[Dict[str, Dict[str, MemoryStats]]] = None
+        self._index_lock = threading.RLock()
+        self._writer = _WriteBehindQueue(self._write, batch_size, flush_interval) if write_behind else None
+
+    def _ensure_index(self) -> Dict[str, Dict[str, "MemoryStats"]]:
+        """Build the namespace index from the store's metadata on first use"""
+        with self._index_lock:
+            if self._index is None:
+                index: Dict[str, Dict[str, MemoryStats]] = {}
+                for metadata in self.vector_store.iter_metadatas():
+                    self._index_add(index, metadata)
+                self._index = index
+            return self._index
+
+    @staticmethod
+    def _index_add(index:Dict[str, Dict[str, "MemoryStats"]], metadata:Dict[str, Any]):
+        owners = index.setdefault(metadata.get("namespace", "default"), {})
+        stats = owners.get(metadata.get("owner"))
+        if stats is None:
+            owners[metadata.get("owner")] = MemoryStats.of(metadata.get("timestamp"))
+        else:
+            stats.add(metadata.get("timestamp"))
 
     def get_namespaces(self) -> List[str]:
         """
         Retrieve all unique namespaces currently stored in memory.
         
         Useful for understanding how memories are organized and for
-        administrative purposes.
+        administrative purposes. Answered from the namespace index in
+        O(#namespaces); the store is only scanned (metadata only) once, the
+        first time the index is needed.
         
         Returns:
             List[str]: List of unique namespace identifiers
         """
-        results = self.vector_store.get()
-        namespaces = [r["metadatas"][0]["namespace"] for r in results]
-        return namespaces
+        self.flush()
+        return sorted(self._ensure_index())
+
+    def get_owners(self, namespace:Optional[str]=None) -> List[str]:
+        """
+        List the owners having memories in `namespace` (in any namespace if None).
+        
+        Returns:
+            List[str]: Unique owner identifiers
+        """
+        self.flush()
+        index = self._ensure_index()
+        with self._index_lock:
+            if namespace is not None:
+                return sorted(index.get(namespace, {}))
+            return sorted({owner for owners in index.values() for owner in owners})
+
+    def stats(self) -> Dict[str, Dict[str, "MemoryStats"]]:
+        """
+        Memory counts and timestamp ranges per namespace and owner.
+        
+        Returns:
+            Dict[str, Dict[str, MemoryStats]]: namespace -> owner -> stats (copies)
+        """
+        self.flush()
+        index = self._ensure_index()
+        with self._index_lock:
+            return {
+                namespace: {owner: replace(stats) for owner, stats in owners.items()}
+                for namespace, owners in index.items()
+            }
 
     def register(self, memory_fragment:MemoryFragment, metadata:Optional[Dict[str, str]]=None):
         """
@@ -251,6 +566,102 @@ class LongTermMemory:
             memory_fragment (MemoryFragment): The memory content to store
             metadata (Optional[Dict[str, str]]): Additional metadata to associate with the memory
         """
+        self.register_many([memory_fragment], metadata)
+
+    def register_many(self, memory_fragments:List[MemoryFragment], metadata:Optional[Dict[str, str]]=None):
+        """
+        Store several memory fragments with batched embedding and insertion.
+        
+        Fragments are embedded and inserted `batch_size` at a time instead of
+        one vector store round trip each. With `write_behind`, they are queued
+        and this method returns immediately.
+        
+        Args:
+            memory_fragments (List[MemoryFragment]): The memories to store
+            metadata (Optional[Dict[str, str]]): Additional metadata for every fragment
+        """
+        documents = [self._to_document(fragment, metadata) for fragment in memory_fragments]
+        if self._writer is not None:
+            self._writer.put_many(documents)
+        else:
+            self._write(documents)
+
+    def flush(self):
+        """Wait until every queued write has been applied."""
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self):
+        """Apply the queued writes and stop the background writer."""
+        if self._writer is not None:
+            self._writer.close()
+
+    def _write(self, documents:List[Document]):
+        if not documents:
+            return
+        # Serialized with the index build, so no write is counted twice or missed
+        with self._index_lock:
+            merged = set()
+            if self.merge_distance is None:
+                self.vector_store.upsert_stream(documents, chunk_size=self.batch_size, report_progress=False)
+            else:
+                for start in range(0, len(documents), self.batch_size):
+                    merged |= self._write_merging(documents[start:start + self.batch_size])
+            if self._index is not None:
+                for document in documents:
+                    # A merged fragment replaced a memory, it doesn't add one
+                    if document.id in merged:
+                        owners = self._index.setdefault(document.metadata.get("namespace", "default"), {})
+                        owners.setdefault(document.metadata.get("owner"), MemoryStats()).touch(
+                            document.metadata.get("timestamp"))
+                    else:
+                        self._index_add(self._index, document.metadata)
+
+    def _write_merging(self, documents:List[Document]):
+        """
+        Upsert `documents`, folding each near-duplicate into the memory it
+        duplicates. Returns the ids of the memories that were replaced.
+        """
+        embeddings = self.vector_store.embed([document.content for document in documents])
+        if embeddings is None:
+            self.vector_store.upsert(documents)
+            return set()
+
+        groups: Dict[tuple, List[int]] = {}
+        for position, document in enumerate(documents):
+            key = (document.metadata["owner"], document.metadata["namespace"])
+            groups.setdefault(key, []).append(position)
+
+        merged_into: Dict[str, int] = {}  # existing id -> position of the fragment replacing it
+        dropped = set()
+        for (owner, namespace), positions in groups.items():
+            results = self.vector_store.search(
+                [documents[p].content for p in positions],
+                n_results=1,
+                where=self._build_where(owner, namespace, None),
+                query_embeddings=[embeddings[p] for p in positions],
+            )
+            for position, result in zip(positions, results):
+                if not result.hits or result.hits[0].distance > self.merge_distance:
+                    continue
+                hit = result.hits[0]
+                document = documents[position]
+                merges = hit.metadata.get("merged_count", 1)
+                if hit.id in merged_into:
+                    # Two new fragments duplicate the same memory: keep the later one
+                    earlier = merged_into[hit.id]
+                    dropped.add(earlier)
+                    merges = documents[earlier].metadata["merged_count"]
+                document.id = hit.id
+                document.metadata["merged_count"] = merges + 1
+                merged_into[hit.id] = position
+
+        kept = [p for p in range(len(documents)) if p not in dropped]
+        self.vector_store.upsert([documents[p] for p in kept], embeddings=[embeddings[p] for p in kept])
+        return set(merged_into)
+
+    @staticmethod
+    def _to_document(memory_fragment:MemoryFragment, metadata:Optional[Dict[str, str]]=None) -> Document:
         complete_metadata = {
             "owner": memory_fragment.owner,
             "namespace": memory_fragment.namespace,
@@ -259,16 +670,15 @@ class LongTermMemory:
         if metadata:
             complete_metadata.update(metadata)
 
-        self.vector_store.add(
-            Document(
-                content=memory_fragment.content,
-                metadata=complete_metadata,
-            )
+        return Document(
+            content=memory_fragment.content,
+            metadata=complete_metadata,
         )
 
     def search(self, query_text:str, owner:str, limit:int=3,
                timestamp_filter:Optional[TimestampFilter]=None, 
-               namespace:Optional[str]="default") -> MemorySearchResult:
+               namespace:Optional[str]="default",
+               ranking:Optional[RecencyRanking]=None) -> MemorySearchResult:
         """
         Search for relevant memories using semantic similarity.
         
@@ -282,11 +692,75 @@ class LongTermMemory:
             limit (int): Maximum number of results to return (default: 3)
             timestamp_filter (Optional[TimestampFilter]): Time-based filtering criteria
             namespace (Optional[str]): Namespace to search within (default: "default")
+            ranking (Optional[RecencyRanking]): Rerank over-fetched candidates by
+                similarity, recency and use (defaults to the memory's `ranking`)
             
         Returns:
             MemorySearchResult: Container with matching memory fragments and metadata
         """
 
+        return self.search_many(
+            [query_text],
+            owner=owner,
+            limit=limit,
+            timestamp_filter=timestamp_filter,
+            namespace=namespace,
+            ranking=ranking,
+        )[0]
+
+    def search_many(self, query_texts:List[str], owner:str, limit:int=3,
+                    timestamp_filter:Optional[TimestampFilter]=None,
+                    namespace:Optional[str]="default",
+                    ranking:Optional[RecencyRanking]=None) -> List[MemorySearchResult]:
+        """
+        Search memories for several queries in a single round trip.
+        
+        All queries are embedded in one batch and answered by one vector store
+        request, sharing the same owner, namespace and timestamp filters.
+        
+        Args:
+            query_texts (List[str]): The search queries
+            owner (str): User identifier to filter memories by ownership
+            limit (int): Maximum number of results per query (default: 3)
+            timestamp_filter (Optional[TimestampFilter]): Time-based filtering criteria
+            namespace (Optional[str]): Namespace to search within (default: "default")
+            
+        Returns:
+            List[MemorySearchResult]: One result per query, in input order
+        """
+        # Read your own writes: queued fragments must be searchable
+        self.flush()
+        ranking = ranking or self.ranking
+        results = self.vector_store.search(
+            query_texts,
+            n_results=limit * ranking.overfetch if ranking else limit,
+            where=self._build_where(owner, namespace, timestamp_filter),
+        )
+        if ranking is None:
+            return [self._to_search_result(result) for result in results]
+        return [self._rerank(result, ranking, limit) for result in results]
+
+    def _rerank(self, result:SearchResults, ranking:RecencyRanking, limit:int) -> MemorySearchResult:
+        hits = result.hits
+        if not hits:
+            return self._to_search_result(result)
+        scores = ranking.scores(
+            [hit.distance for hit in hits],
+            [hit.metadata.get("timestamp") for hit in hits],
+            [hit.metadata.get("merged_count", 1) - 1 + self._access_counts.get(hit.id, 0) for hit in hits],
+        )
+        order = np.argsort(-scores, kind="stable")[:limit]
+        best = [hits[i] for i in order]
+        for hit in best:
+            self._access_counts[hit.id] = self._access_counts.get(hit.id, 0) + 1
+
+        search_result = self._to_search_result(SearchResults(query=result.query, hits=best))
+        search_result.metadata["scores"] = [float(scores[i]) for i in order]
+        return search_result
+
+    @staticmethod
+    def _build_where(owner:str, namespace:Optional[str],
+                     timestamp_filter:Optional[TimestampFilter]) -> Dict:
         where = {
             "$and": [
                 {
@@ -316,32 +790,22 @@ class LongTermMemory:
                     }
                 })
 
-        result:QueryResult = self.vector_store.query(
-            query_texts=[query_text],
-            n_results=limit,
-            where=where
-        )
+        return where
 
+    @staticmethod
+    def _to_search_result(result:SearchResults) -> MemorySearchResult:
         fragments = []
-        documents = result.get("documents", [[]])[0]
-        metadatas = result.get("metadatas", [[]])[0]
-
-        for content, meta in zip(documents, metadatas):
-            owner = meta.get("owner")
-            namespace = meta.get("namespace", "default")
-            timestamp = meta.get("timestamp")
-
+        for hit in result.hits:
             fragment = MemoryFragment(
-                content=content,
-                owner=owner,
-                namespace=namespace,
-                timestamp=timestamp
+                content=hit.document,
+                owner=hit.metadata.get("owner"),
+                namespace=hit.metadata.get("namespace", "default"),
+                timestamp=hit.metadata.get("timestamp"),
             )
-
             fragments.append(fragment)
-        
+
         result_metadata = {
-            "distances": result.get("distances", [[]])[0]
+            "distances": result.distances
         }
 
         return MemorySearchResult(
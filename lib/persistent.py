@@ -0,0 +1,147 @@
+"""Structurally shared containers for workflow state.
+
+Snapshots keep a reference to every intermediate state of a run. Growing
+fields such as the agent's message history would make that quadratic if
+every step stored its own copy, so lists in the state are frozen into
+`PersistentList`s: immutable views over a shared, append-only buffer.
+"""
+from typing import Any, Dict, Iterable, Iterator, Sequence, Tuple, TypeVar, overload
+from itertools import islice
+import threading
+
+T = TypeVar("T")
+
+_MISSING = object()
+
+
+class PersistentList(Sequence[T]):
+    """
+    Immutable list whose concatenations share storage.
+
+    `plist + [item]` returns a new PersistentList in O(len(item)) when `plist`
+    is the newest version of its buffer: the items are appended to the shared
+    buffer and the new view simply covers more of it, while `plist` keeps
+    seeing its original length. Concatenating onto an older version copies
+    once and starts a new buffer. Indexing, iteration, `len`, `==` against
+    lists and pickling behave like a regular list.
+
+    Example:
+        >>> history = PersistentList(["system"])
+        >>> turn_1 = history + ["user: hi"]
+        >>> turn_2 = turn_1 + ["assistant: hello"]
+        >>> len(history), len(turn_1), len(turn_2)
+        (1, 2, 3)
+    """
+
+    __slots__ = ("_items", "_length", "_lock")
+
+    def __init__(self, items: Iterable[T] = ()):
+        self._items = list(items)
+        self._length = len(self._items)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def _view(cls, items: list, length: int, lock: threading.Lock) -> "PersistentList[T]":
+        view = cls.__new__(cls)
+        view._items, view._length, view._lock = items, length, lock
+        return view
+
+    def __len__(self) -> int:
+        return self._length
+
+    @overload
+    def __getitem__(self, index: int) -> T: ...
+    @overload
+    def __getitem__(self, index: slice) -> list: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._items[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("PersistentList index out of range")
+        return self._items[index]
+
+    def __iter__(self) -> Iterator[T]:
+        return islice(self._items, self._length)
+
+    def __add__(self, other: Iterable[T]) -> "PersistentList[T]":
+        other = list(other)
+        with self._lock:
+            if self._length == len(self._items):
+                self._items.extend(other)
+                return self._view(self._items, len(self._items), self._lock)
+        return PersistentList(list(self) + other)
+
+    def __radd__(self, other: Iterable[T]) -> "PersistentList[T]":
+        return PersistentList(list(other) + list(self))
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (PersistentList, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+    def __reduce__(self):
+        return (PersistentList, (list(self),))
+
+    # Immutable: copies can share the instance
+    def __copy__(self) -> "PersistentList[T]":
+        return self
+
+    def __deepcopy__(self, memo: Dict) -> "PersistentList[T]":
+        return self
+
+
+def freeze_state(state: Dict[str, Any], previous: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Prepare `state` for snapshotting against the `previous` snapshot state.
+
+    Values unchanged since `previous` (same object) are shared as is; plain
+    lists that changed are frozen into PersistentLists so that later steps
+    extend them in O(delta). Returns the frozen state and the changed fields.
+    """
+    frozen: Dict[str, Any] = {}
+    changes: Dict[str, Any] = {}
+    for key, value in state.items():
+        if previous.get(key, _MISSING) is not value:
+            if type(value) is list:
+                value = PersistentList(value)
+            changes[key] = value
+        frozen[key] = value
+    return frozen, changes
+
+
+def diff_changes(previous: Dict[str, Any], changes: Dict[str, Any]) -> Dict[str, Tuple[str, Any]]:
+    """
+    Encode `changes` relative to `previous` for compact serialization.
+
+    A PersistentList that extends the previous version of the same buffer is
+    encoded as `("extend", new_items)`; anything else as `("set", value)`.
+    """
+    encoded = {}
+    for key, value in changes.items():
+        old = previous.get(key)
+        if (isinstance(value, PersistentList) and isinstance(old, PersistentList)
+                and value._items is old._items and len(value) >= len(old)):
+            encoded[key] = ("extend", value[len(old):])
+        else:
+            encoded[key] = ("set", value)
+    return encoded
+
+
+def apply_changes(previous: Dict[str, Any], encoded: Dict[str, Tuple[str, Any]]) -> Dict[str, Any]:
+    """Inverse of `diff_changes`: rebuild the full state after the change."""
+    state = {**previous}
+    for key, (op, value) in encoded.items():
+        if op == "extend":
+            old = previous.get(key)
+            state[key] = (old if isinstance(old, PersistentList) else PersistentList(old or ())) + value
+        else:
+            state[key] = value
+    return state
@@ -0,0 +1,213 @@
+"""Per-run latency and token profiling.
+
+While a `StateMachine` run executes, its `RunProfile` is the *current
+profile* (a context variable, so worker threads and asyncio tasks started by
+the run inherit it). Steps, LLM calls, tool calls and timed operations such
+as embedding or vector search record themselves into it; outside a run the
+recording helpers do nothing.
+
+`aggregate_profiles` / `format_profile_report` summarize many runs with
+p50/p95/p99 latencies per step, model, tool and operation, which shows
+whether Chroma, embedding, OpenAI or Tavily dominates a workload.
+"""
+from typing import Dict, Iterable, List, Optional
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+import contextvars
+import math
+import time
+
+
+@dataclass
+class StepTiming:
+    step_id: str
+    wall_ms: float
+    cpu_ms: Optional[float]  # None for coroutine steps sharing the event loop
+
+
+@dataclass
+class LLMCallRecord:
+    model: str
+    duration_ms: float
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+    cached: bool = False
+    ttft_ms: Optional[float] = None  # time to first token of streamed calls
+
+
+@dataclass
+class ToolCallRecord:
+    name: str
+    duration_ms: float
+    error: Optional[str] = None
+
+
+@dataclass
+class OperationTiming:
+    """Timing of an instrumented operation, e.g. ("embedding", "all-MiniLM-L6-v2")"""
+    category: str
+    name: str
+    duration_ms: float
+
+
+@dataclass
+class RunProfile:
+    """Timings recorded during one run"""
+    steps: List[StepTiming] = field(default_factory=list)
+    llm_calls: List[LLMCallRecord] = field(default_factory=list)
+    tool_calls: List[ToolCallRecord] = field(default_factory=list)
+    operations: List[OperationTiming] = field(default_factory=list)
+
+    @property
+    def prompt_tokens(self) -> int:
+        return sum(call.prompt_tokens for call in self.llm_calls)
+
+    @property
+    def completion_tokens(self) -> int:
+        return sum(call.completion_tokens for call in self.llm_calls)
+
+    @property
+    def tool_time_ms(self) -> float:
+        return sum(call.duration_ms for call in self.tool_calls)
+
+
+_current_profile: contextvars.ContextVar[Optional[RunProfile]] = contextvars.ContextVar("run_profile", default=None)
+_NULL = nullcontext()
+
+
+def current_profile() -> Optional[RunProfile]:
+    return _current_profile.get()
+
+
+@contextmanager
+def profiling(profile: RunProfile):
+    """Make `profile` the current profile for the enclosed code."""
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+def record_step(step_id: str, wall_ms: float, cpu_ms: Optional[float]):
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.steps.append(StepTiming(step_id, wall_ms, cpu_ms))
+
+
+def record_llm_call(model: str, duration_ms: float, token_usage=None, cached: bool = False,
+                    ttft_ms: Optional[float] = None):
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.llm_calls.append(LLMCallRecord(
+            model=model,
+            duration_ms=duration_ms,
+            prompt_tokens=token_usage.prompt_tokens if token_usage else 0,
+            completion_tokens=token_usage.completion_tokens if token_usage else 0,
+            total_tokens=token_usage.total_tokens if token_usage else 0,
+            cached=cached,
+            ttft_ms=ttft_ms,
+        ))
+
+
+@contextmanager
+def _timed_tool(profile: RunProfile, name: str):
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = repr(e)
+        raise
+    finally:
+        profile.tool_calls.append(ToolCallRecord(name, (time.perf_counter() - start) * 1000, error))
+
+
+def timed_tool_call(name: str):
+    """Context manager recording a tool call's duration into the current profile."""
+    profile = _current_profile.get()
+    return _timed_tool(profile, name) if profile is not None else _NULL
+
+
+@contextmanager
+def _timed_operation(profile: RunProfile, category: str, name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.operations.append(OperationTiming(category, name, (time.perf_counter() - start) * 1000))
+
+
+def timed_operation(category: str, name: str):
+    """Context manager recording an operation's duration into the current profile."""
+    profile = _current_profile.get()
+    return _timed_operation(profile, category, name) if profile is not None else _NULL
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Linear-interpolated percentile (q in 0..100) of `values`."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "total": sum(values),
+    }
+
+
+def aggregate_profiles(profiles: Iterable[RunProfile]) -> Dict[str, Dict[str, float]]:
+    """
+    Latency percentiles (ms) across runs, keyed by "<kind>:<name>".
+
+    Kinds are "step" (wall time), "step_cpu", "llm" (per model), "llm_ttft"
+    (time to first token of streamed calls), "tool" and
+    the operation categories ("embedding", "vector_search", ...). LLM
+    entries also report total prompt and completion tokens.
+    """
+    samples: Dict[str, List[float]] = {}
+    tokens: Dict[str, List[int]] = {}
+    for profile in profiles:
+        for step in profile.steps:
+            samples.setdefault(f"step:{step.step_id}", []).append(step.wall_ms)
+            if step.cpu_ms is not None:
+                samples.setdefault(f"step_cpu:{step.step_id}", []).append(step.cpu_ms)
+        for call in profile.llm_calls:
+            key = f"llm:{call.model}"
+            samples.setdefault(key, []).append(call.duration_ms)
+            counts = tokens.setdefault(key, [0, 0])
+            counts[0] += call.prompt_tokens
+            counts[1] += call.completion_tokens
+            if call.ttft_ms is not None:
+                samples.setdefault(f"llm_ttft:{call.model}", []).append(call.ttft_ms)
+        for call in profile.tool_calls:
+            samples.setdefault(f"tool:{call.name}", []).append(call.duration_ms)
+        for op in profile.operations:
+            samples.setdefault(f"{op.category}:{op.name}", []).append(op.duration_ms)
+
+    report = {key: _summary(values) for key, values in samples.items()}
+    for key, (prompt, completion) in tokens.items():
+        report[key].update(prompt_tokens=prompt, completion_tokens=completion)
+    return report
+
+
+def format_profile_report(profiles: Iterable[RunProfile]) -> str:
+    """Text table of `aggregate_profiles`, slowest total time first."""
+    report = aggregate_profiles(profiles)
+    lines = [f"{'component':<40} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'total ms':>10}"]
+    for key, row in sorted(report.items(), key=lambda item: -item[1]["total"]):
+        line = (f"{key:<40} {row['count']:>6} {row['p50']:>9.1f} {row['p95']:>9.1f} "
+                f"{row['p99']:>9.1f} {row['total']:>10.1f}")
+        if "prompt_tokens" in row:
+            line += f"  tokens {row['prompt_tokens']} in / {row['completion_tokens']} out"
+        lines.append(line)
+    return "\n".join(lines)
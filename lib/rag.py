@@ -42,14 +42,15 @@ class RAG:
         )
 
     def _retrieve(self, state:RAGState, resource:Resource) -> RAGState:
+        if "documents" in state:
+            # Already retrieved as part of a batch (see `batch`)
+            return {}
+
         question = state["question"]
         vector_store:VectorStore = resource.vars.get("vector_store")
-        results = vector_store.query(query_texts=[question])
+        result = vector_store.search([question])[0]
 
-        documents = results['documents'][0] if results['documents'] else []
-        distances = results['distances'][0] if results['distances'] else []
-        
-        return {"documents": documents, "distances": distances}
+        return {"documents": result.documents, "distances": result.distances}
 
     def _augment(self, state:RAGState) -> RAGState:
         question = state["question"]
@@ -125,3 +126,30 @@ class RAG:
             resource = self.resource,
         )
         return run_object
+
+    def batch(self, queries: List[str]) -> List[Run]:
+        """
+        Execute the RAG pipeline for several questions at once.
+        
+        Retrieval for all questions happens up front in a single batched
+        search (one embedding pass and one vector store round trip); each
+        question then goes through augment and generate as in `invoke`.
+        
+        Args:
+            queries (List[str]): The user's questions
+            
+        Returns:
+            List[Run]: One execution object per question, in input order
+        """
+        vector_store:VectorStore = self.resource.vars.get("vector_store")
+        results = vector_store.search(queries)
+
+        runs = []
+        for query, result in zip(queries, results):
+            initial_state: RAGState = {
+                "question": query,
+                "documents": result.documents,
+                "distances": result.distances,
+            }
+            runs.append(self.workflow.run(state=initial_state, resource=self.resource))
+        return runs
@@ -0,0 +1,265 @@
+"""Process-wide registry for expensive, reusable resources.
+
+Loading a SentenceTransformer model takes seconds and every Chroma client
+owns its own connection pool, so these objects are created lazily once per
+process and shared by every caller (tools, vector stores, scripts).
+"""
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from lib.embedding_cache import CachedEncoder, EmbeddingCache
+
+try:
+    import chromadb
+    from chromadb.utils import embedding_functions
+    if not hasattr(chromadb, "HttpClient"):
+        # A local directory named 'chromadb' may shadow the real package.
+        chromadb = None
+except ImportError:  # pragma: no cover - allow running without chromadb
+    chromadb = None
+    embedding_functions = None
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # pragma: no cover - allow running without sentence-transformers
+    SentenceTransformer = None
+
+
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+DEFAULT_CHROMA_URL = "http://localhost:8000"
+DEFAULT_EMBEDDING_CACHE_SIZE = 10_000
+DEFAULT_TOOL_WORKERS = 8
+
+
+class ResourceRegistry:
+    """
+    Thread-safe, lazily populated cache of shared resources.
+
+    Each resource is identified by a hashable key and built by a factory the
+    first time it is requested. Creation is serialized per key, so two threads
+    asking for the same model load it once while unrelated resources can be
+    created concurrently. Lookups of already created resources take no lock.
+    """
+
+    def __init__(self):
+        self._resources: Dict[Hashable, Any] = {}
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        resource = self._resources.get(key)
+        if resource is not None:
+            return resource
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            resource = self._resources.get(key)
+            if resource is None:
+                resource = factory()
+                self._resources[key] = resource
+        return resource
+
+    def discard(self, key: Hashable, resource: Any = None):
+        """Forget a resource so the next request recreates it.
+
+        With `resource`, only if that is still the one registered under `key`.
+        """
+        with self._lock:
+            if resource is None or self._resources.get(key) is resource:
+                self._resources.pop(key, None)
+
+    def discard_where(self, predicate: Callable[[Hashable], bool]):
+        """Forget every resource whose key satisfies `predicate`."""
+        with self._lock:
+            for key in [k for k in self._resources if predicate(k)]:
+                del self._resources[key]
+
+    def clear(self):
+        with self._lock:
+            self._resources.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._resources
+
+    def __len__(self) -> int:
+        return len(self._resources)
+
+
+registry = ResourceRegistry()
+
+
+def get_embedding_model(model_name: str = DEFAULT_EMBEDDING_MODEL) -> "SentenceTransformer":
+    """Return the shared SentenceTransformer instance for `model_name`."""
+    if SentenceTransformer is None:  # pragma: no cover - dependency unavailable
+        raise ImportError("sentence-transformers package is required")
+    return registry.get_or_create(
+        ("embedding_model", model_name),
+        lambda: SentenceTransformer(model_name),
+    )
+
+
+class TextEncoder:
+    """Callable mapping a list of texts to embeddings with the shared model."""
+
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL):
+        self.model_name = model_name
+
+    def __call__(self, input: List[str]):
+        return get_embedding_model(self.model_name).encode(list(input), convert_to_numpy=True)
+
+    def __repr__(self) -> str:
+        return f"TextEncoder('{self.model_name}')"
+
+
+def get_text_encoder(model_name: str = DEFAULT_EMBEDDING_MODEL) -> TextEncoder:
+    """Return the shared TextEncoder for `model_name`."""
+    return registry.get_or_create(("text_encoder", model_name), lambda: TextEncoder(model_name))
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """
+    Return the shared query embedding cache.
+
+    Its in-memory size comes from `EMBEDDING_CACHE_SIZE` (default 10000
+    vectors); setting `EMBEDDING_CACHE_DIR` additionally persists every
+    computed embedding there so that restarts start with a warm cache.
+    """
+    return registry.get_or_create(
+        ("embedding_cache",),
+        lambda: EmbeddingCache(
+            max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", DEFAULT_EMBEDDING_CACHE_SIZE)),
+            directory=os.getenv("EMBEDDING_CACHE_DIR") or None,
+        ),
+    )
+
+
+def get_query_encoder(model_name: str = DEFAULT_EMBEDDING_MODEL) -> CachedEncoder:
+    """Return the shared, cache-backed encoder used to embed search queries."""
+    return registry.get_or_create(
+        ("query_encoder", model_name),
+        lambda: CachedEncoder(model_name, get_text_encoder(model_name), get_embedding_cache()),
+    )
+
+
+def get_tool_executor(max_workers: int = DEFAULT_TOOL_WORKERS) -> ThreadPoolExecutor:
+    """Return the shared thread pool that runs agent tool calls.
+
+    A tool call that times out cannot be interrupted: it keeps its worker
+    until it returns. Callers retire the pool with `retire_tool_executor`
+    when that happens, so hung calls never hold up later ones.
+    """
+    return registry.get_or_create(
+        ("tool_executor", max_workers),
+        lambda: ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool"),
+    )
+
+
+def retire_tool_executor(executor: ThreadPoolExecutor, max_workers: int = DEFAULT_TOOL_WORKERS):
+    """
+    Stop handing out `executor` after one of its calls timed out.
+
+    Later calls get a fresh pool. The retired one keeps running the calls
+    already submitted to it and its threads exit once it is unreferenced
+    and idle; it is not shut down, since other turns may still be using it.
+    """
+    registry.discard(("tool_executor", max_workers), executor)
+
+
+def get_embedding_function(model_name: str = DEFAULT_EMBEDDING_MODEL):
+    """Return the shared Chroma embedding function for `model_name`."""
+    if embedding_functions is None:  # pragma: no cover - dependency unavailable
+        raise ImportError("chromadb package is required")
+    return registry.get_or_create(
+        ("embedding_function", model_name),
+        lambda: embedding_functions.SentenceTransformerEmbeddingFunction(model_name=model_name),
+    )
+
+
+def _client_key(server_url: Optional[str], persist_directory: Optional[str]) -> Tuple:
+    if server_url:
+        return ("chroma_client", "http", server_url)
+    if persist_directory:
+        return ("chroma_client", "persistent", os.path.abspath(persist_directory))
+    return ("chroma_client", "ephemeral")
+
+
+def _create_client(server_url: Optional[str], persist_directory: Optional[str]):
+    if server_url:
+        try:
+            parsed = urlparse(server_url)
+            host = parsed.hostname or "localhost"
+            port = parsed.port or 8000
+            return chromadb.HttpClient(host=host, port=port, ssl=parsed.scheme == "https")
+        except Exception:
+            return chromadb.HttpClient(server_url)
+    if persist_directory:
+        return chromadb.PersistentClient(path=persist_directory)
+    return chromadb.Client()
+
+
+def resolve_chroma_url(server_url: Optional[str] = None) -> str:
+    """Resolve the Chroma server URL from the argument or `CHROMA_URL`.
+
+    An empty string (explicit argument or environment value) means "no
+    server", in which case callers fall back to a local client.
+    """
+    if server_url is not None:
+        return server_url
+    return os.getenv("CHROMA_URL", DEFAULT_CHROMA_URL)
+
+
+def get_chroma_client(server_url: Optional[str] = None,
+                      persist_directory: Optional[str] = None):
+    """
+    Return the shared Chroma client for a server URL or local directory.
+
+    Args:
+        server_url (Optional[str]): Chroma server URL. Defaults to the
+            `CHROMA_URL` environment variable (or http://localhost:8000).
+            Pass an empty string to force a local client.
+        persist_directory (Optional[str]): Directory used for a persistent
+            local client when no server URL is configured. An in-memory
+            client is used when both are empty.
+    """
+    if chromadb is None:  # pragma: no cover - dependency unavailable
+        raise ImportError("chromadb package is required")
+    server_url = resolve_chroma_url(server_url)
+    return registry.get_or_create(
+        _client_key(server_url, persist_directory),
+        lambda: _create_client(server_url, persist_directory),
+    )
+
+
+def get_collection(name: str,
+                   server_url: Optional[str] = None,
+                   persist_directory: Optional[str] = None,
+                   embedding_function: Any = None):
+    """Return a shared handle to the collection `name`, creating it if needed."""
+    server_url = resolve_chroma_url(server_url)
+    client = get_chroma_client(server_url, persist_directory)
+    # Handles bound to different embedding functions are kept apart; shared
+    # embedding functions come from this registry, so their identity is stable.
+    ef_key = id(embedding_function) if embedding_function is not None else None
+    key = ("chroma_collection", _client_key(server_url, persist_directory), name, ef_key)
+
+    def factory():
+        if embedding_function is None:
+            return client.get_or_create_collection(name=name)
+        return client.get_or_create_collection(name=name, embedding_function=embedding_function)
+
+    return registry.get_or_create(key, factory)
+
+
+def invalidate_collection(name: str,
+                          server_url: Optional[str] = None,
+                          persist_directory: Optional[str] = None):
+    """Drop cached handles to `name`, e.g. after the collection was deleted."""
+    client_key = _client_key(resolve_chroma_url(server_url), persist_directory)
+    registry.discard_where(
+        lambda key: key[:3] == ("chroma_collection", client_key, name)
+    )
@@ -0,0 +1,401 @@
+"""Storage backends for `ShortTermMemory` sessions.
+
+The in-process store keeps sessions in a dict of deques, which is fastest
+but loses them on restart and cannot be shared between processes. The
+SQLite (WAL mode) and Redis stores persist every stored object with pickle
+protocol 5, so several Streamlit or worker processes behind a load balancer
+can continue each other's sessions. Reads are lazy: the last object of a
+session is fetched on its own, and `iter_objects` unpickles the history one
+object at a time.
+
+`get_session_store` builds the store named by a URL (`SESSION_STORE_URL`):
+`memory://`, `sqlite:///path/to/sessions.sqlite` or `redis://host:6379/0`.
+Any client implementing redis-py's list/set/hash commands works with
+`RedisSessionStore`, e.g. `fakeredis.FakeRedis()` as a local stand-in.
+"""
+from typing import Any, Deque, Dict, Iterator, List, Optional
+from abc import ABC, abstractmethod
+from collections import deque
+from urllib.parse import urlparse
+import os
+import pickle
+import sqlite3
+import threading
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - only needed for the Redis store
+    redis = None
+
+from lib.resources import registry
+
+PICKLE_PROTOCOL = 5
+
+
+def _dumps(obj: Any) -> bytes:
+    return pickle.dumps(obj, protocol=PICKLE_PROTOCOL)
+
+
+class SessionStore(ABC):
+    """
+    Interface of the session storage backends.
+
+    A session is an ordered list of objects, optionally capped at
+    `max_items` (the oldest object is evicted when the cap is reached).
+    Evicted objects are returned to the caller, which may release them.
+    """
+
+    @abstractmethod
+    def create_session(self, session_id: str, max_items: Optional[int] = None) -> bool:
+        pass
+
+    @abstractmethod
+    def set_max_items(self, session_id: str, max_items: Optional[int]) -> List[Any]:
+        """Change the cap of an existing session; returns the oldest objects it evicted"""
+
+    @abstractmethod
+    def delete_session(self, session_id: str) -> bool:
+        pass
+
+    @abstractmethod
+    def has_session(self, session_id: str) -> bool:
+        pass
+
+    @abstractmethod
+    def session_ids(self) -> List[str]:
+        pass
+
+    @abstractmethod
+    def append(self, session_id: str, obj: Any) -> List[Any]:
+        """Append `obj`; returns the objects evicted by the session's cap"""
+
+    @abstractmethod
+    def last(self, session_id: str) -> Optional[Any]:
+        pass
+
+    @abstractmethod
+    def iter_objects(self, session_id: str) -> Iterator[Any]:
+        pass
+
+    def all(self, session_id: str) -> List[Any]:
+        return list(self.iter_objects(session_id))
+
+    @abstractmethod
+    def clear(self, session_id: str):
+        pass
+
+    @abstractmethod
+    def pop(self, session_id: str) -> Optional[Any]:
+        pass
+
+
+class InMemorySessionStore(SessionStore):
+    """Sessions in a dict of deques; objects are shared, not copied"""
+
+    def __init__(self):
+        self.sessions: Dict[str, Deque[Any]] = {}
+
+    def create_session(self, session_id: str, max_items: Optional[int] = None) -> bool:
+        if session_id in self.sessions:
+            return False
+        self.sessions[session_id] = deque(maxlen=max_items)
+        return True
+
+    def set_max_items(self, session_id: str, max_items: Optional[int]) -> List[Any]:
+        objects = self.sessions[session_id]
+        if objects.maxlen == max_items:
+            return []
+        evicted = list(objects)[:max(len(objects) - max_items, 0)] if max_items is not None else []
+        self.sessions[session_id] = deque(objects, maxlen=max_items)
+        return evicted
+
+    def delete_session(self, session_id: str) -> bool:
+        return self.sessions.pop(session_id, None) is not None
+
+    def has_session(self, session_id: str) -> bool:
+        return session_id in self.sessions
+
+    def session_ids(self) -> List[str]:
+        return list(self.sessions)
+
+    def append(self, session_id: str, obj: Any) -> List[Any]:
+        objects = self.sessions[session_id]
+        evicted = [objects[0]] if objects and len(objects) == objects.maxlen else []
+        objects.append(obj)
+        return evicted
+
+    def last(self, session_id: str) -> Optional[Any]:
+        objects = self.sessions[session_id]
+        return objects[-1] if objects else None
+
+    def iter_objects(self, session_id: str) -> Iterator[Any]:
+        return iter(list(self.sessions[session_id]))
+
+    def clear(self, session_id: str):
+        self.sessions[session_id].clear()
+
+    def pop(self, session_id: str) -> Optional[Any]:
+        objects = self.sessions[session_id]
+        return objects.pop() if objects else None
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Sessions persisted in a SQLite database in WAL mode.
+
+    Processes sharing the file see each other's sessions; appends run in
+    `BEGIN IMMEDIATE` transactions so concurrent writers keep a consistent
+    order.
+
+    Args:
+        path: Database file
+        timeout: Seconds to wait for another process's write lock
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                max_items INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS session_objects (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                payload BLOB NOT NULL,
+                PRIMARY KEY (session_id, seq)
+            );
+        """)
+
+    def _write(self, *statements):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = None
+                for sql, params in statements:
+                    cursor = self._conn.execute(sql, params)
+                self._conn.execute("COMMIT")
+                return cursor
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def create_session(self, session_id: str, max_items: Optional[int] = None) -> bool:
+        cursor = self._write(("INSERT OR IGNORE INTO sessions VALUES (?, ?)", (session_id, max_items)))
+        return cursor.rowcount == 1
+
+    def set_max_items(self, session_id: str, max_items: Optional[int]) -> List[Any]:
+        return self._write_evicting(
+            session_id,
+            ("UPDATE sessions SET max_items = ? WHERE session_id = ?", (max_items, session_id)),
+        )
+
+    def _write_evicting(self, session_id: str, *statements) -> List[Any]:
+        """Run `statements`, then evict (and return) the objects beyond the session's cap"""
+        beyond_cap = ("session_id = ? AND seq <= ("
+                      "SELECT MAX(o.seq) - s.max_items FROM session_objects o JOIN sessions s "
+                      "ON s.session_id = o.session_id WHERE o.session_id = ? AND s.max_items IS NOT NULL)")
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in statements:
+                    self._conn.execute(sql, params)
+                rows = self._conn.execute(
+                    f"SELECT payload FROM session_objects WHERE {beyond_cap} ORDER BY seq", (session_id, session_id)
+                ).fetchall()
+                if rows:
+                    self._conn.execute(f"DELETE FROM session_objects WHERE {beyond_cap}", (session_id, session_id))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [pickle.loads(row[0]) for row in rows]
+
+    def delete_session(self, session_id: str) -> bool:
+        cursor = self._write(
+            ("DELETE FROM session_objects WHERE session_id = ?", (session_id,)),
+            ("DELETE FROM sessions WHERE session_id = ?", (session_id,)),
+        )
+        return cursor.rowcount == 1
+
+    def has_session(self, session_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone() is not None
+
+    def session_ids(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT session_id FROM sessions ORDER BY rowid")]
+
+    def append(self, session_id: str, obj: Any) -> List[Any]:
+        return self._write_evicting(
+            session_id,
+            ("INSERT INTO session_objects VALUES (?, COALESCE("
+             "(SELECT MAX(seq) FROM session_objects WHERE session_id = ?), 0) + 1, ?)",
+             (session_id, session_id, _dumps(obj))),
+        )
+
+    def last(self, session_id: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM session_objects WHERE session_id = ? ORDER BY seq DESC LIMIT 1",
+                (session_id,),
+            ).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def iter_objects(self, session_id: str) -> Iterator[Any]:
+        with self._lock:
+            seqs = [row[0] for row in self._conn.execute(
+                "SELECT seq FROM session_objects WHERE session_id = ? ORDER BY seq", (session_id,)
+            )]
+        for seq in seqs:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT payload FROM session_objects WHERE session_id = ? AND seq = ?", (session_id, seq)
+                ).fetchone()
+            if row is not None:  # evicted meanwhile
+                yield pickle.loads(row[0])
+
+    def clear(self, session_id: str):
+        self._write(("DELETE FROM session_objects WHERE session_id = ?", (session_id,)))
+
+    def pop(self, session_id: str) -> Optional[Any]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT seq, payload FROM session_objects WHERE session_id = ? ORDER BY seq DESC LIMIT 1",
+                    (session_id,),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute("DELETE FROM session_objects WHERE session_id = ? AND seq = ?",
+                                       (session_id, row[0]))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return pickle.loads(row[1]) if row else None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Sessions stored in Redis lists, shared by every process using the server.
+
+    Args:
+        client: A redis-py compatible client (`redis.Redis`, `fakeredis.FakeRedis`, ...)
+        url: Server URL used to create a client when none is given
+        prefix: Key prefix of this store's sessions
+    """
+
+    def __init__(self, client: Any = None, url: Optional[str] = None, prefix: str = "udaplay:sessions"):
+        if client is None:
+            if redis is None:  # pragma: no cover - dependency unavailable
+                raise ImportError("redis package is required")
+            client = redis.Redis.from_url(url or "redis://localhost:6379/0")
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}:{session_id}"
+
+    @property
+    def _index(self) -> str:
+        return f"{self.prefix}:index"
+
+    @property
+    def _caps(self) -> str:
+        return f"{self.prefix}:caps"
+
+    @staticmethod
+    def _text(value: Any) -> str:
+        return value.decode() if isinstance(value, bytes) else value
+
+    def create_session(self, session_id: str, max_items: Optional[int] = None) -> bool:
+        created = bool(self.client.sadd(self._index, session_id))
+        if created and max_items is not None:
+            self.client.hset(self._caps, session_id, max_items)
+        return created
+
+    def set_max_items(self, session_id: str, max_items: Optional[int]) -> List[Any]:
+        if max_items is None:
+            self.client.hdel(self._caps, session_id)
+            return []
+        self.client.hset(self._caps, session_id, max_items)
+        return self._trim(session_id, max_items)
+
+    def _trim(self, session_id: str, cap: int) -> List[Any]:
+        evicted = self.client.lrange(self._key(session_id), 0, -cap - 1)
+        if evicted:
+            self.client.ltrim(self._key(session_id), -cap, -1)
+        return [pickle.loads(payload) for payload in evicted]
+
+    def delete_session(self, session_id: str) -> bool:
+        self.client.delete(self._key(session_id))
+        self.client.hdel(self._caps, session_id)
+        return bool(self.client.srem(self._index, session_id))
+
+    def has_session(self, session_id: str) -> bool:
+        return bool(self.client.sismember(self._index, session_id))
+
+    def session_ids(self) -> List[str]:
+        return sorted(self._text(member) for member in self.client.smembers(self._index))
+
+    def append(self, session_id: str, obj: Any) -> List[Any]:
+        self.client.rpush(self._key(session_id), _dumps(obj))
+        cap = self.client.hget(self._caps, session_id)
+        return self._trim(session_id, int(cap)) if cap is not None else []
+
+    def last(self, session_id: str) -> Optional[Any]:
+        payload = self.client.lindex(self._key(session_id), -1)
+        return pickle.loads(payload) if payload is not None else None
+
+    def iter_objects(self, session_id: str, batch_size: int = 32) -> Iterator[Any]:
+        start = 0
+        while True:
+            batch = self.client.lrange(self._key(session_id), start, start + batch_size - 1)
+            for payload in batch:
+                yield pickle.loads(payload)
+            if len(batch) < batch_size:
+                return
+            start += batch_size
+
+    def clear(self, session_id: str):
+        self.client.delete(self._key(session_id))
+
+    def pop(self, session_id: str) -> Optional[Any]:
+        payload = self.client.rpop(self._key(session_id))
+        return pickle.loads(payload) if payload is not None else None
+
+
+def get_session_store(url: Optional[str] = None) -> Optional[SessionStore]:
+    """
+    Return the shared session store for `url`.
+
+    Defaults to the `SESSION_STORE_URL` environment variable; returns None
+    (each memory keeps its own in-process sessions) when neither is set.
+    """
+    url = url or os.getenv("SESSION_STORE_URL")
+    if not url:
+        return None
+
+    parsed = urlparse(url)
+    if parsed.scheme == "memory":
+        factory = InMemorySessionStore
+    elif parsed.scheme == "sqlite":
+        factory = lambda: SQLiteSessionStore(url[len("sqlite:///"):])
+    elif parsed.scheme in ("redis", "rediss", "unix"):
+        factory = lambda: RedisSessionStore(url=url)
+    else:
+        raise ValueError(f"Unsupported session store URL '{url}'")
+    return registry.get_or_create(("session_store", url), factory)
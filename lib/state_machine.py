@@ -1,21 +1,45 @@
-from typing import Any, Callable, Dict, List, Optional, Union, TypeVar, Generic, cast, Type, TypedDict, get_type_hints
+from typing import Any, Awaitable, Callable, Dict, List, Literal, Optional, Tuple, Union, TypeVar, Generic, cast, Type, TypedDict, get_type_hints
+from concurrent.futures import Executor, ThreadPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime
+import asyncio
+import gzip
+import os
+import pickle
+import time
+import contextvars
+import functools
 import uuid
-import copy
+import weakref
 import inspect
+import logging
+
+from lib.tracing import get_tracer, state_size_delta
+from lib.profiling import RunProfile, profiling, record_step
+from lib.persistent import PersistentList, apply_changes, diff_changes, freeze_state
 
 
 StateSchema = TypeVar("StateSchema")
 
+logger = logging.getLogger(__name__)
+
 @dataclass
 class Resource:
     vars: Dict[str, Any]
 
 class Step(Generic[StateSchema]):
-    def __init__(self, step_id: str, logic: Callable[[StateSchema], Dict]):
+    def __init__(self, step_id: str, logic: Callable[[StateSchema], Union[Dict, Awaitable[Dict]]],
+                 async_logic: Optional[Callable[[StateSchema], Awaitable[Dict]]] = None):
+        """
+        Args:
+            step_id: Unique identifier of the step
+            logic: Step function, either a regular or an `async def` function
+            async_logic: Optional coroutine variant of `logic` preferred by
+                `StateMachine.arun` (e.g. one that awaits `LLM.ainvoke`)
+        """
         self.step_id = step_id
         self.logic = logic
+        self.async_logic = async_logic
         # Store the number of parameters the logic function expects
         self.logic_params_count = self._calculate_params_count()
 
@@ -34,19 +58,20 @@ class Step(Generic[StateSchema]):
             # For regular functions
             return self.logic.__code__.co_argcount
 
-    def run(self, state: StateSchema, state_schema: Type[StateSchema], resource: Resource=None) -> StateSchema:
-        # Call logic function with appropriate number of arguments
+    def _logic_args(self, state: StateSchema, resource: Resource) -> tuple:
         if self.logic_params_count == 1:
-            result = self.logic(state)
+            return (state,)
         elif self.logic_params_count == 2:
-            result = self.logic(state, resource)
-        else:
-            raise ValueError(
-                f"Step '{self.step_id}' logic function must accept either 1 argument (state) "
-                f"or 2 arguments (state, resource). Found {self.logic_params_count} arguments."
-            ) 
-        # Get expected fields from the TypedDict
-        expected_fields = get_type_hints(state_schema)
+            return (state, resource)
+        raise ValueError(
+            f"Step '{self.step_id}' logic function must accept either 1 argument (state) "
+            f"or 2 arguments (state, resource). Found {self.logic_params_count} arguments."
+        )
+
+    def _merge(self, state: StateSchema, state_schema: Type[StateSchema], result: Dict,
+               fields: Optional[frozenset] = None) -> StateSchema:
+        # Get expected fields from the TypedDict (precomputed by StateMachine.compile)
+        expected_fields = fields if fields is not None else get_type_hints(state_schema)
         
         # Create new state with all fields from state_schema
         # Only copy fields that are defined in state_schema
@@ -57,6 +82,48 @@ class Step(Generic[StateSchema]):
         
         return cast(StateSchema, updated)
 
+    def run(self, state: StateSchema, state_schema: Type[StateSchema], resource: Resource=None,
+            fields: Optional[frozenset] = None) -> StateSchema:
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        # Call logic function with appropriate number of arguments
+        result = self.logic(*self._logic_args(state, resource))
+        if inspect.isawaitable(result):
+            result = asyncio.run(result)
+        updated = self._merge(state, state_schema, result, fields)
+        record_step(self.step_id, (time.perf_counter() - start) * 1000, (time.thread_time() - cpu_start) * 1000)
+        return updated
+
+    async def arun(self, state: StateSchema, state_schema: Type[StateSchema], resource: Resource = None,
+                   executor: Optional[Executor] = None, fields: Optional[frozenset] = None) -> StateSchema:
+        """
+        Awaitable counterpart of `run`.
+
+        Coroutine logic is awaited on the running loop; blocking logic runs in
+        `executor` (the loop's default thread pool if None) with the caller's
+        context variables, so it never stalls other runs on the loop.
+        """
+        start = time.perf_counter()
+        args = self._logic_args(state, resource)
+        logic = self.async_logic or self.logic
+        if inspect.iscoroutinefunction(logic):
+            result = await logic(*args)
+            cpu_ms = None  # the loop's thread is shared with other tasks
+        else:
+            loop = asyncio.get_running_loop()
+            call = functools.partial(contextvars.copy_context().run, _cpu_timed, logic, *args)
+            result, cpu_ms = await loop.run_in_executor(executor, call)
+            if inspect.isawaitable(result):
+                result = await result
+        updated = self._merge(state, state_schema, result, fields)
+        record_step(self.step_id, (time.perf_counter() - start) * 1000, cpu_ms)
+        return updated
+
+
+def _cpu_timed(logic: Callable, *args) -> Tuple[Any, float]:
+    cpu_start = time.thread_time()
+    result = logic(*args)
+    return result, (time.thread_time() - cpu_start) * 1000
+
 
 class EntryPoint(Step[StateSchema]):
     """Special step that marks the beginning of the workflow.
@@ -72,6 +139,73 @@ class Termination(Step[StateSchema]):
         super().__init__("__termination__", lambda x: {})
 
 
+class Join(Step[StateSchema]):
+    """Step where parallel branches meet.
+
+    When a transition resolves to several targets, each target starts a branch
+    that runs concurrently on its own copy of the state until it reaches a
+    Join step. The fields each branch changed are then merged into the fork
+    state: a field set by a single branch is taken as is, a field set by
+    several branches is combined with its reducer (e.g. `operator.add` for
+    lists). The reducer is folded, in branch order, over what each branch
+    added to the fork value, starting from the fork value: branches that
+    extend a fork list `["seed"]` with "a" and "b" merge to
+    `["seed", "a", "b"]`. Conflicting updates without a reducer raise a
+    ValueError. The merged state is then passed to `logic`."""
+    def __init__(self, step_id: str,
+                 reducers: Optional[Dict[str, Callable[[Any, Any], Any]]] = None,
+                 logic: Optional[Callable[[StateSchema], Dict]] = None):
+        super().__init__(step_id, logic or (lambda x: {}))
+        self.reducers = reducers or {}
+
+    def merge(self, fork_state: StateSchema, branch_states: List[StateSchema]) -> StateSchema:
+        updates: Dict[str, List[Any]] = {}
+        for branch_state in branch_states:
+            for key, value in branch_state.items():
+                if key not in fork_state or fork_state[key] is not value:
+                    updates.setdefault(key, []).append(value)
+
+        merged = {**fork_state}
+        for key, values in updates.items():
+            if len(values) == 1:
+                merged[key] = values[0]
+            elif key in self.reducers:
+                if key in fork_state:
+                    deltas = [_branch_delta(fork_state[key], value) for value in values]
+                    merged[key] = functools.reduce(self.reducers[key], deltas, fork_state[key])
+                else:
+                    merged[key] = functools.reduce(self.reducers[key], values)
+            else:
+                raise ValueError(
+                    f"Join '{self.step_id}': {len(values)} branches updated '{key}'. "
+                    f"Declare a reducer for it."
+                )
+        return cast(StateSchema, merged)
+
+
+def _branch_delta(fork_value: Any, value: Any) -> Any:
+    """What a branch changed in a field, relative to its value at the fork.
+
+    Extended sequences give their new tail, extended dicts their new or
+    changed items and numbers their difference; any other update is taken
+    as a whole.
+    """
+    sequences = (list, tuple, str, PersistentList)
+    if isinstance(value, sequences) and isinstance(fork_value, sequences):
+        size = len(fork_value)
+        if len(value) >= size and list(value[:size]) == list(fork_value):
+            return value[size:]
+        return value
+    if isinstance(value, dict) and isinstance(fork_value, dict):
+        if all(k in value and value[k] == v for k, v in fork_value.items()):
+            return {k: v for k, v in value.items() if k not in fork_value or fork_value[k] is not v}
+        return value
+    if (isinstance(value, (int, float)) and isinstance(fork_value, (int, float))
+            and not isinstance(value, bool) and not isinstance(fork_value, bool)):
+        return value - fork_value
+    return value
+
+
 @dataclass
 class Transition(Generic[StateSchema]):
     source: str
@@ -99,12 +233,18 @@ class Transition(Generic[StateSchema]):
 
 @dataclass
 class Snapshot(Generic[StateSchema]):
-    """Represents a single state snapshot in time"""
+    """Represents a single state snapshot in time
+
+    `state_data` is the full state after the step. Values the step did not
+    change are shared with the previous snapshot and lists are stored as
+    `PersistentList`s, so a snapshot costs O(changes) rather than a deep
+    copy of the whole state; `changes` holds just the fields the step set."""
     snapshot_id: str
     timestamp: datetime
     state_data: StateSchema
     state_schema: Type[StateSchema]
     step_id: str
+    changes: Dict[str, Any] = field(default_factory=dict)
 
     def __str__(self) -> str:
         return f"Snapshot('{self.snapshot_id}') @ [{self.timestamp.strftime('%Y-%m-%d %H:%M:%S.%f')}]: {self.step_id}.State({self.state_data})"
@@ -114,16 +254,71 @@ class Snapshot(Generic[StateSchema]):
 
     @classmethod
     def create(cls, state_data: StateSchema, state_schema: Type[StateSchema],
-               step_id:str) -> 'Snapshot[StateSchema]':
+               step_id:str, changes: Optional[Dict[str, Any]] = None) -> 'Snapshot[StateSchema]':
         return cls(
             snapshot_id=str(uuid.uuid4()),
             timestamp=datetime.now(),
             state_data=state_data,
             state_schema=state_schema,
             step_id=step_id,
+            changes=changes if changes is not None else dict(state_data),
         )
 
 
+@dataclass
+class RetentionPolicy:
+    """Which snapshots a Run keeps in memory.
+
+    - "all" (default): every snapshot, as needed for trajectory evaluation
+    - "last_n": only the `last_n` most recent snapshots
+    - "final_only": only the latest snapshot (enough for `get_final_state`)
+    - "spill": the `last_n` most recent snapshots in memory; older ones are
+      appended, as per-step diffs, to a gzip-compressed log in `spill_dir`
+      and can be read back with `Run.iter_snapshots`. The log is deleted by
+      `Run.close()` or when the run is garbage collected; a pickled run (e.g.
+      in a persistent session store) owns the log instead, until closed."""
+    mode: Literal["all", "last_n", "final_only", "spill"] = "all"
+    last_n: int = 1
+    spill_dir: Optional[str] = None
+
+    def __post_init__(self):
+        if self.mode not in ("all", "last_n", "final_only", "spill"):
+            raise ValueError(f"Unknown retention mode: {self.mode}")
+        if self.last_n < 1:
+            raise ValueError("RetentionPolicy.last_n must be at least 1")
+        if self.mode == "spill" and not self.spill_dir:
+            raise ValueError("RetentionPolicy(mode='spill') requires spill_dir")
+
+    @classmethod
+    def keep_all(cls) -> 'RetentionPolicy':
+        return cls("all")
+
+    @classmethod
+    def keep_last(cls, n: int) -> 'RetentionPolicy':
+        return cls("last_n", last_n=n)
+
+    @classmethod
+    def final_only(cls) -> 'RetentionPolicy':
+        return cls("final_only")
+
+    @classmethod
+    def spill(cls, spill_dir: str, keep_last: int = 1) -> 'RetentionPolicy':
+        return cls("spill", last_n=keep_last, spill_dir=spill_dir)
+
+    @property
+    def capacity(self) -> Optional[int]:
+        if self.mode == "all":
+            return None
+        return 1 if self.mode == "final_only" else self.last_n
+
+
+def _remove_spill_log(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
 @dataclass
 class Run(Generic[StateSchema]):
     """Represents a single execution run of the state machine"""
@@ -131,6 +326,11 @@ class Run(Generic[StateSchema]):
     start_timestamp: datetime
     snapshots: List[Snapshot[StateSchema]] = field(default_factory=list)
     end_timestamp: Optional[datetime] = None
+    retention: RetentionPolicy = field(default_factory=RetentionPolicy)
+    profile: RunProfile = field(default_factory=RunProfile)
+    snapshot_count: int = 0  # Snapshots taken, including dropped/spilled ones
+    spilled_count: int = 0
+    _spilled_state: Dict[str, Any] = field(default_factory=dict, repr=False)
 
     def __str__(self) -> str:
         return f"Run('{self.run_id}')"
@@ -139,10 +339,11 @@ class Run(Generic[StateSchema]):
         return self.__str__()
 
     @classmethod
-    def create(cls) -> 'Run[StateSchema]':
+    def create(cls, retention: Optional[RetentionPolicy] = None) -> 'Run[StateSchema]':
         return cls(
             run_id=str(uuid.uuid4()),
-            start_timestamp=datetime.now()
+            start_timestamp=datetime.now(),
+            retention=retention or RetentionPolicy(),
         )
 
     @property
@@ -151,12 +352,76 @@ class Run(Generic[StateSchema]):
             "run_id": self.run_id,
             "start_timestamp": self.start_timestamp.strftime("%Y-%m-%d %H:%M:%S.%f"),
             "end_timestamp": self.end_timestamp.strftime("%Y-%m-%d %H:%M:%S.%f"),
-            "snapshot_counts": len(self.snapshots)
+            "snapshot_counts": self.snapshot_count
         }
 
+    @property
+    def spill_path(self) -> Optional[str]:
+        if self.retention.mode != "spill":
+            return None
+        return os.path.join(self.retention.spill_dir, f"{self.run_id}.snapshots.gz")
+
     def add_snapshot(self, snapshot: Snapshot[StateSchema]):
-        """Add a new snapshot to this run"""
+        """Add a new snapshot to this run, evicting old ones per the retention policy"""
         self.snapshots.append(snapshot)
+        self.snapshot_count += 1
+
+        capacity = self.retention.capacity
+        if capacity is not None and len(self.snapshots) > capacity:
+            evicted = self.snapshots[:-capacity]
+            del self.snapshots[:-capacity]
+            if self.retention.mode == "spill":
+                self._spill(evicted)
+
+    def _spill(self, snapshots: List[Snapshot[StateSchema]]):
+        os.makedirs(self.retention.spill_dir, exist_ok=True)
+        if self.spilled_count == 0:
+            self._log_finalizer = weakref.finalize(self, _remove_spill_log, self.spill_path)
+        # Each write appends a gzip member; concatenated members form a valid stream
+        with gzip.open(self.spill_path, "ab") as f:
+            for snapshot in snapshots:
+                changes = {
+                    k: v for k, v in snapshot.state_data.items()
+                    if k not in self._spilled_state or self._spilled_state[k] is not v
+                }
+                record = (snapshot.snapshot_id, snapshot.timestamp, snapshot.step_id,
+                          diff_changes(self._spilled_state, changes))
+                pickle.dump(record, f, protocol=5)
+                self._spilled_state = snapshot.state_data
+                self.spilled_count += 1
+
+    def iter_snapshots(self):
+        """Yield every snapshot of the run in order, including spilled ones"""
+        if self.spilled_count:
+            schema = self.snapshots[0].state_schema if self.snapshots else None
+            state: Dict[str, Any] = {}
+            with gzip.open(self.spill_path, "rb") as f:
+                for _ in range(self.spilled_count):
+                    snapshot_id, timestamp, step_id, encoded = pickle.load(f)
+                    state = apply_changes(state, encoded)
+                    changes = {k: state[k] for k in encoded}
+                    yield Snapshot(snapshot_id, timestamp, state, schema, step_id, changes)
+        yield from self.snapshots
+
+    def close(self):
+        """Delete the spilled snapshot log; only the in-memory snapshots remain"""
+        finalizer = getattr(self, "_log_finalizer", None)
+        if finalizer is not None:
+            finalizer.detach()
+            self._log_finalizer = None
+        if self.spill_path is not None:
+            _remove_spill_log(self.spill_path)
+        self.spilled_count = 0
+        self._spilled_state = {}
+
+    def __getstate__(self):
+        # The pickled copy outlives this object: it takes over the spill log
+        state = self.__dict__.copy()
+        finalizer = state.pop("_log_finalizer", None)
+        if finalizer is not None:
+            finalizer.detach()
+            self._log_finalizer = None
+        return state
 
     def complete(self):
         """Mark this run as complete"""
@@ -169,9 +434,38 @@ class Run(Generic[StateSchema]):
         return self.snapshots[-1].state_data
 
 
+@dataclass(frozen=True)
+class Node(Generic[StateSchema]):
+    """A step of a compiled plan with its outgoing edges"""
+    step: Step[StateSchema]
+    kind: Literal["entry", "step", "join", "termination"]
+    transitions: Tuple[Transition[StateSchema], ...]
+    # Targets when every outgoing transition is unconditional
+    static_targets: Optional[List[str]]
+
+    def next_steps(self, state: StateSchema) -> List[str]:
+        if self.static_targets is not None:
+            return self.static_targets
+        next_steps: List[str] = []
+        for t in self.transitions:
+            next_steps += t.resolve(state)
+        return next_steps
+
+
+@dataclass(frozen=True)
+class ExecutionPlan(Generic[StateSchema]):
+    """Validated, precomputed view of a StateMachine graph"""
+    fields: frozenset
+    entry_id: str
+    nodes: Dict[str, Node[StateSchema]]
+
+
 class StateMachine(Generic[StateSchema]):
-    def __init__(self, state_schema: Type[StateSchema]):
+    def __init__(self, state_schema: Type[StateSchema], retention: Optional[RetentionPolicy] = None):
         self.state_schema = state_schema
+        # Default snapshot retention for runs; can be overridden per run
+        self.retention = retention or RetentionPolicy()
+        self._plan: Optional[ExecutionPlan[StateSchema]] = None
         self.steps: Dict[str, Step[StateSchema]] = {}
         self.transitions: Dict[str, List[Transition[StateSchema]]] = {}
 
@@ -186,6 +480,7 @@ class StateMachine(Generic[StateSchema]):
         """Add steps to the workflow"""
         for step in steps:
             self.steps[step.step_id] = step
+        self._plan = None
 
     def connect(
         self,
@@ -200,58 +495,236 @@ class StateMachine(Generic[StateSchema]):
         if src_id not in self.transitions:
             self.transitions[src_id] = []
         self.transitions[src_id].append(transition)
-
-    def run(self, state: StateSchema, resource: Resource = None):
-        # Validate that state has at least one field from the schema
-        expected_fields = get_type_hints(self.state_schema)
-        state_fields = set(state.keys())
-        common_fields = state_fields.intersection(expected_fields)
-        
-        if not common_fields:
-            raise ValueError(f"Initial state must have at least one field from the schema. Expected fields: {list(expected_fields.keys())}")
-
+        self._plan = None
+
+    def compile(self) -> ExecutionPlan[StateSchema]:
+        """
+        Validate the graph once and precompute what every run needs.
+
+        Resolves the schema fields and the entry step, checks that every
+        transition connects known steps and that every non-terminal step
+        reachable from the entry point has an outgoing transition, and builds an adjacency table so that running
+        a step costs a dict lookup. Called lazily by `run`/`arun`; the plan is
+        invalidated by `add_steps` and `connect`.
+        """
         entry_points = [s for s in self.steps.values() if isinstance(s, EntryPoint)]
         if not entry_points:
             raise Exception("No EntryPoint step found in workflow")
         if len(entry_points) > 1:
             raise Exception("Multiple EntryPoint steps found in workflow")
-        
-        # Create a new run for this execution
-        current_run = Run.create()
-        
-        current_step_id = entry_points[0].step_id        
 
-        while current_step_id:
-            step = self.steps[current_step_id]
+        for step_id, transitions in self.transitions.items():
+            for t in transitions:
+                unknown = [target for target in t.targets if target not in self.steps]
+                if unknown:
+                    raise ValueError(f"[StateMachine] Transition from '{step_id}' to unknown step(s): {unknown}")
+
+        # Dead ends only matter where a run can get to
+        reachable = {entry_points[0].step_id}
+        frontier = [entry_points[0].step_id]
+        while frontier:
+            for t in self.transitions.get(frontier.pop(), []):
+                for target in t.targets:
+                    if target not in reachable:
+                        reachable.add(target)
+                        frontier.append(target)
+
+        nodes: Dict[str, Node[StateSchema]] = {}
+        for step_id, step in self.steps.items():
+            transitions = tuple(self.transitions.get(step_id, []))
             if isinstance(step, Termination):
-                print(f"[StateMachine] Terminating: {current_step_id}")
-                break
-            
-            # Replace state entirely
-            state = step.run(state, self.state_schema, resource)  
-
-            if isinstance(step, EntryPoint):
-                print(f"[StateMachine] Starting: {current_step_id}")
+                kind = "termination"
+            elif not transitions and step_id in reachable:
+                raise Exception(f"[StateMachine] No transitions found from step: {step_id}")
             else:
-                print(f"[StateMachine] Executing step: {current_step_id}")
+                kind = "entry" if isinstance(step, EntryPoint) else "join" if isinstance(step, Join) else "step"
 
-            # Create and add snapshot to the current run
-            snapshot = Snapshot.create(copy.deepcopy(state), self.state_schema, current_step_id)
-            current_run.add_snapshot(snapshot)
+            static_targets = None
+            if all(t.condition is None for t in transitions):
+                static_targets = [target for t in transitions for target in t.targets]
+            nodes[step_id] = Node(step, kind, transitions, static_targets)
 
-            transitions = self.transitions.get(current_step_id, [])
-            next_steps: List[str] = []
+        unknown_sources = [source for source in self.transitions if source not in self.steps]
+        if unknown_sources:
+            raise ValueError(f"[StateMachine] Transitions from unknown step(s): {unknown_sources}")
 
-            for t in transitions:
-                next_steps += t.resolve(state)
+        self._plan = ExecutionPlan(
+            fields=frozenset(get_type_hints(self.state_schema)),
+            entry_id=entry_points[0].step_id,
+            nodes=nodes,
+        )
+        return self._plan
 
-            if not next_steps:
-                raise Exception(f"[StateMachine] No transitions found from step: {current_step_id}")
+    @property
+    def plan(self) -> ExecutionPlan[StateSchema]:
+        return self._plan or self.compile()
 
-            if len(next_steps) > 1:
-                raise NotImplementedError("Parallel execution not implemented yet.")
+    def _entry_step_id(self, state: StateSchema) -> str:
+        plan = self.plan
+        # Validate that state has at least one field from the schema
+        if plan.fields.isdisjoint(state):
+            raise ValueError(f"Initial state must have at least one field from the schema. Expected fields: {sorted(plan.fields)}")
+        return plan.entry_id
+
+    def _record(self, current_run: Run[StateSchema], node: Node[StateSchema], state: StateSchema) -> StateSchema:
+        """Snapshot the state produced by `node`; returns the frozen state to continue with."""
+        current_step_id = node.step.step_id
+        if node.kind == "entry":
+            logger.debug("Starting: %s", current_step_id)
+        else:
+            logger.debug("Executing step: %s", current_step_id)
+
+        # Share unchanged values with the previous snapshot instead of deep copying
+        previous = current_run.snapshots[-1].state_data if current_run.snapshots else {}
+        state, changes = freeze_state(state, previous)
+        snapshot = Snapshot.create({**state}, self.state_schema, current_step_id, changes)
+        current_run.add_snapshot(snapshot)
+        return cast(StateSchema, state)
+
+    @staticmethod
+    def _trace_changes(span, before: StateSchema, current_run: Run[StateSchema]):
+        changes = current_run.snapshots[-1].changes
+        span.set(changed_fields=list(changes), state_size_delta=state_size_delta(before, changes))
+
+    def _next_steps(self, node: Node[StateSchema], state: StateSchema) -> List[str]:
+        next_steps = node.next_steps(state)
+        if not next_steps:
+            raise Exception(f"[StateMachine] No transitions found from step: {node.step.step_id}")
+        return next_steps
+
+    def _join_of(self, branch_ends: List[Tuple[StateSchema, Optional[str]]], targets: List[str]) -> Join:
+        join_ids = {step_id for _, step_id in branch_ends}
+        if len(join_ids) != 1 or None in join_ids:
+            raise Exception(f"[StateMachine] Parallel branches {targets} must all end at the same Join step")
+        return cast(Join, self.plan.nodes[join_ids.pop()].step)
+
+    def _fork(self, state: StateSchema, targets: List[str], current_run: Run[StateSchema],
+              resource: Resource) -> Tuple[StateSchema, str]:
+        """Run `targets` in parallel threads and merge them at their Join."""
+        logger.debug("Forking: %s", targets)
+        branch_runs = [Run.create() for _ in targets]
+        with get_tracer().span("fork", kind="fork", targets=targets), \
+                ThreadPoolExecutor(max_workers=len(targets)) as pool:
+            futures = [
+                pool.submit(contextvars.copy_context().run, self._execute,
+                            {**state}, target, branch_run, resource, True)
+                for target, branch_run in zip(targets, branch_runs)
+            ]
+            branch_ends = [future.result() for future in futures]
+
+        for branch_run in branch_runs:
+            for snapshot in branch_run.snapshots:
+                current_run.add_snapshot(snapshot)
+        join = self._join_of(branch_ends, targets)
+        return join.merge(state, [branch_state for branch_state, _ in branch_ends]), join.step_id
+
+    def _execute(self, state: StateSchema, current_step_id: str, current_run: Run[StateSchema],
+                 resource: Resource, in_branch: bool = False) -> Tuple[StateSchema, Optional[str]]:
+        """Run steps from `current_step_id`; inside a branch, stop at the next Join."""
+        nodes, fields = self.plan.nodes, self.plan.fields
+        tracer = get_tracer()
+        joined = False
+        while current_step_id:
+            node = nodes[current_step_id]
+            if node.kind == "termination":
+                logger.debug("Terminating: %s", current_step_id)
+                return state, None
+            if in_branch and node.kind == "join" and not joined:
+                return state, current_step_id
+            
+            with tracer.span(current_step_id, kind="step", step_id=current_step_id) as span:
+                # Replace state entirely
+                before = state
+                state = node.step.run(state, self.state_schema, resource, fields)  
+                state = self._record(current_run, node, state)
+                if span is not None:
+                    self._trace_changes(span, before, current_run)
+
+            next_steps = self._next_steps(node, state)
+            joined = len(next_steps) > 1
+            if joined:
+                state, current_step_id = self._fork(state, next_steps, current_run, resource)
+            else:
+                current_step_id = next_steps[0]
+        return state, None
 
-            current_step_id = next_steps[0]
+    def run(self, state: StateSchema, resource: Resource = None,
+            retention: Optional[RetentionPolicy] = None):
+        current_step_id = self._entry_step_id(state)
+        
+        # Create a new run for this execution
+        current_run = Run.create(retention or self.retention)
+        with get_tracer().span("run", kind="run", run_id=current_run.run_id), profiling(current_run.profile):
+            self._execute(state, current_step_id, current_run, resource)
+        current_run.complete()
+        return current_run
 
+    async def _afork(self, state: StateSchema, targets: List[str], current_run: Run[StateSchema],
+                     resource: Resource, executor: Optional[Executor]) -> Tuple[StateSchema, str]:
+        logger.debug("Forking: %s", targets)
+        branch_runs = [Run.create() for _ in targets]
+        with get_tracer().span("fork", kind="fork", targets=targets):
+            branch_ends = await asyncio.gather(*(
+                self._aexecute({**state}, target, branch_run, resource, executor, True)
+                for target, branch_run in zip(targets, branch_runs)
+            ))
+
+        for branch_run in branch_runs:
+            for snapshot in branch_run.snapshots:
+                current_run.add_snapshot(snapshot)
+        join = self._join_of(branch_ends, targets)
+        return join.merge(state, [branch_state for branch_state, _ in branch_ends]), join.step_id
+
+    async def _aexecute(self, state: StateSchema, current_step_id: str, current_run: Run[StateSchema],
+                        resource: Resource, executor: Optional[Executor],
+                        in_branch: bool = False) -> Tuple[StateSchema, Optional[str]]:
+        nodes, fields = self.plan.nodes, self.plan.fields
+        tracer = get_tracer()
+        joined = False
+        while current_step_id:
+            node = nodes[current_step_id]
+            if node.kind == "termination":
+                logger.debug("Terminating: %s", current_step_id)
+                return state, None
+            if in_branch and node.kind == "join" and not joined:
+                return state, current_step_id
+
+            with tracer.span(current_step_id, kind="step", step_id=current_step_id) as span:
+                before = state
+                if node.kind == "entry":
+                    # No-op: not worth a trip through the executor
+                    state = node.step.run(state, self.state_schema, resource, fields)
+                else:
+                    state = await node.step.arun(state, self.state_schema, resource, executor, fields)
+                state = self._record(current_run, node, state)
+                if span is not None:
+                    self._trace_changes(span, before, current_run)
+
+            next_steps = self._next_steps(node, state)
+            joined = len(next_steps) > 1
+            if joined:
+                state, current_step_id = await self._afork(state, next_steps, current_run, resource, executor)
+            else:
+                current_step_id = next_steps[0]
+        return state, None
+
+    async def arun(self, state: StateSchema, resource: Resource = None,
+                   executor: Optional[Executor] = None,
+                   retention: Optional[RetentionPolicy] = None):
+        """
+        Execute the workflow without blocking the event loop.
+
+        Produces the same `Run`/`Snapshot` history as `run`. Steps with
+        `async def` logic (or an `async_logic` variant) are awaited directly;
+        synchronous steps are offloaded to `executor` (default: the loop's
+        thread pool). Parallel branches run as concurrent tasks. Many runs can
+        therefore be multiplexed on one loop:
+
+            runs = await asyncio.gather(*(machine.arun(s) for s in states))
+        """
+        current_step_id = self._entry_step_id(state)
+        current_run = Run.create(retention or self.retention)
+        with get_tracer().span("run", kind="run", run_id=current_run.run_id), profiling(current_run.profile):
+            await self._aexecute(state, current_step_id, current_run, resource, executor)
         current_run.complete()
         return current_run
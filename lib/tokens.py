@@ -0,0 +1,157 @@
+"""Local token counting, prompt budgets and cost accounting.
+
+Prompt sizes are estimated without calling the API: with `tiktoken` when it
+is installed, otherwise with a characters-per-token heuristic that is close
+enough for budgeting. Token counts are memoized per text, so re-counting a
+growing conversation only tokenizes the messages added since the last call.
+
+`MODEL_PRICES` holds the USD price per million prompt and completion tokens
+used by `estimate_cost`.
+"""
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+from functools import lru_cache
+import json
+import logging
+import re
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - fall back to the heuristic counter
+    tiktoken = None
+
+from lib.messages import BaseMessage
+from lib.resources import registry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+# Chat format overhead per message and for priming the reply
+# (see OpenAI's "How to count tokens with tiktoken")
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_NAME = 1
+REPLY_PRIMING_TOKENS = 3
+
+# USD per 1M (prompt, completion) tokens; dated snapshots share their model's entry
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "o4-mini": (1.10, 4.40),
+    "o3-mini": (1.10, 4.40),
+    "o3": (2.00, 8.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+
+MODEL_CONTEXT_WINDOWS: Dict[str, int] = {
+    "gpt-4o-mini": 128_000,
+    "gpt-4o": 128_000,
+    "gpt-4.1-nano": 1_047_576,
+    "gpt-4.1-mini": 1_047_576,
+    "gpt-4.1": 1_047_576,
+    "o4-mini": 200_000,
+    "o3-mini": 200_000,
+    "o3": 200_000,
+    "gpt-3.5-turbo": 16_385,
+}
+
+
+class PromptBudgetExceeded(ValueError):
+    """Raised before sending a request whose prompt exceeds its token budget"""
+
+    def __init__(self, prompt_tokens: int, budget: int, model: str):
+        super().__init__(f"Prompt of ~{prompt_tokens} tokens exceeds the budget of {budget} tokens for '{model}'")
+        self.prompt_tokens = prompt_tokens
+        self.budget = budget
+
+
+# Snapshot suffixes: gpt-4o-2024-08-06, gpt-3.5-turbo-0125
+_SNAPSHOT_SUFFIX = re.compile(r"-(\d{4}-\d{2}-\d{2}|\d{4})$")
+
+
+def _lookup(table: Dict[str, Any], model: str) -> Optional[Any]:
+    """Entry for `model` or, for a dated snapshot (e.g. gpt-4o-2024-08-06), its base model."""
+    if model in table:
+        return table[model]
+    return table.get(_SNAPSHOT_SUFFIX.sub("", model))
+
+
+def context_window(model: str) -> Optional[int]:
+    """Context window size of `model` in tokens, if known."""
+    return _lookup(MODEL_CONTEXT_WINDOWS, model)
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """USD cost of a call, priced as `gpt-4o-mini` when the model is unknown."""
+    prompt_price, completion_price = _lookup(MODEL_PRICES, model) or MODEL_PRICES[DEFAULT_MODEL]
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+def heuristic_tokens(text: str) -> int:
+    """Rough token count of `text` (about four characters per token)."""
+    return (len(text) + 3) // 4
+
+
+class TokenCounter:
+    """
+    Counts prompt tokens for one model.
+
+    Args:
+        model: Model whose tokenizer is used (the heuristic without tiktoken)
+        cache_size: Number of distinct texts whose counts are memoized
+    """
+
+    def __init__(self, model: str = DEFAULT_MODEL, cache_size: int = 65_536):
+        self.model = model
+        self.encoding = None
+        if tiktoken is not None:
+            # Loading an encoding downloads its BPE file on first use; offline
+            # hosts fall back to the generic encoding, then to the heuristic.
+            try:
+                self.encoding = tiktoken.encoding_for_model(model)
+            except Exception:
+                try:
+                    self.encoding = tiktoken.get_encoding("o200k_base")
+                except Exception:
+                    logger.warning("No tiktoken encoding available for '%s'; estimating tokens", model)
+        encode = self.encoding.encode if self.encoding is not None else None
+        self._count = lru_cache(maxsize=cache_size)(
+            (lambda text: len(encode(text))) if encode is not None else heuristic_tokens
+        )
+
+    @property
+    def exact(self) -> bool:
+        """Whether counts come from the model's tokenizer rather than the heuristic"""
+        return self.encoding is not None
+
+    def text_tokens(self, text: Optional[str]) -> int:
+        return self._count(text) if text else 0
+
+    def message_tokens(self, message: BaseMessage) -> int:
+        """Prompt tokens taken by `message`, tool calls and chat format included."""
+        tokens = TOKENS_PER_MESSAGE + self.text_tokens(message.content)
+        if getattr(message, "name", None):
+            tokens += TOKENS_PER_NAME + self.text_tokens(message.name)
+        for call in getattr(message, "tool_calls", None) or []:
+            tokens += self.text_tokens(call.function.name) + self.text_tokens(call.function.arguments)
+        return tokens
+
+    def count_messages(self, messages: Iterable[BaseMessage]) -> int:
+        return sum(self.message_tokens(m) for m in messages) + REPLY_PRIMING_TOKENS
+
+    def tool_tokens(self, tool_schemas: Sequence[Dict[str, Any]]) -> int:
+        """Approximate prompt tokens taken by tool definitions."""
+        if not tool_schemas:
+            return 0
+        return self.text_tokens(json.dumps(tool_schemas, sort_keys=True))
+
+    def count_prompt(self, messages: Iterable[BaseMessage],
+                     tool_schemas: Sequence[Dict[str, Any]] = ()) -> int:
+        return self.count_messages(messages) + self.tool_tokens(tool_schemas)
+
+
+def get_token_counter(model: str = DEFAULT_MODEL) -> TokenCounter:
+    """Return the shared TokenCounter for `model`."""
+    return registry.get_or_create(("token_counter", model), lambda: TokenCounter(model))
@@ -6,6 +6,9 @@ from typing import (
     get_type_hints, get_origin, get_args,
 )
 from functools import wraps
+
+from lib.tracing import get_tracer
+from lib.profiling import timed_tool_call
 try:
     from openai.types.chat.chat_completion_message_tool_call import ChatCompletionMessageToolCall
 except Exception:  # pragma: no cover - openai may not be installed
@@ -21,11 +24,13 @@ class Tool:
         self,
         func: Callable,
         name: Optional[str] = None,
-        description: Optional[str] = None
+        description: Optional[str] = None,
+        timeout: Optional[float] = None
     ):
         self.func = func
         self.name = name or func.__name__
         self.description = description or inspect.getdoc(func)
+        self.timeout = timeout  # seconds; overrides the agent's default tool timeout
         self.signature = inspect.signature(func, eval_str=True)
         self.type_hints = get_type_hints(func)
 
@@ -107,7 +112,8 @@ class Tool:
         }
 
     def __call__(self, *args, **kwargs):
-        return self.func(*args, **kwargs)
+        with get_tracer().span(self.name, kind="tool", tool=self.name), timed_tool_call(self.name):
+            return self.func(*args, **kwargs)
 
     def __repr__(self):
         return f"<Tool name={self.name} params={[p['name'] for p in self.parameters]}>"
@@ -118,12 +124,12 @@ class Tool:
 
 
 
-def tool(func=None, *, name: str = None, description: str = None):
+def tool(func=None, *, name: str = None, description: str = None, timeout: float = None):
     def wrapper(f):
         @wraps(f)
         def wrapped(*args, **kwargs):
             return f(*args, **kwargs)
-        return Tool(f, name=name, description=description)
+        return Tool(f, name=name, description=description, timeout=timeout)
     
-    # @tool ou @tool(name="foo")
-    return wrapper(func) if func else wrapper
\ No newline at end of file
+    # @tool ou @tool(name="foo", timeout=10)
+    return wrapper(func) if func else wrapper
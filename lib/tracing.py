@@ -0,0 +1,226 @@
+"""Pluggable tracing for workflows, LLM calls and tools.
+
+Instrumented code asks `get_tracer()` for the active tracer and wraps units
+of work in spans:
+
+    with get_tracer().span("retrieve", kind="step", step_id="retrieve") as span:
+        ...
+        if span is not None:
+            span.set(results=3)
+
+The default tracer is a no-op whose `span()` returns a shared null context,
+so instrumentation costs a function call when tracing is off. A
+`RecordingTracer` times spans, links them to their parent through context
+variables (which also follow worker threads and asyncio tasks started by the
+state machine) and hands finished spans to exporters such as
+`JSONLExporter` or `RingBufferExporter`.
+
+`use_tracer()` scopes a tracer to the current context, e.g. one Streamlit
+session, without touching other concurrent sessions.
+"""
+from typing import Any, Dict, Iterator, List, Optional
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+import contextvars
+import json
+import threading
+import time
+import uuid
+
+
+@dataclass
+class Span:
+    """A timed unit of work (run, step, LLM call, tool call, ...)"""
+    name: str
+    kind: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_time: float
+    end_time: Optional[float] = None
+    cpu_time: Optional[float] = None
+    status: str = "ok"
+    error: Optional[str] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.end_time is None:
+            return None
+        return (self.end_time - self.start_time) * 1000
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration_ms": self.duration_ms,
+            "cpu_time_ms": self.cpu_time * 1000 if self.cpu_time is not None else None,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+_NULL_SPAN = nullcontext(None)
+
+
+class Tracer:
+    """No-op tracer; the default when tracing is not configured."""
+
+    enabled = False
+
+    def span(self, name: str, kind: str = "internal", **attributes):
+        return _NULL_SPAN
+
+    def event(self, name: str, **attributes):
+        pass
+
+
+class RecordingTracer(Tracer):
+    """
+    Tracer that records spans and passes them to exporters when they end.
+
+    Args:
+        exporters: Objects with an `export(span)` method
+    """
+
+    enabled = True
+
+    def __init__(self, exporters: Optional[List[Any]] = None):
+        self.exporters = list(exporters or [])
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", **attributes) -> Iterator[Span]:
+        parent = _current_span.get()
+        span = Span(
+            name=name,
+            kind=kind,
+            trace_id=parent.trace_id if parent else str(uuid.uuid4()),
+            span_id=uuid.uuid4().hex[:16],
+            parent_id=parent.span_id if parent else None,
+            start_time=time.time(),
+            attributes=attributes,
+        )
+        token = _current_span.set(span)
+        cpu_start = time.thread_time()
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.error = repr(e)
+            raise
+        finally:
+            span.cpu_time = time.thread_time() - cpu_start
+            span.end_time = time.time()
+            _current_span.reset(token)
+            self._export(span)
+
+    def event(self, name: str, **attributes):
+        """Record an instantaneous span."""
+        with self.span(name, kind="event", **attributes):
+            pass
+
+    def _export(self, span: Span):
+        for exporter in self.exporters:
+            exporter.export(span)
+
+
+class JSONLExporter:
+    """Append finished spans as JSON lines to `path`."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class RingBufferExporter:
+    """Keep the `capacity` most recent spans in memory."""
+
+    def __init__(self, capacity: int = 1000):
+        self._spans: deque = deque(maxlen=capacity)
+
+    def export(self, span: Span):
+        self._spans.append(span)
+
+    def spans(self, trace_id: Optional[str] = None) -> List[Span]:
+        spans = list(self._spans)
+        if trace_id is not None:
+            spans = [s for s in spans if s.trace_id == trace_id]
+        return spans
+
+    def clear(self):
+        self._spans.clear()
+
+
+_default_tracer: Tracer = Tracer()
+_context_tracer: contextvars.ContextVar[Optional[Tracer]] = contextvars.ContextVar("tracer", default=None)
+
+
+def get_tracer() -> Tracer:
+    """Return the tracer for the current context (the global one by default)."""
+    return _context_tracer.get() or _default_tracer
+
+
+def set_tracer(tracer: Optional[Tracer]):
+    """Install `tracer` process-wide; None restores the no-op tracer."""
+    global _default_tracer
+    _default_tracer = tracer or Tracer()
+
+
+@contextmanager
+def use_tracer(tracer: Tracer) -> Iterator[Tracer]:
+    """Use `tracer` for everything run in the current context."""
+    token = _context_tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _context_tracer.reset(token)
+
+
+def state_size_delta(before: Dict[str, Any], changes: Dict[str, Any]) -> int:
+    """Net change in item count of the sized values a step changed."""
+    delta = 0
+    for key, value in changes.items():
+        old = before.get(key)
+        if hasattr(value, "__len__") and not isinstance(value, str):
+            delta += len(value) - (len(old) if hasattr(old, "__len__") and not isinstance(old, str) else 0)
+    return delta
+
+
+def format_spans(spans: List[Span]) -> str:
+    """Render spans as an indented tree, one line per span, in start order."""
+    children: Dict[Optional[str], List[Span]] = {}
+    ids = {s.span_id for s in spans}
+    for span in sorted(spans, key=lambda s: s.start_time):
+        parent = span.parent_id if span.parent_id in ids else None
+        children.setdefault(parent, []).append(span)
+
+    lines: List[str] = []
+
+    def render(span: Span, depth: int):
+        attributes = ", ".join(f"{k}={v}" for k, v in span.attributes.items())
+        status = "" if span.status == "ok" else f" [{span.status}: {span.error}]"
+        lines.append(f"{'  ' * depth}{span.kind}:{span.name} {span.duration_ms or 0:.1f}ms"
+                     f"{status}{' (' + attributes + ')' if attributes else ''}")
+        for child in children.get(span.span_id, []):
+            render(child, depth + 1)
+
+    for root in children.get(None, []):
+        render(root, 0)
+    return "\n".join(lines)
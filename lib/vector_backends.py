@@ -0,0 +1,619 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+from abc import ABC, abstractmethod
+import json
+import os
+import threading
+import uuid
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is required by the local engine only
+    np = None
+
+try:
+    from chromadb.api.models.Collection import Collection as ChromaCollection
+except ImportError:  # pragma: no cover - allow running without chromadb
+    ChromaCollection = None
+
+
+DEFAULT_INCLUDE = ("documents", "metadatas", "distances")
+
+
+class VectorBackend(ABC):
+    """
+    Storage and search engine behind a VectorStore.
+
+    The interface is the subset of the Chroma `Collection` API that VectorStore
+    relies on, so a Chroma collection is itself a valid backend (it is
+    registered as a virtual subclass below) and other engines only need to
+    reproduce the same call signatures and result shapes.
+    """
+
+    @property
+    @abstractmethod
+    def id(self) -> str:
+        """Stable identifier of the collection; changes when it is recreated."""
+
+    @abstractmethod
+    def add(self, ids: List[str], documents: Optional[List[str]] = None,
+            metadatas: Optional[List[Dict]] = None, embeddings: Optional[Any] = None):
+        pass
+
+    @abstractmethod
+    def upsert(self, ids: List[str], documents: Optional[List[str]] = None,
+               metadatas: Optional[List[Dict]] = None, embeddings: Optional[Any] = None):
+        pass
+
+    @abstractmethod
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None):
+        pass
+
+    @abstractmethod
+    def query(self, query_embeddings: Optional[Any] = None,
+              query_texts: Optional[List[str]] = None,
+              n_results: int = 10,
+              where: Optional[Dict[str, Any]] = None,
+              where_document: Optional[Dict[str, Any]] = None,
+              include: Sequence[str] = DEFAULT_INCLUDE) -> Dict[str, Any]:
+        pass
+
+    @abstractmethod
+    def get(self, ids: Optional[List[str]] = None,
+            where: Optional[Dict[str, Any]] = None,
+            limit: Optional[int] = None,
+            offset: Optional[int] = None,
+            where_document: Optional[Dict[str, Any]] = None,
+            include: Sequence[str] = ("documents", "metadatas")) -> Dict[str, Any]:
+        pass
+
+    @abstractmethod
+    def count(self) -> int:
+        pass
+
+
+if ChromaCollection is not None:
+    VectorBackend.register(ChromaCollection)
+
+
+def _compare(operator: str, value: Any, expected: Any) -> bool:
+    try:
+        if operator == "$eq":
+            return value == expected
+        if operator == "$ne":
+            return value != expected
+        if operator == "$gt":
+            return value is not None and value > expected
+        if operator == "$gte":
+            return value is not None and value >= expected
+        if operator == "$lt":
+            return value is not None and value < expected
+        if operator == "$lte":
+            return value is not None and value <= expected
+        if operator == "$in":
+            return value in expected
+        if operator == "$nin":
+            return value not in expected
+    except TypeError:
+        return False
+    raise ValueError(f"Unsupported where operator: {operator}")
+
+
+def matches_where(metadata: Optional[Dict[str, Any]], where: Optional[Dict[str, Any]]) -> bool:
+    """
+    Evaluate a Chroma-style metadata filter against one metadata dict.
+
+    Supports `$and`/`$or`, implicit equality (`{"field": value}`) and the
+    `$eq`, `$ne`, `$gt`, `$gte`, `$lt`, `$lte`, `$in` and `$nin` operators.
+    """
+    if not where:
+        return True
+    metadata = metadata or {}
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            if not all(_compare(op, value, expected) for op, expected in condition.items()):
+                return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+def matches_where_document(document: Optional[str], where_document: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a Chroma-style `$contains`/`$not_contains` document filter."""
+    if not where_document:
+        return True
+    document = document or ""
+    for key, condition in where_document.items():
+        if key == "$and":
+            if not all(matches_where_document(document, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where_document(document, clause) for clause in condition):
+                return False
+        elif key == "$contains":
+            if condition not in document:
+                return False
+        elif key == "$not_contains":
+            if condition in document:
+                return False
+        else:
+            raise ValueError(f"Unsupported where_document operator: {key}")
+    return True
+
+
+class _IVFIndex:
+    """
+    Inverted-file index for approximate nearest neighbour search.
+
+    Rows are partitioned into `n_lists` clusters by spherical k-means. A query
+    is compared with the cluster centroids first and then exactly with the
+    rows of the `n_probe` closest clusters only, so each search touches
+    roughly `n_probe / n_lists` of the collection while every step stays a
+    vectorized matrix product. Vectors are expected to be L2-normalized.
+    """
+
+    def __init__(self, centroids: "np.ndarray", n_probe: int = 16):
+        self.centroids = centroids
+        self.n_probe = n_probe
+        self.labels = np.zeros(0, dtype=np.int32)
+        self._lists: List[List[int]] = [[] for _ in range(len(centroids))]
+        self._arrays: Dict[int, "np.ndarray"] = {}
+
+    @classmethod
+    def train(cls, vectors: "np.ndarray", n_lists: int, n_probe: int = 16,
+              iterations: int = 10, seed: int = 0) -> "_IVFIndex":
+        rng = np.random.default_rng(seed)
+        sample_size = min(len(vectors), n_lists * 64)
+        sample = vectors[np.sort(rng.choice(len(vectors), size=sample_size, replace=False))]
+        centroids = sample[rng.choice(sample_size, size=n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            order = np.argsort(labels, kind="stable")
+            present, starts = np.unique(labels[order], return_index=True)
+            sums = np.zeros_like(centroids)
+            sums[present] = np.add.reduceat(sample[order], starts, axis=0)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            centroids = np.where(empty[:, None], centroids, sums / np.where(norms == 0, 1.0, norms))
+        return cls(centroids.astype(np.float32), n_probe)
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def assign(self, vectors: "np.ndarray", start: int, block_size: int = 8192):
+        """Assign rows `start..len(vectors)` to their closest cluster."""
+        labels = [self.labels]
+        for block_start in range(start, len(vectors), block_size):
+            block = vectors[block_start:block_start + block_size]
+            block_labels = np.argmax(block @ self.centroids.T, axis=1).astype(np.int32)
+            for offset, label in enumerate(block_labels.tolist()):
+                self._lists[label].append(block_start + offset)
+                self._arrays.pop(label, None)
+            labels.append(block_labels)
+        self.labels = np.concatenate(labels)
+
+    def load_labels(self, labels: "np.ndarray"):
+        self.labels = np.asarray(labels, dtype=np.int32)
+        order = np.argsort(self.labels, kind="stable")
+        bounds = np.searchsorted(self.labels[order], np.arange(len(self.centroids) + 1))
+        self._lists = [order[bounds[i]:bounds[i + 1]].tolist() for i in range(len(self.centroids))]
+        self._arrays = {}
+
+    def _rows(self, label: int) -> "np.ndarray":
+        rows = self._arrays.get(label)
+        if rows is None:
+            rows = self._arrays[label] = np.asarray(self._lists[label], dtype=np.int64)
+        return rows
+
+    def candidates(self, query: "np.ndarray", n_probe: int) -> "np.ndarray":
+        n_probe = min(n_probe, len(self.centroids))
+        sims = self.centroids @ query
+        probed = np.argpartition(-sims, n_probe - 1)[:n_probe]
+        return np.concatenate([self._rows(int(label)) for label in probed])
+
+
+class LocalVectorIndex(VectorBackend):
+    """
+    In-process vector index backed by a contiguous float32 matrix.
+
+    Small collections are searched exactly with one vectorized cosine
+    similarity product and a partial sort. Distances are cosine distances
+    (`1 - cosine similarity`, in [0, 2]); Chroma collections default to
+    squared L2 instead, so compare distances only within one backend (see
+    `VectorStore.distance_metric`). Once a collection reaches
+    `ann_threshold` rows, queries switch to an approximate inverted-file
+    (k-means partition) index. Metadata (`where`) and document (`where_document`)
+    filters follow Chroma's syntax; selective filters are answered exactly
+    over the matching rows only.
+
+    When a `path` is given the index is persisted there by `persist()`:
+    vectors and cluster assignments are written as raw arrays that are memory-mapped
+    on load, so reopening a large index is instant and pages are read lazily.
+
+    Args:
+        name (str): Collection name
+        embedding_function (Optional[Callable]): Maps a list of texts to
+            embeddings; required unless embeddings are always passed explicitly
+        path (Optional[str]): Directory to persist the index to
+        ann_threshold (int): Row count from which the approximate index is used
+        n_lists (Optional[int]): Number of clusters (about sqrt(rows) when omitted)
+        n_probe (int): Clusters scanned per query; higher is slower but more exact
+    """
+
+    def __init__(self, name: str,
+                 embedding_function: Optional[Callable[[List[str]], Any]] = None,
+                 path: Optional[str] = None,
+                 ann_threshold: int = 50_000,
+                 n_lists: Optional[int] = None,
+                 n_probe: int = 16):
+        if np is None:  # pragma: no cover - dependency unavailable
+            raise ImportError("numpy package is required for LocalVectorIndex")
+
+        self.name = name
+        self.embedding_function = embedding_function
+        self.path = path
+        self.ann_threshold = ann_threshold
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+
+        self._id = str(uuid.uuid4())
+        self._ids: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self._documents: List[Optional[str]] = []
+        self._metadatas: List[Optional[Dict[str, Any]]] = []
+        self._vectors: Optional["np.ndarray"] = None
+        self._writable = True
+        self._alive: Optional["np.ndarray"] = None
+        self._ivf: Optional[_IVFIndex] = None
+        self._ivf_trained_size = 0
+        self._lock = threading.RLock()
+
+        if path and os.path.exists(os.path.join(path, "index.json")):
+            self._load()
+
+    def __repr__(self) -> str:
+        return f"LocalVectorIndex(name='{self.name}', count={self.count()})"
+
+    @property
+    def id(self) -> str:
+        return self._id
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """Collection metadata, declaring the distance metric as Chroma does"""
+        return {"hnsw:space": "cosine"}
+
+    @property
+    def _size(self) -> int:
+        return len(self._ids)
+
+    def count(self) -> int:
+        return len(self._rows)
+
+    # Writes
+
+    def add(self, ids: List[str], documents: Optional[List[str]] = None,
+            metadatas: Optional[List[Dict]] = None, embeddings: Optional[Any] = None):
+        with self._lock:
+            self._check_unique(ids)
+            existing = [doc_id for doc_id in ids if doc_id in self._rows]
+            if existing:
+                raise ValueError(f"IDs already exist in collection '{self.name}': {existing[:5]}")
+            self._append(ids, documents, metadatas, embeddings)
+
+    def upsert(self, ids: List[str], documents: Optional[List[str]] = None,
+               metadatas: Optional[List[Dict]] = None, embeddings: Optional[Any] = None):
+        with self._lock:
+            self._check_unique(ids)
+            self._tombstone([doc_id for doc_id in ids if doc_id in self._rows])
+            self._append(ids, documents, metadatas, embeddings)
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            if where is not None:
+                matched = self.get(ids=ids, where=where, include=())["ids"]
+                self._tombstone(matched)
+            else:
+                self._tombstone([doc_id for doc_id in dict.fromkeys(ids or []) if doc_id in self._rows])
+
+    def _check_unique(self, ids: List[str]):
+        # Like Chroma's DuplicateIDError: rows sharing an id would both stay live
+        if len(set(ids)) != len(ids):
+            seen = set()
+            duplicates = [doc_id for doc_id in ids if doc_id in seen or seen.add(doc_id)]
+            raise ValueError(f"Duplicate IDs in one write to collection '{self.name}': {duplicates[:5]}")
+
+    def _append(self, ids: List[str], documents: Optional[List[str]],
+                metadatas: Optional[List[Dict]], embeddings: Optional[Any]):
+        if not ids:
+            return
+        documents = list(documents) if documents is not None else [None] * len(ids)
+        metadatas = list(metadatas) if metadatas is not None else [None] * len(ids)
+        if embeddings is None:
+            embeddings = self._embed([doc or "" for doc in documents])
+        vectors = self._normalize(embeddings)
+        if len(vectors) != len(ids):
+            raise ValueError("Number of embeddings does not match number of ids")
+
+        start = self._size
+        self._reserve(start + len(ids), vectors.shape[1])
+        self._vectors[start:start + len(ids)] = vectors
+        for offset, doc_id in enumerate(ids):
+            self._rows[doc_id] = start + offset
+        self._ids.extend(ids)
+        self._alive = None
+        self._documents.extend(documents)
+        self._metadatas.extend(metadatas)
+
+        if self._ivf is not None:
+            self._ivf.assign(self._vectors[:self._size], start)
+
+    def _tombstone(self, ids: Iterable[str]):
+        # Rows are never moved on delete, so cluster assignments stay valid;
+        # the row is only excluded from results until the next compaction.
+        for doc_id in ids:
+            row = self._rows.pop(doc_id, None)
+            if row is None:
+                continue
+            self._ids[row] = None
+            self._documents[row] = None
+            self._metadatas[row] = None
+        self._alive = None
+
+    def _reserve(self, size: int, dim: int):
+        if self._vectors is not None and self._vectors.shape[1] != dim:
+            raise ValueError(f"Embedding dimension {dim} does not match index dimension {self._vectors.shape[1]}")
+        if self._vectors is not None and self._writable and size <= len(self._vectors):
+            return
+        capacity = max(size, 1024)
+        if self._vectors is not None:
+            capacity = max(capacity, 2 * len(self._vectors))
+        grown = np.zeros((capacity, dim), dtype=np.float32)
+        if self._vectors is not None:
+            grown[:self._size] = self._vectors[:self._size]
+        self._vectors = grown
+        self._writable = True
+
+    def _embed(self, texts: List[str]) -> Any:
+        if self.embedding_function is None:
+            raise ValueError(f"Collection '{self.name}' has no embedding function; pass embeddings explicitly")
+        return self.embedding_function(texts)
+
+    @staticmethod
+    def _normalize(embeddings: Any) -> "np.ndarray":
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[np.newaxis, :]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    # Reads
+
+    def _alive_mask(self) -> "np.ndarray":
+        if self._alive is None:
+            self._alive = np.fromiter((doc_id is not None for doc_id in self._ids), dtype=bool, count=self._size)
+        return self._alive
+
+    def _alive_rows(self) -> "np.ndarray":
+        return np.flatnonzero(self._alive_mask())
+
+    def _filter_rows(self, where: Optional[Dict[str, Any]],
+                     where_document: Optional[Dict[str, Any]]) -> "np.ndarray":
+        return np.fromiter(
+            (
+                row for row, doc_id in enumerate(self._ids)
+                if doc_id is not None
+                and matches_where(self._metadatas[row], where)
+                and matches_where_document(self._documents[row], where_document)
+            ),
+            dtype=np.int64,
+        )
+
+    def _ensure_ann(self):
+        # Build on first use, and retrain once the collection has grown 4x
+        # so clusters stay balanced as data streams in.
+        if self._size < self.ann_threshold:
+            return
+        if self._ivf is not None and self._size <= 4 * self._ivf_trained_size:
+            return
+        vectors = self._vectors[:self._size]
+        n_lists = self.n_lists or max(16, int(np.sqrt(self._size)))
+        self._ivf = _IVFIndex.train(vectors, n_lists, self.n_probe)
+        self._ivf.assign(vectors, 0)
+        self._ivf_trained_size = self._size
+
+    def _exact_top_k(self, queries: "np.ndarray", rows: Optional["np.ndarray"], k: int) -> List[List[tuple]]:
+        if rows is None:
+            # Whole collection: multiply against the contiguous matrix (no
+            # gather copy) and push deleted rows to the bottom.
+            alive = self._alive_mask()
+            sims = queries @ self._vectors[:self._size].T
+            if not alive.all():
+                sims[:, ~alive] = -np.inf
+            rows = np.arange(self._size)
+            k = min(k, int(alive.sum()))
+        else:
+            sims = queries @ self._vectors[rows].T
+            k = min(k, rows.size)
+        if k == 0:
+            return [[] for _ in range(len(queries))]
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        results = []
+        for qi in range(len(queries)):
+            order = top[qi][np.argsort(-sims[qi, top[qi]])]
+            results.append([(float(sims[qi, i]), int(rows[i])) for i in order])
+        return results
+
+    def _ann_top_k(self, query: "np.ndarray", k: int, allowed: Optional["np.ndarray"]) -> List[tuple]:
+        n_probe = self._ivf.n_probe
+        n_lists = len(self._ivf.centroids)
+        while True:
+            rows = self._ivf.candidates(query, n_probe)
+            keep = self._alive_mask()[rows]
+            if allowed is not None:
+                keep &= allowed[rows]
+            rows = rows[keep]
+            if rows.size >= k or n_probe >= n_lists:
+                return self._exact_top_k(query[np.newaxis, :], rows, k)[0]
+            n_probe *= 2
+
+    def query(self, query_embeddings: Optional[Any] = None,
+              query_texts: Optional[List[str]] = None,
+              n_results: int = 10,
+              where: Optional[Dict[str, Any]] = None,
+              where_document: Optional[Dict[str, Any]] = None,
+              include: Sequence[str] = DEFAULT_INCLUDE) -> Dict[str, Any]:
+        if query_embeddings is None:
+            if query_texts is None:
+                raise ValueError("Either query_embeddings or query_texts must be provided")
+            if isinstance(query_texts, str):
+                query_texts = [query_texts]
+            query_embeddings = self._embed(list(query_texts))
+        queries = self._normalize(query_embeddings)
+
+        with self._lock:
+            if self._vectors is None or not self._rows:
+                hits = [[] for _ in range(len(queries))]
+            else:
+                filtered = where is not None or where_document is not None
+                rows = self._filter_rows(where, where_document) if filtered else None
+                self._ensure_ann()
+                if self._ivf is None or (rows is not None and rows.size < self.ann_threshold):
+                    hits = self._exact_top_k(queries, rows, n_results)
+                else:
+                    allowed = None
+                    if rows is not None:
+                        allowed = np.zeros(self._size, dtype=bool)
+                        allowed[rows] = True
+                    hits = [self._ann_top_k(q, n_results, allowed) for q in queries]
+
+            return self._format_query(hits, include)
+
+    def get(self, ids: Optional[List[str]] = None,
+            where: Optional[Dict[str, Any]] = None,
+            limit: Optional[int] = None,
+            offset: Optional[int] = None,
+            where_document: Optional[Dict[str, Any]] = None,
+            include: Sequence[str] = ("documents", "metadatas")) -> Dict[str, Any]:
+        with self._lock:
+            if ids is not None:
+                rows = [self._rows[doc_id] for doc_id in ids if doc_id in self._rows]
+            else:
+                rows = [row for row, doc_id in enumerate(self._ids) if doc_id is not None]
+            rows = [
+                row for row in rows
+                if matches_where(self._metadatas[row], where)
+                and matches_where_document(self._documents[row], where_document)
+            ]
+            start = offset or 0
+            rows = rows[start:start + limit] if limit is not None else rows[start:]
+
+            return {
+                "ids": [self._ids[row] for row in rows],
+                "documents": [self._documents[row] for row in rows] if "documents" in include else None,
+                "metadatas": [self._metadatas[row] for row in rows] if "metadatas" in include else None,
+                "embeddings": self._vectors[rows].copy() if "embeddings" in include and rows else None,
+                "included": list(include),
+            }
+
+    def _format_query(self, hits: List[List[tuple]], include: Sequence[str]) -> Dict[str, Any]:
+        return {
+            "ids": [[self._ids[row] for _, row in query_hits] for query_hits in hits],
+            "documents": [[self._documents[row] for _, row in query_hits] for query_hits in hits]
+            if "documents" in include else None,
+            "metadatas": [[self._metadatas[row] for _, row in query_hits] for query_hits in hits]
+            if "metadatas" in include else None,
+            "distances": [[1.0 - sim for sim, _ in query_hits] for query_hits in hits]
+            if "distances" in include else None,
+            "embeddings": [[self._vectors[row].copy() for _, row in query_hits] for query_hits in hits]
+            if "embeddings" in include else None,
+            "included": list(include),
+        }
+
+    # Persistence
+
+    def compact(self):
+        """Drop deleted rows and retrain the approximate index if one is in use."""
+        with self._lock:
+            alive = self._alive_rows()
+            if alive.size == self._size:
+                return
+            vectors = self._vectors[alive].copy() if self._vectors is not None else None
+            self._ids = [self._ids[row] for row in alive]
+            self._documents = [self._documents[row] for row in alive]
+            self._metadatas = [self._metadatas[row] for row in alive]
+            self._rows = {doc_id: row for row, doc_id in enumerate(self._ids)}
+            self._alive = None
+            self._vectors = vectors
+            self._writable = True
+            self._ivf = None
+            self._ivf_trained_size = 0
+            self._ensure_ann()
+
+    def persist(self):
+        """Write the index to `path` (vectors and clusters as raw, mappable arrays)."""
+        if not self.path:
+            return
+        with self._lock:
+            if self._size and self.count() < self._size // 2:
+                self.compact()
+            os.makedirs(self.path, exist_ok=True)
+            dim = self._vectors.shape[1] if self._vectors is not None else 0
+
+            self._write_array("vectors.f32", self._vectors[:self._size] if dim else np.zeros((0, 0), np.float32))
+            if self._ivf is not None:
+                self._write_array("centroids.f32", self._ivf.centroids)
+                self._write_array("labels.i32", self._ivf.labels)
+
+            header = {
+                "id": self._id,
+                "name": self.name,
+                "dim": dim,
+                "size": self._size,
+                "ids": self._ids,
+                "documents": self._documents,
+                "metadatas": self._metadatas,
+                "n_lists": len(self._ivf.centroids) if self._ivf is not None else None,
+                "ivf_trained_size": self._ivf_trained_size,
+            }
+            tmp_path = os.path.join(self.path, "index.json.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(header, f, ensure_ascii=False)
+            os.replace(tmp_path, os.path.join(self.path, "index.json"))
+
+    def _write_array(self, file_name: str, array: "np.ndarray"):
+        tmp_path = os.path.join(self.path, f"{file_name}.tmp")
+        np.ascontiguousarray(array).tofile(tmp_path)
+        os.replace(tmp_path, os.path.join(self.path, file_name))
+
+    def _load(self):
+        with open(os.path.join(self.path, "index.json"), "r", encoding="utf-8") as f:
+            header = json.load(f)
+
+        self._id = header["id"]
+        self._ids = header["ids"]
+        self._documents = header["documents"]
+        self._metadatas = header["metadatas"]
+        self._rows = {doc_id: row for row, doc_id in enumerate(self._ids) if doc_id is not None}
+
+        size, dim = header["size"], header["dim"]
+        if size and dim:
+            # Read-only mapping; the first write copies the rows into memory.
+            self._vectors = np.memmap(os.path.join(self.path, "vectors.f32"),
+                                      dtype=np.float32, mode="r", shape=(size, dim))
+            self._writable = False
+
+        n_lists = header.get("n_lists")
+        if n_lists and size:
+            centroids = np.fromfile(os.path.join(self.path, "centroids.f32"), dtype=np.float32)
+            self._ivf = _IVFIndex(centroids.reshape(n_lists, dim), self.n_probe)
+            self._ivf.load_labels(np.memmap(os.path.join(self.path, "labels.i32"),
+                                            dtype=np.int32, mode="r", shape=(size,)))
+            self._ivf_trained_size = header.get("ivf_trained_size", size)
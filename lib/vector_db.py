@@ -1,5 +1,10 @@
-from typing import List, Optional, Dict, Any, Union
+from typing import List, Optional, Dict, Any, Iterable, Iterator, Union
+from dataclasses import dataclass, field
+from itertools import islice
 import os
+import shutil
+import sys
+import time
 from typing_extensions import TypedDict
 try:
     import chromadb
@@ -16,16 +21,112 @@ except ImportError:  # pragma: no cover - allow running without chromadb
 
 from lib.loaders import PDFLoader, JSONGameLoader
 from lib.documents import Document, Corpus
+from lib.indexing import sync_games
+from lib.profiling import timed_operation
+from lib.vector_backends import VectorBackend, LocalVectorIndex
+from lib.resources import (
+    get_chroma_client,
+    get_collection,
+    get_embedding_function,
+    get_embedding_model,
+    get_query_encoder,
+    get_text_encoder,
+    invalidate_collection,
+    resolve_chroma_url,
+)
+
+
+@dataclass
+class IngestionStats:
+    """Counters reported by a streaming ingestion."""
+    documents: int = 0
+    chunks: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def docs_per_second(self) -> float:
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return self.documents / self.elapsed_seconds
+
+
+def _chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+@dataclass
+class SearchHit:
+    """A single document returned by a similarity search."""
+    id: str
+    document: Optional[str]
+    metadata: Dict[str, Any]
+    distance: float
+
+
+@dataclass
+class SearchResults:
+    """Hits for one query of a batched search, best match first."""
+    query: str
+    hits: List[SearchHit] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.hits)
+
+    def __iter__(self) -> Iterator[SearchHit]:
+        return iter(self.hits)
+
+    @property
+    def documents(self) -> List[Optional[str]]:
+        return [hit.document for hit in self.hits]
+
+    @property
+    def metadatas(self) -> List[Dict[str, Any]]:
+        return [hit.metadata for hit in self.hits]
+
+    @property
+    def distances(self) -> List[float]:
+        return [hit.distance for hit in self.hits]
+
+    @classmethod
+    def from_query_result(cls, queries: List[str], result: QueryResult) -> List["SearchResults"]:
+        """Split a Chroma-style `QueryResult` into one `SearchResults` per query."""
+        def column(name: str) -> List[List[Any]]:
+            values = result.get(name)
+            return values if values is not None else [[] for _ in queries]
+
+        ids, documents, metadatas, distances = (
+            column("ids"), column("documents"), column("metadatas"), column("distances")
+        )
+        results = []
+        for i, query in enumerate(queries):
+            query_ids = ids[i] if i < len(ids) else []
+            hits = [
+                SearchHit(
+                    id=doc_id,
+                    document=documents[i][j] if j < len(documents[i]) else None,
+                    metadata=(metadatas[i][j] if j < len(metadatas[i]) else None) or {},
+                    distance=float(distances[i][j]) if j < len(distances[i]) else float("nan"),
+                )
+                for j, doc_id in enumerate(query_ids)
+            ]
+            results.append(cls(query=query, hits=hits))
+        return results
 
 
 class VectorStore:
     """
-    High-level interface for vector database operations using ChromaDB.
+    High-level interface for vector database operations.
     
     This class provides a simplified API for storing and querying document embeddings
-    in a ChromaDB collection. It handles the conversion between our Document/Corpus
-    abstractions and ChromaDB's expected data formats, making vector operations
-    more intuitive and type-safe.
+    in a vector backend: a ChromaDB collection or any other `VectorBackend`, such
+    as the in-process `LocalVectorIndex`. It handles the conversion between our
+    Document/Corpus abstractions and the backend's Chroma-style data formats,
+    making vector operations more intuitive and type-safe.
     
     The VectorStore supports:
     - Adding individual documents, document lists, or corpus collections
@@ -34,8 +135,21 @@ class VectorStore:
     - Automatic embedding generation via OpenAI
     """
 
-    def __init__(self, chroma_collection: ChromaCollection):
+    def __init__(self, chroma_collection: Union[ChromaCollection, VectorBackend],
+                 embedding_function: Optional[EmbeddingFunction] = None):
         self._collection = chroma_collection
+        self._embedding_function = embedding_function
+
+    @property
+    def distance_metric(self) -> str:
+        """
+        Metric of the distances returned by searches: "cosine" (1 - cosine
+        similarity), "l2" (squared Euclidean, Chroma's default) or "ip"
+        (1 - inner product). Distance thresholds only carry over between
+        stores using the same metric.
+        """
+        metadata = getattr(self._collection, "metadata", None) or {}
+        return metadata.get("hnsw:space", "l2")
 
     def add(self, item: Union[Document, Corpus, List[Document]]):
         """
@@ -58,16 +172,7 @@ class VectorStore:
             >>> store.add([doc1, doc2, doc3])  # Batch add
             >>> store.add(Corpus([doc1, doc2]))  # Add corpus
         """
-        if isinstance(item, Document):
-            item = Corpus([item])
-        elif isinstance(item, list):
-            if not all(isinstance(doc, Document) for doc in item):
-                raise TypeError("List must contain Document objects only.")
-            item = Corpus(item)
-        elif not isinstance(item, Corpus):
-            raise TypeError("item must be Document, Corpus, or List[Document].")
-
-        item_dict = item.to_dict()
+        item_dict = self._to_corpus(item).to_dict()
 
         self._collection.add(
             documents=item_dict["contents"],
@@ -75,6 +180,112 @@ class VectorStore:
             metadatas=item_dict["metadatas"]
         )
 
+    def upsert(self, item: Union[Document, Corpus, List[Document]], embeddings: Optional[Any] = None):
+        """
+        Insert documents or overwrite existing ones that share the same IDs.
+
+        Args:
+            item (Union[Document, Corpus, List[Document]]): Documents to upsert.
+            embeddings (Optional[Any]): Precomputed embeddings, one per document
+                and in the same order. When omitted, the collection's embedding
+                function is used.
+        """
+        item_dict = self._to_corpus(item).to_dict()
+        if not item_dict["ids"]:
+            return
+
+        self._collection.upsert(
+            documents=item_dict["contents"],
+            ids=item_dict["ids"],
+            metadatas=item_dict["metadatas"],
+            embeddings=embeddings,
+        )
+
+    def upsert_stream(self, documents: Iterable[Document],
+                      encoder: Optional[Any] = None,
+                      encode_batch_size: int = 64,
+                      chunk_size: int = 1000,
+                      report_progress: bool = True) -> "IngestionStats":
+        """
+        Upsert an arbitrarily long stream of documents in bounded-size chunks.
+
+        Documents are pulled from the iterable `chunk_size` at a time, embedded
+        and written before the next chunk is read, so memory use stays flat no
+        matter how many documents the stream yields.
+
+        Args:
+            documents (Iterable[Document]): Documents to ingest, typically a lazy
+                generator such as `JSONGameLoader.iter_documents()`.
+            encoder (Optional[Any]): SentenceTransformer-compatible model used to
+                compute embeddings with `encode(texts, batch_size=...)`. When
+                omitted, the collection's embedding function is used.
+            encode_batch_size (int): Number of texts per model forward pass.
+            chunk_size (int): Maximum number of documents per upsert request.
+                Capped at the Chroma client's maximum batch size.
+            report_progress (bool): Print cumulative throughput after each chunk.
+
+        Returns:
+            IngestionStats: Totals and docs/sec throughput of the ingestion.
+        """
+        chunk_size = min(chunk_size, self._max_batch_size())
+        stats = IngestionStats()
+        started = time.perf_counter()
+
+        for chunk in _chunked(documents, chunk_size):
+            embeddings = None
+            if encoder is not None:
+                embeddings = encoder.encode(
+                    [doc.content for doc in chunk],
+                    batch_size=encode_batch_size,
+                    convert_to_numpy=True,
+                )
+            self.upsert(chunk, embeddings=embeddings)
+
+            stats.documents += len(chunk)
+            stats.chunks += 1
+            stats.elapsed_seconds = time.perf_counter() - started
+            if report_progress:
+                print(f"{stats.documents} documents ingested ({stats.docs_per_second:.1f} docs/sec)")
+
+        stats.elapsed_seconds = time.perf_counter() - started
+        return stats
+
+    def embed(self, texts: List[str]) -> Optional[Any]:
+        """Embed `texts` with the store's query encoder (None if it has none)."""
+        if self._embedding_function is None:
+            return None
+        return self._embedding_function(list(texts))
+
+    def delete(self, ids: List[str]):
+        """Remove the documents with the given IDs from the store."""
+        if ids:
+            self._collection.delete(ids=ids)
+
+    @property
+    def collection_id(self) -> Optional[str]:
+        """Identifier of the underlying collection, used to detect recreation."""
+        collection_id = getattr(self._collection, "id", None)
+        return str(collection_id) if collection_id is not None else None
+
+    def _max_batch_size(self) -> int:
+        client = getattr(self._collection, "_client", None)
+        try:
+            return client.get_max_batch_size()
+        except Exception:
+            return sys.maxsize
+
+    @staticmethod
+    def _to_corpus(item: Union[Document, Corpus, List[Document]]) -> Corpus:
+        if isinstance(item, Document):
+            return Corpus([item])
+        if isinstance(item, list):
+            if not all(isinstance(doc, Document) for doc in item):
+                raise TypeError("List must contain Document objects only.")
+            return Corpus(item)
+        if not isinstance(item, Corpus):
+            raise TypeError("item must be Document, Corpus, or List[Document].")
+        return item
+
     def query(self, query_texts: str | List[str], n_results: int = 3,
               where: Optional[Dict[str, Any]] = None,
               where_document: Optional[Dict[str, Any]] = None) -> QueryResult:
@@ -82,11 +293,12 @@ class VectorStore:
         Perform semantic similarity search against stored documents.
         
         This method finds documents that are semantically similar to the query
-        text using vector embeddings. Results are ranked by cosine similarity
-        and can be filtered using metadata or document content conditions.
+        text using vector embeddings. Results are ranked by distance, in the
+        store's `distance_metric`, and can be filtered using metadata or
+        document content conditions.
         
         Args:
-            query_texts (List[str]): List of query strings to search for
+            query_texts (str | List[str]): Query string, or list of query strings, to search for
             n_results (int): Maximum number of results to return per query (default: 3)
             where (Optional[Dict[str, Any]]): Metadata filter conditions using
                 ChromaDB query syntax (e.g., {"author": "Smith"})
@@ -104,15 +316,75 @@ class VectorStore:
             ...     where={"category": "technical"}
             ... )
             >>> for doc, distance in zip(results['documents'][0], results['distances'][0]):
-            ...     print(f"Similarity: {1-distance:.3f}, Content: {doc[:100]}...")
+            ...     print(f"Distance: {distance:.3f}, Content: {doc[:100]}...")
         """
-        return self._collection.query(
-            query_texts=query_texts,
-            n_results=n_results,
-            where=where,
-            where_document=where_document,
-            include=['documents', 'distances', 'metadatas']
-        )
+        if isinstance(query_texts, str):
+            query_texts = [query_texts]
+        if self._embedding_function is not None:
+            queries = {"query_embeddings": self._embedding_function(list(query_texts))}
+        else:
+            queries = {"query_texts": query_texts}
+        with timed_operation("vector_search", self._collection.name):
+            return self._collection.query(
+                **queries,
+                n_results=n_results,
+                where=where,
+                where_document=where_document,
+                include=['documents', 'distances', 'metadatas']
+            )
+
+    def search(self, queries: str | List[str], n_results: int = 3,
+               where: Optional[Dict[str, Any]] = None,
+               where_document: Optional[Dict[str, Any]] = None,
+               query_embeddings: Optional[Any] = None) -> List[SearchResults]:
+        """
+        Run several similarity searches in one round trip.
+        
+        All queries are embedded together in a single model forward pass and
+        sent to the backend as one request, which scores them with one
+        vectorized similarity computation. Results come back per query as
+        typed `SearchResults` instead of nested `[[...]]` lists. Hit distances
+        are in the store's `distance_metric`: cosine distance for
+        `LocalVectorIndex`, squared L2 for Chroma collections by default.
+        
+        Args:
+            queries (str | List[str]): Query strings to search for
+            n_results (int): Maximum number of hits per query (default: 3)
+            where (Optional[Dict[str, Any]]): Metadata filter applied to every query
+            where_document (Optional[Dict[str, Any]]): Document content filter
+                applied to every query
+            query_embeddings (Optional[Any]): Precomputed embeddings for the
+                queries, in the same order; skips the embedding step
+                
+        Returns:
+            List[SearchResults]: One entry per query, in input order
+            
+        Example:
+            >>> results = store.search(["Pokémon Gold", "Super Mario 64"], n_results=2)
+            >>> for result in results:
+            ...     print(result.query, [hit.metadata["Name"] for hit in result.hits])
+        """
+        if isinstance(queries, str):
+            queries = [queries]
+        if not queries:
+            return []
+
+        if query_embeddings is None and self._embedding_function is not None:
+            query_embeddings = self._embedding_function(list(queries))
+
+        if query_embeddings is not None:
+            with timed_operation("vector_search", self._collection.name):
+                result = self._collection.query(
+                    query_embeddings=query_embeddings,
+                    n_results=n_results,
+                    where=where,
+                    where_document=where_document,
+                    include=['documents', 'distances', 'metadatas']
+                )
+        else:
+            result = self.query(queries, n_results=n_results, where=where, where_document=where_document)
+
+        return SearchResults.from_query_result(queries, result)
 
     def get(self, ids: Optional[List[str]] = None, 
             where: Optional[Dict[str, Any]] = None,
@@ -144,66 +416,112 @@ class VectorStore:
             ids=ids,
             where=where,
             limit=limit,
-            include=['documents', 'distances', 'metadatas']
+            include=['documents', 'metadatas']
         )
 
+    def iter_metadatas(self, page_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over the metadata of every stored document, one page at a time.
+
+        Only metadata is transferred, never documents or embeddings, and at
+        most `page_size` entries are held at once.
+        """
+        offset = 0
+        while True:
+            page = self._collection.get(limit=page_size, offset=offset, include=['metadatas'])
+            metadatas = page.get('metadatas') or []
+            yield from (metadata or {} for metadata in metadatas)
+            if len(metadatas) < page_size:
+                return
+            offset += page_size
+
 class VectorStoreManager:
     """
-    Factory and lifecycle manager for ChromaDB vector stores.
+    Factory and lifecycle manager for vector stores.
     
-    This class handles the creation, configuration, and management of ChromaDB
-    collections with local sentence-transformer embeddings. It provides a centralized way to manage
-    multiple vector stores within an application, handling the underlying ChromaDB
-    client and embedding function configuration.
+    This class handles the creation, configuration, and management of vector
+    store collections with local sentence-transformer embeddings. It provides a centralized way to manage
+    multiple vector stores within an application, handling the underlying
+    storage backend and embedding function configuration.
+    
+    Two backends are available:
+    - "chroma" (default): ChromaDB collections, served by the Chroma server at
+      `CHROMA_URL` or persisted locally in `persist_directory`
+    - "local": in-process `LocalVectorIndex` collections that avoid a network
+      round trip per query, persisted under `persist_directory` when given
     
     Key responsibilities:
-    - ChromaDB client initialization and management
+    - Backend client initialization and management
     - SentenceTransformer embedding configuration
     - Vector store creation with consistent settings
     - Store lifecycle management (create, get, delete)
     """
 
-    def __init__(self, persist_directory: str | None = None, model_name: str = "all-MiniLM-L6-v2"):
-        """Create a ChromaDB client using env vars or local persistence."""
+    def __init__(self, persist_directory: str | None = None, model_name: str = "all-MiniLM-L6-v2",
+                 backend: str = "chroma"):
+        """Attach to the shared backend selected by `backend`, env vars or local persistence."""
+        if backend not in ("chroma", "local"):
+            raise ValueError(f"Unknown vector store backend: {backend}")
+
+        self.backend = backend
+        self.model_name = model_name
+        self.persist_directory = persist_directory
+        self.server_url = None
+        self.chroma_client = None
+        self._local_indexes: Dict[str, LocalVectorIndex] = {}
+        # Queries are embedded client-side through the shared cache, so a
+        # repeated question never reaches the model (or the server-side EF).
+        self.query_embedding_function = get_query_encoder(model_name)
+
+        if backend == "local":
+            self.embedding_function = get_text_encoder(model_name)
+            return
+
         if chromadb is None:  # pragma: no cover - dependency unavailable
             raise ImportError("chromadb package is required")
 
-        server_url = os.getenv("CHROMA_URL", "http://localhost:8000")
-
-        if server_url:
-            try:
-                from urllib.parse import urlparse
-                parsed = urlparse(server_url)
-                host = parsed.hostname or "localhost"
-                port = parsed.port or 8000
-                self.chroma_client = chromadb.HttpClient(host=host, port=port, ssl=parsed.scheme == "https")
-            except Exception:
-                self.chroma_client = chromadb.HttpClient(server_url)
-        else:
-            if persist_directory:
-                self.chroma_client = chromadb.PersistentClient(path=persist_directory)
-            else:
-                self.chroma_client = chromadb.Client()
-
+        self.server_url = resolve_chroma_url()
+        self.chroma_client = get_chroma_client(self.server_url, persist_directory)
         self.embedding_function = self._create_embedding_function(model_name)
 
     def _create_embedding_function(self, model_name: str) -> EmbeddingFunction:
-        return embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name=model_name
-        )
+        return get_embedding_function(model_name)
 
     def __repr__(self):
+        if self.backend == "local":
+            return f"VectorStoreManager(backend='local'):{self.persist_directory}"
         return f"VectorStoreManager():{self.chroma_client}"
 
     def persist(self):
-        """Persist the underlying ChromaDB client to disk."""
+        """Persist the underlying backend to disk."""
+        for index in self._local_indexes.values():
+            index.persist()
         if hasattr(self.chroma_client, "persist"):
             self.chroma_client.persist()
 
+    def _local_path(self, store_name: str) -> Optional[str]:
+        if not self.persist_directory:
+            return None
+        return os.path.join(self.persist_directory, store_name)
+
+    def _get_local_index(self, store_name: str, create: bool) -> Optional[LocalVectorIndex]:
+        index = self._local_indexes.get(store_name)
+        if index is None:
+            path = self._local_path(store_name)
+            exists = path is not None and os.path.exists(os.path.join(path, "index.json"))
+            if not (create or exists):
+                return None
+            index = LocalVectorIndex(store_name, embedding_function=self.embedding_function, path=path)
+            self._local_indexes[store_name] = index
+        return index
+
     def get_store(self, name: str) -> Optional[VectorStore]:
+        if self.backend == "local":
+            index = self._get_local_index(name, create=False)
+            return VectorStore(index, self.query_embedding_function) if index is not None else None
         try:
             chroma_collection = self.chroma_client.get_collection(name)
-            return VectorStore(chroma_collection)
+            return VectorStore(chroma_collection, self.query_embedding_function)
         except Exception:
             return None
 
@@ -211,6 +529,9 @@ class VectorStoreManager:
         if force:
             self.delete_store(store_name)
 
+        if self.backend == "local":
+            return VectorStore(self._get_local_index(store_name, create=True), self.query_embedding_function)
+
         try:
             chroma_collection = self.chroma_client.create_collection(
                 name=store_name,
@@ -219,16 +540,29 @@ class VectorStoreManager:
         except Exception as e:
             print(f"Pass `force=True` or use `get_or_create_store` method")
 
-        return VectorStore(chroma_collection)
+        return VectorStore(chroma_collection, self.query_embedding_function)
 
     def get_or_create_store(self, store_name: str) -> VectorStore:
-        chroma_collection = self.chroma_client.get_or_create_collection(
-            name=store_name,
-            embedding_function=self.embedding_function
+        if self.backend == "local":
+            return VectorStore(self._get_local_index(store_name, create=True), self.query_embedding_function)
+
+        chroma_collection = get_collection(
+            store_name,
+            server_url=self.server_url,
+            persist_directory=self.persist_directory,
+            embedding_function=self.embedding_function,
         )
-        return VectorStore(chroma_collection)
+        return VectorStore(chroma_collection, self.query_embedding_function)
 
     def delete_store(self, store_name: str):
+        if self.backend == "local":
+            self._local_indexes.pop(store_name, None)
+            path = self._local_path(store_name)
+            if path and os.path.isdir(path):
+                shutil.rmtree(path)
+            return
+
+        invalidate_collection(store_name, self.server_url, self.persist_directory)
         try:
             self.chroma_client.delete_collection(name=store_name)
         except Exception:
@@ -250,8 +584,9 @@ class CorpusLoaderService:
     - Progress reporting and error handling
     """
 
-    def __init__(self, vector_store_manager: VectorStoreManager):
+    def __init__(self, vector_store_manager: VectorStoreManager, manifest_dir: str = ".index_manifests"):
         self.manager = vector_store_manager
+        self.manifest_dir = manifest_dir
 
     def load_pdf(self, store_name: str, pdf_path: str) -> VectorStore:
         """
@@ -284,14 +619,83 @@ class CorpusLoaderService:
 
         return store
 
-    def load_games(self, store_name: str, directory: str) -> VectorStore:
-        """Load a directory of JSON game files into a vector store."""
+    def load_games(self, store_name: str, directory: str,
+                   stream: bool = False,
+                   encode_batch_size: int = 64,
+                   chunk_size: int = 1000) -> VectorStore:
+        """
+        Load a directory of JSON game files into a vector store.
+
+        By default the whole directory is read into one Corpus and added in a
+        single request. With `stream=True` the files are read lazily, embedded
+        `encode_batch_size` at a time with the manager's SentenceTransformer and
+        upserted in chunks of at most `chunk_size` documents, which keeps memory
+        flat for catalogs of any size and reports docs/sec as it goes.
+
+        Args:
+            store_name (str): Name of the vector store to create or use
+            directory (str): Directory containing one JSON file per game
+            stream (bool): Use the batched streaming pipeline
+            encode_batch_size (int): Texts per embedding forward pass (stream mode)
+            chunk_size (int): Documents per upsert request (stream mode)
+
+        Returns:
+            VectorStore: The vector store containing the game documents
+        """
         store = self.manager.get_or_create_store(store_name)
         print(f"VectorStore `{store_name}` ready!")
 
         loader = JSONGameLoader(directory)
+        if stream:
+            stats = store.upsert_stream(
+                loader.iter_documents(),
+                encoder=get_embedding_model(self.manager.model_name),
+                encode_batch_size=encode_batch_size,
+                chunk_size=chunk_size,
+            )
+            print(f"{stats.documents} game documents upserted in {stats.elapsed_seconds:.2f}s "
+                  f"({stats.docs_per_second:.1f} docs/sec)")
+            return store
+
         corpus = loader.load()
         store.add(corpus)
         print(f"{len(corpus)} game documents added!")
 
         return store
+
+    def sync_games(self, store_name: str, directory: str,
+                   encode_batch_size: int = 64,
+                   chunk_size: int = 1000) -> VectorStore:
+        """
+        Incrementally re-index a directory of JSON game files.
+
+        A manifest of document ID -> content hash/mtime is kept per store in
+        `manifest_dir`. Only new or modified files are embedded and upserted,
+        and documents whose file was removed are deleted from the store, so
+        re-indexing an unchanged corpus costs one `stat` per file.
+
+        Args:
+            store_name (str): Name of the vector store to create or use
+            directory (str): Directory containing one JSON file per game
+            encode_batch_size (int): Texts per embedding forward pass
+            chunk_size (int): Documents per upsert/delete request
+
+        Returns:
+            VectorStore: The synchronized vector store
+        """
+        store = self.manager.get_or_create_store(store_name)
+        print(f"VectorStore `{store_name}` ready!")
+
+        stats = sync_games(
+            store,
+            directory,
+            manifest_path=os.path.join(self.manifest_dir, f"{store_name}.json"),
+            encoder=get_embedding_model(self.manager.model_name),
+            encode_batch_size=encode_batch_size,
+            chunk_size=chunk_size,
+        )
+        print(f"Sync of `{directory}` done in {stats.elapsed_seconds:.2f}s: "
+              f"{stats.added} added, {stats.updated} updated, "
+              f"{stats.deleted} deleted, {stats.unchanged} unchanged")
+
+        return store
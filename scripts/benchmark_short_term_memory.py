@@ -0,0 +1,63 @@
+"""Measure the per-turn cost of ShortTermMemory as a session grows.
+
+Each simulated turn does what `Agent.invoke` does with the session memory:
+read the last run, build the next one from its final state and store it.
+Every run carries a few snapshots whose state holds the conversation (as a
+PersistentList, like the agent's frozen state), so any per-turn copying of
+the stored runs shows up as growing turn times. Run
+from the repository root:
+
+    python scripts/benchmark_short_term_memory.py --turns 5000
+
+The script only relies on the public ShortTermMemory API, so running it on
+an older revision gives the "before" numbers to compare against.
+"""
+import argparse
+import os
+import sys
+import time
+from typing import List, TypedDict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from lib.memory import ShortTermMemory
+from lib.messages import AIMessage, UserMessage
+from lib.persistent import PersistentList
+from lib.state_machine import Run, Snapshot
+
+
+class TurnState(TypedDict):
+    messages: List
+    user_query: str
+
+
+def next_run(previous: Run, turn: int) -> Run:
+    messages = PersistentList()
+    if previous is not None:
+        messages = previous.get_final_state()["messages"]
+    messages = messages + [UserMessage(content=f"question {turn}"), AIMessage(content=f"answer {turn}")]
+    run = Run.create()
+    for step_id in ("message_prep", "llm_processor"):
+        run.add_snapshot(Snapshot.create({"messages": messages, "user_query": f"question {turn}"}, TurnState, step_id))
+    run.complete()
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--report-every", type=int, default=500)
+    args = parser.parse_args()
+
+    memory = ShortTermMemory()
+    window_start = time.perf_counter()
+    for turn in range(1, args.turns + 1):
+        memory.add(next_run(memory.get_last_object("default"), turn), "default")
+        if turn % args.report_every == 0:
+            elapsed = time.perf_counter() - window_start
+            print(f"turns {turn - args.report_every + 1:>6}-{turn:<6} {elapsed / args.report_every * 1e6:10.1f} us/turn")
+            window_start = time.perf_counter()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Measure the per-step framework overhead of StateMachine.run.
+
+Runs a linear workflow of no-op steps, so everything measured is the state
+machine itself (dispatch, state merging, snapshots, transitions). Run from
+the repository root:
+
+    python scripts/benchmark_state_machine.py --steps 50 --runs 200
+
+The script only relies on the public StateMachine API, so running it on an
+older revision gives the "before" numbers to compare against.
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+from typing import List, TypedDict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from lib.state_machine import EntryPoint, StateMachine, Step, Termination
+
+
+class BenchState(TypedDict):
+    counter: int
+    label: str
+    items: List[int]
+    flag: bool
+
+
+def build_machine(steps: int) -> StateMachine[BenchState]:
+    machine = StateMachine[BenchState](BenchState)
+    entry, termination = EntryPoint[BenchState](), Termination[BenchState]()
+    nodes = [Step[BenchState](f"step_{i}", lambda state: {"counter": state["counter"] + 1})
+             for i in range(steps)]
+    machine.add_steps([entry, *nodes, termination])
+    for source, target in zip([entry, *nodes], [*nodes, termination]):
+        machine.connect(source, target)
+    return machine
+
+
+def per_step_microseconds(machine: StateMachine[BenchState], steps: int, runs: int) -> float:
+    state = {"counter": 0, "label": "bench", "items": [1, 2, 3], "flag": True}
+    with contextlib.redirect_stdout(io.StringIO()):
+        machine.run(state)  # warm-up (and lazy compilation, if any)
+        start = time.perf_counter()
+        for _ in range(runs):
+            machine.run(state)
+        elapsed = time.perf_counter() - start
+    return elapsed / (runs * (steps + 1)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    machine = build_machine(args.steps)
+    if hasattr(machine, "compile"):
+        start = time.perf_counter()
+        machine.compile()
+        print(f"compile():            {(time.perf_counter() - start) * 1e3:8.3f} ms (once)")
+    print(f"per-step overhead:    {per_step_microseconds(machine, args.steps, args.runs):8.2f} us "
+          f"({args.steps} steps x {args.runs} runs)")
+
+
+if __name__ == "__main__":
+    main()
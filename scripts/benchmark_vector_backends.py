@@ -0,0 +1,119 @@
+"""Compare query latency and recall of the vector store backends.
+
+Uses synthetic clustered embeddings so that only the search engines are
+measured (no model inference). Run from the repository root:
+
+    python scripts/benchmark_vector_backends.py --size 100000 --dim 384
+
+Chroma is benchmarked in-process (`chromadb.Client()`) unless `--chroma-url`
+points at a server, which also adds the HTTP round trip to every query.
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from lib.vector_backends import LocalVectorIndex
+
+
+def make_data(size: int, dim: int, queries: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(size // 400, 8), dim))
+    vectors = centers[rng.integers(0, len(centers), size)] + 0.7 * rng.standard_normal((size, dim))
+    probes = centers[rng.integers(0, len(centers), queries)] + 0.7 * rng.standard_normal((queries, dim))
+    return vectors.astype(np.float32), probes.astype(np.float32)
+
+
+def timed_queries(query_fn, probes, k):
+    latencies, results = [], []
+    for probe in probes:
+        start = time.perf_counter()
+        results.append(query_fn(probe, k))
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1000, results
+
+
+def recall(results, truth):
+    return float(np.mean([len(set(r) & set(t)) / len(t) for r, t in zip(results, truth)]))
+
+
+def report(name, build_seconds, latencies, results, truth):
+    print(f"{name:<18} build {build_seconds:8.2f}s   "
+          f"p50 {np.percentile(latencies, 50):7.2f}ms   p95 {np.percentile(latencies, 95):7.2f}ms   "
+          f"recall@k {recall(results, truth):.3f}")
+
+
+def local_backend(name, vectors, ids, ann_threshold):
+    start = time.perf_counter()
+    index = LocalVectorIndex(name, ann_threshold=ann_threshold)
+    index.add(ids, embeddings=vectors)
+    index.query(query_embeddings=vectors[:1], n_results=1)  # builds the ANN index if enabled
+    build = time.perf_counter() - start
+
+    def query(probe, k):
+        return index.query(query_embeddings=probe, n_results=k, include=())["ids"][0]
+    return build, query
+
+
+def chroma_backend(vectors, ids, chroma_url):
+    import chromadb
+    from lib.resources import get_chroma_client
+
+    client = get_chroma_client(chroma_url) if chroma_url else chromadb.Client()
+    collection = client.create_collection(
+        name=f"benchmark-{uuid.uuid4().hex[:8]}",
+        metadata={"hnsw:space": "cosine"},
+    )
+    start = time.perf_counter()
+    batch = client.get_max_batch_size()
+    for offset in range(0, len(ids), batch):
+        collection.add(ids=ids[offset:offset + batch], embeddings=vectors[offset:offset + batch])
+    build = time.perf_counter() - start
+
+    def query(probe, k):
+        return collection.query(query_embeddings=[probe], n_results=k, include=[])["ids"][0]
+    return build, query, lambda: client.delete_collection(collection.name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--chroma-url", default=None)
+    parser.add_argument("--skip-chroma", action="store_true")
+    args = parser.parse_args()
+
+    vectors, probes = make_data(args.size, args.dim, args.queries)
+    ids = [str(i) for i in range(args.size)]
+    print(f"{args.size} vectors x {args.dim} dims, {args.queries} queries, k={args.k}\n")
+
+    build, query = local_backend("exact", vectors, ids, ann_threshold=args.size + 1)
+    latencies, truth = timed_queries(query, probes, args.k)
+    report("local exact", build, latencies, truth, truth)
+
+    build, query = local_backend("ivf", vectors, ids, ann_threshold=0)
+    latencies, results = timed_queries(query, probes, args.k)
+    report("local ivf", build, latencies, results, truth)
+
+    if not args.skip_chroma:
+        try:
+            build, query, cleanup = chroma_backend(vectors, ids, args.chroma_url)
+        except Exception as e:
+            print(f"chroma             skipped: {e}")
+            return
+        try:
+            latencies, results = timed_queries(query, probes, args.k)
+            report("chroma", build, latencies, results, truth)
+        finally:
+            cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -15,7 +15,14 @@ except ImportError:  # pragma: no cover - provide minimal streamlit stub
         def __exit__(self, exc_type, exc, tb):
             pass
 
+    class _DummyPlaceholder:
+        def markdown(self, *args, **kwargs):
+            pass
+
     class _DummyStreamlit:
+        def empty(self):
+            return _DummyPlaceholder()
+
         def error(self, *args, **kwargs):
             pass
 
@@ -38,9 +45,8 @@ except ImportError:  # pragma: no cover - provide minimal streamlit stub
             pass
 
     st = _DummyStreamlit()
-from lib.game_agent import GameAgent, report_run
-import io
-import contextlib
+from lib.game_agent import GameAgent, format_run
+from lib.tracing import RecordingTracer, RingBufferExporter, format_spans, use_tracer
 
 
 def check_env() -> list[str]:
@@ -76,19 +82,27 @@ def main():
     query = st.text_input("Ask a question about video games")
     if st.button("Ask") and query:
         agent = GameAgent()
+        placeholder = st.empty()
+        tokens: list[str] = []
+
+        def show_token(text: str):
+            # Render the answer while it is being generated
+            tokens.append(text)
+            placeholder.markdown("".join(tokens) + "▌")
+
         with st.spinner("Thinking..."):
-            buf = io.StringIO()
-            with contextlib.redirect_stdout(buf):
-                run = agent.invoke(query)
-                report_run(run)
-            debug_output = buf.getvalue()
+            # Per-request tracer: concurrent sessions never see each other's spans
+            trace = RingBufferExporter()
+            with use_tracer(RecordingTracer([trace])):
+                run = agent.invoke(query, on_token=show_token)
+            debug_output = format_spans(trace.spans()) + "\n\n" + format_run(run)
         final = run.get_final_state()
         answer = final.get("answer") if final else None
         if answer:
             st.session_state["history"].append(
                 {"question": query, "answer": answer, "debug": debug_output}
             )
-            st.write(answer)
+            placeholder.markdown(answer)
             with st.expander("Debug"):
                 st.code(debug_output)
         else:
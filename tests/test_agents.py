@@ -0,0 +1,107 @@
+import asyncio
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from lib.agents import Agent
+from lib.resources import get_tool_executor
+from lib.tooling import tool
+
+
+@tool
+def slow_upper(text: str) -> str:
+    """Upper-case text, slowly."""
+    time.sleep(0.2)
+    return text.upper()
+
+
+@tool(timeout=0.05)
+def stuck(text: str) -> str:
+    """Never answers in time."""
+    time.sleep(0.5)
+    return text
+
+
+def _call(call_id, name, **arguments):
+    return SimpleNamespace(id=call_id, function=SimpleNamespace(name=name, arguments=json.dumps(arguments)))
+
+
+def _state():
+    return {
+        "messages": [],
+        "session_id": "test",
+        "current_tool_calls": [
+            _call("1", "slow_upper", text="mario"),
+            _call("2", "missing"),
+            _call("3", "slow_upper", text="zelda"),
+            _call("4", "stuck", text="kirby"),
+        ],
+    }
+
+
+def _contents(update):
+    return [(m.tool_call_id, json.loads(m.content)) for m in update["messages"]]
+
+
+def test_tool_calls_run_concurrently_in_call_order():
+    agent = Agent(model_name="gpt-4o-mini", instructions="", tools=[slow_upper, stuck])
+    expected = [
+        ("1", "MARIO"),
+        ("2", "Error: unknown tool 'missing'"),
+        ("3", "ZELDA"),
+        ("4", "Error: tool 'stuck' timed out after 0.05s"),
+    ]
+
+    pool = get_tool_executor(agent.max_tool_workers)
+    start = time.perf_counter()
+    update = agent._tool_step(_state())
+    assert time.perf_counter() - start < 0.35
+    assert _contents(update) == expected
+    assert update["current_tool_calls"] is None
+    # The stuck call still holds a worker, so later calls get a fresh pool
+    assert get_tool_executor(agent.max_tool_workers) is not pool
+
+    start = time.perf_counter()
+    update = asyncio.run(agent._atool_step(_state()))
+    assert time.perf_counter() - start < 0.35
+    assert _contents(update) == expected
+
+
+def test_context_window_keeps_tool_pairs_and_summarizes():
+    from lib.context_window import ContextWindow, is_summary
+    from lib.messages import AIMessage, SystemMessage, ToolMessage, UserMessage
+
+    def turn(i):
+        call = {"id": f"c{i}", "type": "function",
+                "function": {"name": "slow_upper", "arguments": json.dumps({"text": "x" * 40})}}
+        return [
+            UserMessage(content=f"question {i} " + "q" * 80),
+            AIMessage(content=None, tool_calls=[call]),
+            ToolMessage(content="r" * 80, tool_call_id=f"c{i}", name="slow_upper"),
+            AIMessage(content=f"answer {i} " + "a" * 80),
+        ]
+
+    history = [SystemMessage(content="instructions")] + [m for i in range(6) for m in turn(i)]
+    summarized = []
+    window = ContextWindow(max_tokens=200, summarizer=lambda msgs: summarized.append(msgs) or "earlier turns")
+
+    messages, report = window.fit(history)
+    assert messages[0].content == "instructions"
+    assert is_summary(messages[1])
+    assert window.count(messages) <= 150
+    assert report.tokens_saved == report.tokens_before - window.count(messages) > 0
+    assert messages[-1] is history[-1]
+    for index, message in enumerate(messages):
+        if isinstance(message, ToolMessage):
+            assert messages[index - 1].tool_calls[0].id == message.tool_call_id
+    assert summarized[0][0] is history[1]
+
+    # Within budget: untouched, no further summarization
+    assert window.fit(messages) == (messages, None)
+    # The previous summary is folded into the next one
+    window.fit(messages + turn(6) + turn(7))
+    assert is_summary(summarized[-1][0])
@@ -0,0 +1,50 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from lib.embedding_cache import CachedEncoder, EmbeddingCache
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return np.array([[float(len(t)), float(t.count("a"))] for t in texts], dtype=np.float32)
+
+
+def test_repeated_and_normalized_queries_hit_the_cache():
+    encoder = CountingEncoder()
+    embed = CachedEncoder("model", encoder, EmbeddingCache(max_entries=10))
+
+    first = embed(["Mario Kart", "Zelda", "mario   KART "])
+    assert encoder.calls == [["Mario Kart", "Zelda"]]
+    assert np.array_equal(first[0], first[2])
+
+    embed(["zelda"])
+    assert len(encoder.calls) == 1
+    assert embed.cache.stats()["hits"] == 2
+    assert embed.cache.misses == 2
+
+
+def test_lru_eviction_and_disk_persistence(tmp_path):
+    encoder = CountingEncoder()
+    cache = EmbeddingCache(max_entries=2, directory=str(tmp_path))
+    cache.embed("model", ["a", "b", "c"], encoder)
+    assert len(cache) == 2
+
+    cache.embed("model", ["b"], encoder)
+    assert cache.hits == 1
+
+    restarted = EmbeddingCache(max_entries=2, directory=str(tmp_path))
+    vectors = restarted.embed("model", ["a", "c"], encoder)
+    assert len(encoder.calls) == 1
+    assert restarted.disk_hits == 2
+    assert vectors.tolist() == [[1.0, 1.0], [1.0, 0.0]]
+
+    restarted.embed("other-model", ["a"], encoder)
+    assert len(encoder.calls) == 2
@@ -0,0 +1,96 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from lib.indexing import sync_games
+
+
+class FakeStore:
+    collection_id = "collection-1"
+
+    def __init__(self):
+        self.docs = {}
+        self.upserted = []
+
+    def upsert_stream(self, documents, **kwargs):
+        for doc in documents:
+            self.docs[doc.id] = doc
+            self.upserted.append(doc.id)
+
+    def delete(self, ids):
+        for doc_id in ids:
+            self.docs.pop(doc_id, None)
+
+
+def _write_game(directory, doc_id, name):
+    game = {"Name": name, "Platform": "PC", "YearOfRelease": 2000, "Description": "A game"}
+    with open(os.path.join(directory, f"{doc_id}.json"), "w", encoding="utf-8") as f:
+        json.dump(game, f)
+
+
+def test_sync_games_only_reindexes_changes(tmp_path):
+    games = tmp_path / "games"
+    games.mkdir()
+    manifest = str(tmp_path / "manifest.json")
+    for doc_id in ("001", "002", "003"):
+        _write_game(games, doc_id, f"Game {doc_id}")
+
+    store = FakeStore()
+    stats = sync_games(store, str(games), manifest, report_progress=False)
+    assert stats.added == 3
+    assert sorted(store.docs) == ["001", "002", "003"]
+
+    store.upserted.clear()
+    stats = sync_games(store, str(games), manifest, report_progress=False)
+    assert stats.changed == 0
+    assert stats.unchanged == 3
+    assert store.upserted == []
+
+    _write_game(games, "002", "Game 2 Remastered")
+    os.remove(games / "003.json")
+    stats = sync_games(store, str(games), manifest, report_progress=False)
+    assert (stats.added, stats.updated, stats.deleted) == (0, 1, 1)
+    assert store.upserted == ["002"]
+    assert sorted(store.docs) == ["001", "002"]
+    assert "Remastered" in store.docs["002"].content
+
+
+def test_sync_games_resets_when_collection_changes(tmp_path):
+    games = tmp_path / "games"
+    games.mkdir()
+    manifest = str(tmp_path / "manifest.json")
+    _write_game(games, "001", "Game")
+
+    sync_games(FakeStore(), str(games), manifest, report_progress=False)
+
+    recreated = FakeStore()
+    recreated.collection_id = "collection-2"
+    stats = sync_games(recreated, str(games), manifest, report_progress=False)
+    assert stats.added == 1
+    assert list(recreated.docs) == ["001"]
+
+
+def test_sync_games_skips_malformed_files(tmp_path):
+    games = tmp_path / "games"
+    games.mkdir()
+    manifest = str(tmp_path / "manifest.json")
+    _write_game(games, "001", "Game")
+    (games / "002.json").write_text("{not json", encoding="utf-8")
+    (games / "003.json").write_text(json.dumps({"Name": "No platform"}), encoding="utf-8")
+    (games / "004.json").write_text("[1, 2]", encoding="utf-8")
+
+    store = FakeStore()
+    stats = sync_games(store, str(games), manifest, report_progress=False)
+    assert (stats.added, stats.skipped) == (1, 3)
+    assert list(store.docs) == ["001"]
+
+    # Skipped files stay out of the manifest and are retried once fixed
+    _write_game(games, "002", "Game 2")
+    stats = sync_games(store, str(games), manifest, report_progress=False)
+    assert (stats.added, stats.skipped) == (1, 2)
+    assert sorted(store.docs) == ["001", "002"]
+
+    from lib.loaders import JSONGameLoader
+    assert [doc.id for doc in JSONGameLoader(str(games)).iter_documents(skip_invalid=True)] == ["001", "002"]
@@ -0,0 +1,239 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from lib.llm import LLM
+from lib.llm_cache import ResponseCache
+from lib.messages import AIMessage, TokenUsage
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, **payload):
+        self.calls += 1
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=f"answer {self.calls}", tool_calls=None))],
+            usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15),
+        )
+
+
+def _llm(cache):
+    llm = LLM(model="gpt-4o-mini", api_key="test", cache=cache)
+    llm.client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()))
+    return llm
+
+
+def _payload(content, model="gpt-4o-mini"):
+    return {"model": model, "temperature": 0.0, "messages": [{"role": "user", "content": content}]}
+
+
+def test_identical_payloads_are_served_from_cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"))
+    llm = _llm(cache)
+
+    first = llm.invoke("Who made Gran Turismo?")
+    second = llm.invoke("Who made Gran Turismo?")
+    assert llm.client.chat.completions.calls == 1
+    assert second.content == first.content == "answer 1"
+    assert second.token_usage.total_tokens == 15
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    llm.invoke("Who made Pokémon Gold?")
+    assert llm.client.chat.completions.calls == 2
+
+    reopened = _llm(ResponseCache(str(tmp_path / "responses.sqlite")))
+    assert reopened.invoke("Who made Gran Turismo?").content == "answer 1"
+    assert reopened.client.chat.completions.calls == 0
+
+
+def test_ttl_and_size_bound_eviction():
+    cache = ResponseCache(max_entries=2)
+    for prompt in ("a", "b", "c"):
+        cache.put(_payload(prompt), AIMessage(content=prompt))
+    assert len(cache) == 2
+    assert cache.get(_payload("a")) is None
+    assert cache.get(_payload("c")).content == "c"
+
+    expired = ResponseCache(ttl_seconds=0)
+    expired.put(_payload("a"), AIMessage(content="a", token_usage=TokenUsage(total_tokens=3)))
+    assert expired.get(_payload("a")) is None
+
+
+def test_semantic_lookup_requires_same_settings():
+    def encoder(texts):
+        return np.array([[t.lower().count("mario"), t.lower().count("zelda"), 1.0] for t in texts])
+
+    cache = ResponseCache(semantic_threshold=0.99, encoder=encoder)
+    cache.put(_payload("When was Mario 64 released?"), AIMessage(content="1996"))
+
+    assert cache.get(_payload("when was MARIO 64 released")).content == "1996"
+    assert cache.semantic_hits == 1
+    assert cache.get(_payload("When was Zelda released?")) is None
+    assert cache.get(_payload("When was Mario 64 released?", model="gpt-4o")) is None
+
+
+def test_ainvoke_retries_and_limits_in_flight_requests(monkeypatch):
+    import asyncio
+    import lib.llm as llm_module
+
+    class RateLimited(Exception):
+        status_code = 429
+        response = None
+
+    class FakeAsyncCompletions:
+        def __init__(self):
+            self.calls = self.active = self.peak = 0
+
+        async def create(self, **payload):
+            self.calls += 1
+            attempt = self.calls
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            try:
+                await asyncio.sleep(0.01)
+                if attempt == 1:
+                    raise RateLimited()
+                return FakeCompletions().create(**payload)
+            finally:
+                self.active -= 1
+
+    completions = FakeAsyncCompletions()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    monkeypatch.setattr(llm_module, "get_async_openai_client", lambda api_key=None: client)
+    monkeypatch.setattr(llm_module, "RETRY_BASE_DELAY", 0.001)
+
+    async def main():
+        llm_module.set_max_in_flight(2)
+        llm = LLM(api_key="test", cache=ResponseCache())
+        return await asyncio.gather(*(llm.ainvoke(f"question {i}") for i in range(6)))
+
+    answers = asyncio.run(main())
+    assert [a.content for a in answers] == ["answer 1"] * 6
+    assert completions.calls == 7
+    assert completions.peak == 2
+
+
+def test_payloads_reuse_serialized_history_and_tool_schemas(monkeypatch):
+    from lib.messages import SystemMessage, UserMessage
+    from lib.persistent import PersistentList
+    from lib.tooling import tool
+
+    @tool
+    def lookup(query: str) -> str:
+        """Look something up."""
+        return query
+
+    serialized = []
+    original = LLM._serialize
+    monkeypatch.setattr(LLM, "_serialize", staticmethod(lambda m: serialized.append(m) or original(m)))
+
+    llm = LLM(model="gpt-4o-mini", api_key="test", cache=None, tools=[lookup])
+    history = PersistentList([SystemMessage(content="system"), UserMessage(content="hi")])
+    first = llm._build_payload(history)
+    longer = history + [AIMessage(content="hello"), UserMessage(content="bye")]
+    second = llm._build_payload(longer)
+
+    assert len(serialized) == 4
+    assert [m["content"] for m in second["messages"]] == ["system", "hi", "hello", "bye"]
+    assert len(llm._build_payload(history)["messages"]) == 2
+    assert second["tools"] is first["tools"]
+
+
+def _chunk(content=None, tool_calls=None, usage=None):
+    choices = [] if usage else [SimpleNamespace(delta=SimpleNamespace(content=content, tool_calls=tool_calls))]
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+def _tool_fragment(index, arguments, call_id=None, name=None):
+    return SimpleNamespace(index=index, id=call_id, function=SimpleNamespace(name=name, arguments=arguments))
+
+
+STREAM = [
+    _chunk("Gran "),
+    _chunk("Turismo", tool_calls=[_tool_fragment(0, '{"que', call_id="call_1", name="lookup")]),
+    _chunk(tool_calls=[_tool_fragment(0, 'ry": "gt"}')]),
+    _chunk(usage=SimpleNamespace(prompt_tokens=7, completion_tokens=3, total_tokens=10)),
+]
+
+
+def test_stream_yields_deltas_and_assembles_tool_calls(monkeypatch):
+    import asyncio
+    from lib.llm import stream_tokens
+    from lib.profiling import RunProfile, profiling
+
+    llm = _llm(ResponseCache())
+    llm.client.chat.completions.create = lambda **payload: iter(STREAM)
+
+    stream = llm.stream("Who made Gran Turismo?")
+    profile = RunProfile()
+    with profiling(profile):
+        assert list(stream) == ["Gran ", "Turismo"]
+    assert stream.message.content == "Gran Turismo"
+    assert stream.message.tool_calls[0].function.arguments == '{"query": "gt"}'
+    assert stream.message.token_usage.total_tokens == 10
+    assert profile.llm_calls[0].ttft_ms is not None
+
+    # Completed streams populate the cache shared with invoke
+    assert llm.invoke("Who made Gran Turismo?").content == "Gran Turismo"
+    received = []
+    with stream_tokens(received.append):
+        assert llm.respond("Who made Gran Turismo?").content == "Gran Turismo"
+    assert received == ["Gran Turismo"]
+
+    async def chunks():
+        for chunk in STREAM:
+            yield chunk
+
+    async def fake_create(**payload):
+        return chunks()
+
+    async def stream_async():
+        received.clear()
+        with stream_tokens(received.append):
+            return await llm.arespond("Who made Forza?")
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=fake_create)))
+    monkeypatch.setattr("lib.llm.get_async_openai_client", lambda api_key=None: client)
+    message = asyncio.run(stream_async())
+    assert received == ["Gran ", "Turismo"]
+    assert message.tool_calls[0].id == "call_1"
+
+
+def test_astream_holds_its_in_flight_slot_until_consumed(monkeypatch):
+    import asyncio
+    import lib.llm as llm_module
+
+    async def chunks():
+        for chunk in STREAM:
+            yield chunk
+
+    async def fake_create(**payload):
+        return chunks()
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=fake_create)))
+    monkeypatch.setattr(llm_module, "get_async_openai_client", lambda api_key=None: client)
+
+    async def main():
+        llm_module.set_max_in_flight(1)
+        llm = LLM(api_key="test")
+        first = await llm.astream("Who made Gran Turismo?")
+        second = asyncio.create_task(llm.astream("Who made Forza?"))
+        await asyncio.sleep(0.01)
+        assert not second.done()
+
+        assert [text async for text in first] == ["Gran ", "Turismo"]
+        second = await asyncio.wait_for(second, 1)
+
+        # Closing an unconsumed stream frees its slot as well
+        await second.aclose()
+        third = await asyncio.wait_for(llm.astream("Who made Halo?"), 1)
+        async with third:
+            assert [text async for text in third] == ["Gran ", "Turismo"]
+
+    asyncio.run(main())
@@ -0,0 +1,286 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from lib.memory import SessionNotFoundError, ShortTermMemory
+
+
+def test_objects_are_shared_and_sessions_capped():
+    memory = ShortTermMemory(max_items=3)
+    memory.create_session("long", max_items=5)
+    runs = [object() for _ in range(6)]
+    for run in runs:
+        memory.add(run)
+        memory.add(run, "long")
+
+    assert memory.get_last_object() is runs[-1]
+    assert memory.get_all_objects() == runs[-3:]
+    assert memory.get_all_objects("long") == runs[-5:]
+
+    # Readers get a new list: mutating it does not touch the memory
+    memory.get_all_objects().clear()
+    assert len(memory.get_all_objects()) == 3
+
+    memory.reset()
+    assert memory.get_last_object("long") is None
+    for run in runs:
+        memory.add(run, "long")
+    assert len(memory.get_all_objects("long")) == 5
+    assert memory.pop("long") is runs[-1]
+
+    with pytest.raises(SessionNotFoundError):
+        memory.get_last_object("missing")
+
+
+class FakeRedis:
+    """In-process stand-in for the redis-py commands RedisSessionStore uses"""
+
+    def __init__(self):
+        self.data = {}
+
+    def sadd(self, key, member):
+        members = self.data.setdefault(key, set())
+        added = member not in members
+        members.add(member)
+        return int(added)
+
+    def srem(self, key, member):
+        members = self.data.get(key, set())
+        removed = member in members
+        members.discard(member)
+        return int(removed)
+
+    def sismember(self, key, member):
+        return member in self.data.get(key, set())
+
+    def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+    def hset(self, key, field, value):
+        self.data.setdefault(key, {})[field] = str(value).encode()
+
+    def hget(self, key, field):
+        return self.data.get(key, {}).get(field)
+
+    def hdel(self, key, field):
+        self.data.get(key, {}).pop(field, None)
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def rpush(self, key, value):
+        self.data.setdefault(key, []).append(value)
+
+    def rpop(self, key):
+        values = self.data.get(key)
+        return values.pop() if values else None
+
+    def lindex(self, key, index):
+        values = self.data.get(key, [])
+        return values[index] if -len(values) <= index < len(values) else None
+
+    def lrange(self, key, start, end):
+        return self.data.get(key, [])[start:end + 1]
+
+    def ltrim(self, key, start, end):
+        values = self.data.get(key, [])
+        self.data[key] = values[start:] if end == -1 else values[start:end + 1]
+
+
+def _completed_run(question):
+    from lib.messages import UserMessage
+    from lib.persistent import PersistentList
+    from lib.state_machine import Run, Snapshot
+
+    run = Run.create()
+    state = {"messages": PersistentList([UserMessage(content=question)])}
+    run.add_snapshot(Snapshot.create(state, dict, "llm_processor"))
+    run.complete()
+    return run
+
+
+def test_persistent_stores_share_sessions_between_memories(tmp_path):
+    from lib.session_store import RedisSessionStore, SQLiteSessionStore
+
+    stores = [
+        lambda: SQLiteSessionStore(str(tmp_path / "sessions.sqlite")),
+        lambda: RedisSessionStore(client=redis_client),
+    ]
+    redis_client = FakeRedis()
+    for make_store in stores:
+        # Two memories over the same storage stand in for two processes
+        first = ShortTermMemory(store=make_store(), max_items=2)
+        second = ShortTermMemory(store=make_store())
+        first.create_session("alice")
+        for question in ("a", "b", "c"):
+            first.add(_completed_run(question), "alice")
+
+        assert "alice" in second.get_all_sessions()
+        last = second.get_last_object("alice")
+        assert last.get_final_state()["messages"][0].content == "c"
+        assert [run.get_final_state()["messages"][0].content for run in second.iter_objects("alice")] == ["b", "c"]
+
+        assert second.pop("alice").run_id == last.run_id
+        assert len(first.get_all_objects("alice")) == 1
+        first.reset()
+        assert second.get_last_object("alice") is None
+        assert second.delete_session("alice") and not first.delete_session("alice")
+
+        # Capping an existing session evicts its oldest objects
+        second.create_session("bob")
+        for item in ("x", "y", "z"):
+            second.add(item, "bob")
+        assert not first.create_session("bob", max_items=1)
+        assert second.get_all_objects("bob") == ["z"]
+
+
+def test_namespaces_keep_shared_sessions_apart_and_caps_apply():
+    from lib.agents import Agent
+    from lib.session_store import InMemorySessionStore
+
+    store = InMemorySessionStore()
+    pirate = Agent("gpt-4o-mini", "You are a pirate", session_store=store)
+    lawyer = Agent("gpt-4o-mini", "You are a lawyer", session_store=store, max_session_runs=1)
+    assert pirate.agent_id != lawyer.agent_id
+    assert Agent("gpt-4o-mini", "You are a pirate", session_store=store).agent_id == pirate.agent_id
+
+    pirate.memory.add("ahoy")
+    assert lawyer.memory.get_last_object() is None
+    assert lawyer.memory.get_all_sessions() == ["default"]
+
+    # A cap given for an existing session applies to it
+    unbounded = ShortTermMemory(store=store, namespace="shared")
+    for i in range(3):
+        unbounded.add(i)
+    capped = ShortTermMemory(store=store, namespace="shared", max_items=2)
+    assert capped.get_all_objects() == [1, 2]
+    capped.add(3)
+    assert unbounded.get_all_objects() == [2, 3]
+    unbounded.reset()
+    assert pirate.memory.get_last_object() == "ahoy"
+
+class CountingEncoder:
+    """Deterministic bag-of-letters embeddings; counts model calls"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, input):
+        import numpy as np
+        self.calls += 1
+        vectors = np.zeros((len(input), 26), dtype=np.float32)
+        for row, text in enumerate(input):
+            for char in text.lower():
+                if char.isalpha() and char.isascii():
+                    vectors[row, ord(char) - ord("a")] += 1
+        return vectors
+
+
+def _local_db(encoder):
+    from types import SimpleNamespace
+    from lib.vector_backends import LocalVectorIndex
+    from lib.vector_db import VectorStore
+
+    indexes = {}
+
+    def get_or_create_store(name):
+        index = indexes.setdefault(name, LocalVectorIndex(name, embedding_function=encoder))
+        return VectorStore(index, encoder)
+
+    return SimpleNamespace(get_or_create_store=get_or_create_store)
+
+
+def test_long_term_memory_attaches_and_writes_in_batches():
+    from lib.memory import LongTermMemory, MemoryFragment
+
+    encoder = CountingEncoder()
+    db = _local_db(encoder)
+    memory = LongTermMemory(db, write_behind=True, batch_size=50, flush_interval=0.05)
+    fragments = [MemoryFragment(content=f"likes puzzle game {i}", owner="alice") for i in range(100)]
+    memory.register_many(fragments)
+    memory.register(MemoryFragment(content="favorite game is zelda", owner="alice"))
+    memory.flush()
+    assert encoder.calls <= 3
+
+    # A new instance attaches to the existing memories instead of wiping them
+    reopened = LongTermMemory(db)
+    result = reopened.search("favorite game is zelda", owner="alice", limit=1)
+    assert result.fragments[0].content == "favorite game is zelda"
+    memory.close()
+
+
+
+def test_write_behind_memory_is_collectable_and_rejects_writes_after_close():
+    import gc
+    import weakref
+    from lib.memory import LongTermMemory, MemoryFragment
+
+    db = _local_db(CountingEncoder())
+    memory = LongTermMemory(db, write_behind=True, flush_interval=0.01)
+    memory.register(MemoryFragment(content="likes zelda", owner="alice"))
+    memory.flush()
+    thread, ref = memory._writer._thread, weakref.ref(memory)
+    del memory
+    gc.collect()
+    assert ref() is None
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+
+    memory = LongTermMemory(db, write_behind=True)
+    memory.close()
+    with pytest.raises(RuntimeError):
+        memory.register(MemoryFragment(content="likes mario", owner="alice"))
+    memory.flush()
+    assert LongTermMemory(db).get_owners() == ["alice"]
+
+def test_namespace_index_is_built_once_and_kept_current():
+    from lib.memory import LongTermMemory, MemoryFragment
+
+    db = _local_db(CountingEncoder())
+    LongTermMemory(db).register_many([
+        MemoryFragment(content="likes zelda", owner="alice", namespace="games", timestamp=100),
+        MemoryFragment(content="likes mario", owner="alice", namespace="games", timestamp=300),
+        MemoryFragment(content="plays on pc", owner="bob", namespace="platforms", timestamp=200),
+    ])
+
+    memory = LongTermMemory(db)
+    assert memory.get_namespaces() == ["games", "platforms"]
+    memory.register(MemoryFragment(content="likes chess", owner="carol", namespace="board", timestamp=50))
+    assert memory.get_namespaces() == ["board", "games", "platforms"]
+    assert memory.get_owners("games") == ["alice"]
+    assert memory.get_owners() == ["alice", "bob", "carol"]
+
+    stats = memory.stats()["games"]["alice"]
+    assert (stats.count, stats.first_timestamp, stats.last_timestamp) == (2, 100, 300)
+
+
+def test_recency_ranking_and_near_duplicate_merging():
+    import time
+    from lib.memory import LongTermMemory, MemoryFragment, RecencyRanking
+
+    db = _local_db(CountingEncoder())
+    now = int(time.time())
+    memory = LongTermMemory(db, merge_distance=0.01)
+    memory.register_many([
+        MemoryFragment(content="favorite game is zelda", owner="alice", timestamp=now - 90 * 86400),
+        MemoryFragment(content="favourite game is mario", owner="alice", timestamp=now),
+    ])
+
+    plain = memory.search("favorite game", owner="alice", limit=1)
+    assert plain.fragments[0].content == "favorite game is zelda"
+    ranked = memory.search("favorite game", owner="alice", limit=1,
+                           ranking=RecencyRanking(half_life_seconds=86400, recency_weight=1.0))
+    assert ranked.fragments[0].content == "favourite game is mario"
+    assert len(ranked.metadata["scores"]) == 1
+
+    # Same letters, so within the merge distance: replaces instead of adding
+    memory.register(MemoryFragment(content="zelda is favorite game", owner="alice", timestamp=now))
+    assert memory.stats()["default"]["alice"].count == 2
+    results = memory.search("favorite game is zelda", owner="alice", limit=5)
+    assert len(results.fragments) == 2
+    assert results.fragments[0].content == "zelda is favorite game"
+    hit = memory.vector_store.search("zelda is favorite game", n_results=1)[0].hits[0]
+    assert hit.metadata["merged_count"] == 2
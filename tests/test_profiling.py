@@ -0,0 +1,66 @@
+import os
+import sys
+from typing import List, TypedDict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from lib.profiling import (
+    RunProfile, StepTiming, aggregate_profiles, format_profile_report, percentile, timed_operation,
+)
+from lib.state_machine import EntryPoint, StateMachine, Step, Termination
+from lib.tooling import tool
+
+
+class ChatState(TypedDict):
+    question: str
+    messages: List[str]
+
+
+@tool
+def lookup(query: str) -> str:
+    """Look something up."""
+    with timed_operation("vector_search", "games"):
+        return query.upper()
+
+
+def _machine():
+    def answer(state):
+        return {"messages": state["messages"] + [lookup(state["question"])]}
+
+    machine = StateMachine[ChatState](ChatState)
+    entry, termination = EntryPoint[ChatState](), Termination[ChatState]()
+    step = Step[ChatState]("answer", answer)
+    machine.add_steps([entry, step, termination])
+    machine.connect(entry, step)
+    machine.connect(step, termination)
+    return machine
+
+
+def test_run_records_steps_tools_and_operations():
+    machine = _machine()
+    runs = [machine.run({"question": "mario", "messages": []}) for _ in range(3)]
+
+    profile = runs[0].profile
+    assert [step.step_id for step in profile.steps] == ["__entry__", "answer"]
+    assert all(step.wall_ms >= 0 and step.cpu_ms is not None for step in profile.steps)
+    assert [call.name for call in profile.tool_calls] == ["lookup"]
+    assert [(op.category, op.name) for op in profile.operations] == [("vector_search", "games")]
+
+    report = aggregate_profiles(run.profile for run in runs)
+    assert report["tool:lookup"]["count"] == 3
+    assert report["step:answer"]["p50"] <= report["step:answer"]["p99"]
+    assert "vector_search:games" in format_profile_report(run.profile for run in runs)
+
+
+def test_recording_is_a_noop_outside_runs():
+    with timed_operation("embedding", "model") as context:
+        assert context is None
+    assert lookup("zelda") == "ZELDA"
+
+
+def test_percentiles():
+    assert percentile([], 50) == 0.0
+    assert percentile([1, 2, 3, 4], 50) == 2.5
+    assert percentile(list(range(101)), 95) == 95
+    profile = RunProfile(steps=[StepTiming("a", 10.0, None)])
+    assert "step_cpu:a" not in aggregate_profiles([profile])
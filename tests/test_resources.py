@@ -0,0 +1,95 @@
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from lib import resources
+from lib.resources import ResourceRegistry
+
+
+def test_get_or_create_builds_each_resource_once():
+    registry = ResourceRegistry()
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return object()
+
+    first = registry.get_or_create("model", factory)
+    assert registry.get_or_create("model", factory) is first
+    assert len(calls) == 1
+    assert "model" in registry and len(registry) == 1
+
+
+def test_creation_is_serialized_per_key():
+    registry = ResourceRegistry()
+    slow_started = threading.Event()
+    calls = {"slow": 0, "fast": 0}
+
+    def slow():
+        calls["slow"] += 1
+        slow_started.set()
+        time.sleep(0.2)
+        return object()
+
+    def fast():
+        calls["fast"] += 1
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get_or_create("slow", slow)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+
+    # An unrelated key is not held up by the slow factory
+    assert slow_started.wait(1)
+    start = time.perf_counter()
+    registry.get_or_create("fast", fast)
+    assert time.perf_counter() - start < 0.1
+
+    for thread in threads:
+        thread.join()
+    assert calls == {"slow": 1, "fast": 1}
+    assert len(results) == 8 and all(r is results[0] for r in results)
+
+
+def test_discard_skips_a_replaced_resource():
+    registry = ResourceRegistry()
+    old = registry.get_or_create("pool", object)
+    registry.discard("pool", old)
+    new = registry.get_or_create("pool", object)
+    assert new is not old
+
+    # A stale discard must not drop the replacement
+    registry.discard("pool", old)
+    assert registry.get_or_create("pool", object) is new
+
+    registry.discard("pool")
+    assert "pool" not in registry
+
+
+def test_get_collection_is_keyed_by_embedding_function(monkeypatch):
+    created = []
+
+    def get_or_create_collection(name, embedding_function=None):
+        created.append((name, embedding_function))
+        return SimpleNamespace(name=name, embedding_function=embedding_function)
+
+    client = SimpleNamespace(get_or_create_collection=get_or_create_collection)
+    monkeypatch.setattr(resources, "registry", ResourceRegistry())
+    monkeypatch.setattr(resources, "get_chroma_client", lambda server_url, persist_directory: client)
+
+    minilm, mpnet = object(), object()
+    plain = resources.get_collection("games", server_url="")
+    with_minilm = resources.get_collection("games", server_url="", embedding_function=minilm)
+    with_mpnet = resources.get_collection("games", server_url="", embedding_function=mpnet)
+
+    assert len({id(plain), id(with_minilm), id(with_mpnet)}) == 3
+    assert with_minilm.embedding_function is minilm
+    assert resources.get_collection("games", server_url="", embedding_function=minilm) is with_minilm
+    assert resources.get_collection("games", server_url="") is plain
+    assert created == [("games", None), ("games", minilm), ("games", mpnet)]
@@ -0,0 +1,248 @@
+import asyncio
+import operator
+import os
+import sys
+import threading
+import time
+from typing import List, TypedDict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from lib.state_machine import EntryPoint, Join, RetentionPolicy, StateMachine, Step, Termination
+
+
+class CounterState(TypedDict):
+    value: int
+    trace: List[str]
+
+
+def _machine(async_sleep: float = 0.0, sync_sleep: float = 0.0):
+    def add_one(state):
+        time.sleep(sync_sleep)
+        return {"value": state["value"] + 1, "trace": state["trace"] + [threading.current_thread().name]}
+
+    async def double(state):
+        await asyncio.sleep(async_sleep)
+        return {"value": state["value"] * 2, "ignored": True}
+
+    machine = StateMachine[CounterState](CounterState)
+    entry, termination = EntryPoint[CounterState](), Termination[CounterState]()
+    first = Step[CounterState]("add_one", add_one)
+    second = Step[CounterState]("double", double)
+    machine.add_steps([entry, first, second, termination])
+    machine.connect(entry, first)
+    machine.connect(first, second)
+    machine.connect(second, termination)
+    return machine
+
+
+def test_run_and_arun_produce_the_same_history():
+    machine = _machine()
+    sync_run = machine.run({"value": 1, "trace": []})
+    async_run = asyncio.run(machine.arun({"value": 1, "trace": []}))
+
+    for run in (sync_run, async_run):
+        assert [s.step_id for s in run.snapshots] == ["__entry__", "add_one", "double"]
+        assert run.get_final_state()["value"] == 4
+        assert "ignored" not in run.get_final_state()
+        assert run.end_timestamp is not None
+
+    # Sync logic is offloaded to a worker thread under arun
+    assert async_run.get_final_state()["trace"] != [threading.current_thread().name]
+
+
+def test_arun_multiplexes_runs_on_one_loop():
+    machine = _machine(async_sleep=0.05, sync_sleep=0.05)
+
+    async def main():
+        return await asyncio.gather(*(machine.arun({"value": i, "trace": []}) for i in range(8)))
+
+    start = time.perf_counter()
+    runs = asyncio.run(main())
+    elapsed = time.perf_counter() - start
+
+    assert [r.get_final_state()["value"] for r in runs] == [(i + 1) * 2 for i in range(8)]
+    assert elapsed < 8 * 0.1 / 2
+
+
+class FanOutState(TypedDict):
+    query: str
+    docs: List[str]
+    web: List[str]
+    sources: List[str]
+
+
+def _fan_out_machine(reducers, extend=False, join_logic=None):
+    def retrieve(state):
+        time.sleep(0.05)
+        return {"docs": ["doc"], "sources": state["sources"] + ["vector"] if extend else ["vector"]}
+
+    def search(state):
+        time.sleep(0.05)
+        return {"web": ["page"], "sources": state["sources"] + ["web"] if extend else ["web"]}
+
+    machine = StateMachine[FanOutState](FanOutState)
+    entry, termination = EntryPoint[FanOutState](), Termination[FanOutState]()
+    retrieve_step = Step[FanOutState]("retrieve", retrieve)
+    search_step = Step[FanOutState]("search", search)
+    join = Join[FanOutState]("join", reducers=reducers, logic=join_logic)
+    machine.add_steps([entry, retrieve_step, search_step, join, termination])
+    machine.connect(entry, [retrieve_step, search_step])
+    machine.connect(retrieve_step, join)
+    machine.connect(search_step, join)
+    machine.connect(join, termination)
+    return machine
+
+
+def test_parallel_branches_merge_at_join():
+    machine = _fan_out_machine({"sources": operator.add})
+    for execute in (machine.run, lambda s: asyncio.run(machine.arun(s))):
+        start = time.perf_counter()
+        run = execute({"query": "mario", "sources": []})
+        assert time.perf_counter() - start < 0.09
+
+        final = run.get_final_state()
+        assert final["docs"] == ["doc"] and final["web"] == ["page"]
+        assert final["sources"] == ["vector", "web"]
+        assert [s.step_id for s in run.snapshots] == ["__entry__", "retrieve", "search", "join"]
+
+
+def test_reducers_fold_branch_changes_into_the_fork_value():
+    machine = _fan_out_machine({"sources": operator.add}, extend=True)
+    for execute in (machine.run, lambda s: asyncio.run(machine.arun(s))):
+        final = execute({"query": "mario", "sources": ["seed"]}).get_final_state()
+        assert list(final["sources"]) == ["seed", "vector", "web"]
+
+
+def test_arun_awaits_async_join_logic():
+    async def summarize(state):
+        await asyncio.sleep(0)
+        return {"docs": state["docs"] + state["web"]}
+
+    machine = _fan_out_machine({"sources": operator.add}, join_logic=summarize)
+    final = asyncio.run(machine.arun({"query": "mario", "sources": []})).get_final_state()
+    assert list(final["docs"]) == ["doc", "page"]
+    assert list(final["sources"]) == ["vector", "web"]
+
+
+def test_conflicting_branch_updates_need_a_reducer():
+    machine = _fan_out_machine({})
+    try:
+        machine.run({"query": "mario", "sources": []})
+    except ValueError as e:
+        assert "sources" in str(e)
+    else:
+        raise AssertionError("expected a ValueError")
+
+
+def test_snapshots_share_structure_instead_of_copying():
+    def append(state):
+        return {"trace": state["trace"] + [f"turn {len(state['trace'])}"], "value": state["value"] + 1}
+
+    machine = StateMachine[CounterState](CounterState)
+    entry, termination = EntryPoint[CounterState](), Termination[CounterState]()
+    step = Step[CounterState]("append", append)
+    machine.add_steps([entry, step, termination])
+    machine.connect(entry, step)
+    machine.connect(step, [step, termination], lambda s: step if s["value"] < 50 else termination)
+
+    run = machine.run({"value": 0, "trace": ["start"]})
+    snapshots = run.snapshots[1:]
+    assert len(snapshots) == 50
+    assert run.get_final_state()["trace"] == ["start"] + [f"turn {i}" for i in range(1, 51)]
+    assert [len(s.state_data["trace"]) for s in snapshots] == list(range(2, 52))
+    assert snapshots[0].state_data["trace"][-1] == "turn 1"
+    # Every version of the history is a view over the same buffer
+    assert len({id(s.state_data["trace"]._items) for s in snapshots}) == 1
+    assert set(snapshots[-1].changes) == {"trace", "value"}
+
+
+def test_retention_policies_bound_in_memory_snapshots(tmp_path):
+    import pickle
+
+    def append(state):
+        return {"trace": state["trace"] + [len(state["trace"])], "value": state["value"] + 1}
+
+    machine = StateMachine[CounterState](CounterState)
+    entry, termination = EntryPoint[CounterState](), Termination[CounterState]()
+    step = Step[CounterState]("append", append)
+    machine.add_steps([entry, step, termination])
+    machine.connect(entry, step)
+    machine.connect(step, [step, termination], lambda s: step if s["value"] < 20 else termination)
+
+    final_only = machine.run({"value": 0, "trace": []}, retention=RetentionPolicy.final_only())
+    last_three = machine.run({"value": 0, "trace": []}, retention=RetentionPolicy.keep_last(3))
+    assert len(final_only.snapshots) == 1 and final_only.snapshot_count == 21
+    assert [s.state_data["value"] for s in last_three.snapshots] == [18, 19, 20]
+    assert final_only.get_final_state()["trace"] == list(range(20))
+
+    spilled = machine.run({"value": 0, "trace": []}, retention=RetentionPolicy.spill(str(tmp_path), keep_last=2))
+    assert len(spilled.snapshots) == 2 and spilled.spilled_count == 19
+    history = list(spilled.iter_snapshots())
+    assert [s.state_data["value"] for s in history] == list(range(21))
+    assert [list(s.state_data["trace"]) for s in history] == [list(range(i)) for i in range(21)]
+    assert pickle.loads(pickle.dumps(spilled)).get_final_state()["value"] == 20
+
+
+def test_compile_validates_once_and_is_invalidated_by_changes():
+    machine = _machine()
+    plan = machine.compile()
+    assert plan.entry_id == "__entry__"
+    assert plan.fields == frozenset({"value", "trace"})
+    assert plan.nodes["add_one"].static_targets == ["double"]
+    assert machine.plan is plan
+
+    machine.connect("double", "missing")
+    try:
+        machine.compile()
+    except ValueError as e:
+        assert "missing" in str(e)
+    else:
+        raise AssertionError("expected a ValueError")
+
+
+def test_compile_ignores_unreachable_dead_ends():
+    machine = _machine()
+    machine.add_steps([Step[CounterState]("unused", lambda state: {})])
+    assert machine.run({"value": 1, "trace": []}).get_final_state()["value"] == 4
+
+    machine.connect("add_one", "unused")
+    try:
+        machine.compile()
+    except Exception as e:
+        assert "unused" in str(e)
+    else:
+        raise AssertionError("expected a dead-end error")
+
+
+def test_spill_logs_are_removed_with_their_runs(tmp_path):
+    import gc
+    from lib.memory import ShortTermMemory
+    from lib.session_store import SQLiteSessionStore
+
+    def spilled_run():
+        machine = _machine()
+        return machine.run({"value": 1, "trace": []}, retention=RetentionPolicy.spill(str(tmp_path / "spill")))
+
+    run = spilled_run()
+    path = run.spill_path
+    assert os.path.exists(path)
+    del run
+    gc.collect()
+    assert not os.path.exists(path)
+
+    run = spilled_run()
+    run.close()
+    assert not os.path.exists(run.spill_path)
+    assert [s.step_id for s in run.iter_snapshots()] == ["double"]
+
+    # Evicted or reset runs are closed, including persisted copies
+    for store in (None, SQLiteSessionStore(str(tmp_path / "sessions.sqlite"))):
+        memory = ShortTermMemory(store=store, max_items=1)
+        first, second = spilled_run(), spilled_run()
+        memory.add(first)
+        assert os.path.exists(first.spill_path)
+        memory.add(second)
+        assert not os.path.exists(first.spill_path)
+        memory.reset()
+        assert not os.path.exists(second.spill_path)
@@ -0,0 +1,68 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from lib.llm import LLM
+from lib.messages import AIMessage, SystemMessage, UserMessage
+from lib.tokens import PromptBudgetExceeded, TokenCounter, estimate_cost
+
+
+def test_message_counts_are_memoized_and_include_tool_calls():
+    counter = TokenCounter("gpt-4o-mini")
+    call = {"id": "c1", "type": "function", "function": {"name": "lookup", "arguments": json.dumps({"q": "zelda"})}}
+    messages = [
+        SystemMessage(content="You are helpful."),
+        UserMessage(content="Who made Zelda?"),
+        AIMessage(content=None, tool_calls=[call]),
+    ]
+    total = counter.count_messages(messages)
+    assert total > counter.count_messages(messages[:2]) > counter.count_messages(messages[:1])
+    hits = counter._count.cache_info().hits
+    assert counter.count_messages(messages) == total
+    assert counter._count.cache_info().hits > hits
+
+
+def test_prices_match_dated_snapshots():
+    assert estimate_cost("gpt-4o-mini", 1_000_000, 1_000_000) == pytest.approx(0.75)
+    assert estimate_cost("gpt-4o-2024-08-06", 1_000_000, 0) == pytest.approx(2.50)
+    assert estimate_cost("gpt-4o-mini-2024-07-18", 0, 1_000_000) == pytest.approx(0.60)
+    # A variant is not priced as the model its name starts with
+    assert estimate_cost("o3-mini", 1_000_000, 0) == pytest.approx(1.10)
+    assert estimate_cost("o3-mini-2025-01-31", 1_000_000, 0) == pytest.approx(1.10)
+
+
+def test_llm_rejects_prompts_over_budget_before_calling_the_api():
+    llm = LLM(model="gpt-4o-mini", api_key="test", cache=None, max_prompt_tokens=50)
+    llm.client = None
+    with pytest.raises(PromptBudgetExceeded):
+        llm.invoke("word " * 200)
+    assert llm.count_tokens("hi") < 50
+
+
+def test_run_cost_skips_cached_calls():
+    from types import SimpleNamespace
+    from lib.evaluation import AgentEvaluator
+    from lib.profiling import LLMCallRecord, RunProfile
+
+    profile = RunProfile(llm_calls=[
+        LLMCallRecord("gpt-4o-mini", 10.0, prompt_tokens=1_000_000, completion_tokens=0),
+        LLMCallRecord("gpt-4o-mini", 0.1, prompt_tokens=1_000_000, completion_tokens=0, cached=True),
+    ])
+    assert AgentEvaluator._run_cost(SimpleNamespace(profile=profile)) == pytest.approx(0.15)
+
+
+def test_counter_falls_back_to_the_heuristic_offline(monkeypatch):
+    from types import SimpleNamespace
+    import lib.tokens as tokens
+
+    def unreachable(*args, **kwargs):
+        raise ConnectionError("failed to download the BPE file")
+
+    monkeypatch.setattr(tokens, "tiktoken", SimpleNamespace(encoding_for_model=unreachable, get_encoding=unreachable))
+    counter = TokenCounter("gpt-4o-mini")
+    assert not counter.exact
+    assert counter.text_tokens("abcdefgh") == tokens.heuristic_tokens("abcdefgh")
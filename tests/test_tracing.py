@@ -0,0 +1,62 @@
+import json
+import os
+import sys
+from typing import List, TypedDict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from lib.state_machine import EntryPoint, StateMachine, Step, Termination
+from lib.tooling import tool
+from lib.tracing import (
+    JSONLExporter, RecordingTracer, RingBufferExporter, format_spans, get_tracer, use_tracer,
+)
+
+
+class ChatState(TypedDict):
+    question: str
+    messages: List[str]
+
+
+@tool
+def lookup(query: str) -> str:
+    """Look something up."""
+    return query.upper()
+
+
+def _machine():
+    def answer(state):
+        return {"messages": state["messages"] + [state["question"], lookup(state["question"])]}
+
+    machine = StateMachine[ChatState](ChatState)
+    entry, termination = EntryPoint[ChatState](), Termination[ChatState]()
+    step = Step[ChatState]("answer", answer)
+    machine.add_steps([entry, step, termination])
+    machine.connect(entry, step)
+    machine.connect(step, termination)
+    return machine
+
+
+def test_spans_are_nested_and_exported(tmp_path):
+    buffer = RingBufferExporter(capacity=10)
+    path = tmp_path / "trace.jsonl"
+    with use_tracer(RecordingTracer([buffer, JSONLExporter(str(path))])):
+        run = _machine().run({"question": "mario", "messages": []})
+
+    spans = {span.name: span for span in buffer.spans()}
+    assert set(spans) == {"run", "__entry__", "answer", "lookup"}
+    assert spans["run"].attributes["run_id"] == run.run_id
+    assert spans["answer"].parent_id == spans["run"].span_id
+    assert spans["lookup"].parent_id == spans["answer"].span_id
+    assert spans["lookup"].kind == "tool"
+    assert spans["answer"].attributes["state_size_delta"] == 2
+    assert spans["answer"].duration_ms >= 0
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["name"] for line in lines] == [span.name for span in buffer.spans()]
+    assert "tool:lookup" in format_spans(buffer.spans())
+
+
+def test_tracing_is_off_by_default():
+    assert get_tracer().enabled is False
+    with get_tracer().span("noop") as span:
+        assert span is None
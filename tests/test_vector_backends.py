@@ -0,0 +1,102 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from lib.vector_backends import LocalVectorIndex, matches_where
+
+
+def _data(size=300, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((size, dim)).astype(np.float32)
+    ids = [f"doc-{i}" for i in range(size)]
+    metadatas = [{"platform": ["PC", "Switch", "PS5"][i % 3], "year": 1990 + i % 30} for i in range(size)]
+    return ids, vectors, metadatas
+
+
+def test_matches_where_operators():
+    meta = {"owner": "alice", "namespace": "games", "timestamp": 10}
+    assert matches_where(meta, {"owner": "alice"})
+    assert matches_where(meta, {"$and": [{"namespace": {"$eq": "games"}}, {"timestamp": {"$gt": 5}}]})
+    assert matches_where(meta, {"$or": [{"owner": "bob"}, {"timestamp": {"$lte": 10}}]})
+    assert not matches_where(meta, {"owner": {"$in": ["bob", "carol"]}})
+
+
+def test_exact_query_respects_filters_and_deletes():
+    ids, vectors, metadatas = _data()
+    index = LocalVectorIndex("games")
+    index.add(ids, documents=[f"game {i}" for i in range(len(ids))], metadatas=metadatas, embeddings=vectors)
+
+    result = index.query(query_embeddings=vectors[:1], n_results=3)
+    assert result["ids"][0][0] == "doc-0"
+    assert abs(result["distances"][0][0]) < 1e-5
+
+    result = index.query(query_embeddings=vectors[:1], n_results=5,
+                         where={"$and": [{"platform": "Switch"}, {"year": {"$gte": 2000}}]})
+    assert all(m["platform"] == "Switch" and m["year"] >= 2000 for m in result["metadatas"][0])
+
+    index.delete(ids=["doc-0", "doc-0"])
+    assert index.count() == len(ids) - 1
+    assert "doc-0" not in index.query(query_embeddings=vectors[:1], n_results=3)["ids"][0]
+
+    # Duplicate ids in one write are rejected, as by Chroma
+    with pytest.raises(ValueError):
+        index.upsert(["doc-1", "doc-1"], embeddings=vectors[:2])
+    assert index.count() == len(ids) - 1
+
+
+def test_approximate_index_matches_exact_top_hit():
+    ids, vectors, metadatas = _data(size=2000)
+    index = LocalVectorIndex("games", ann_threshold=500, n_probe=8)
+    index.add(ids, metadatas=metadatas, embeddings=vectors)
+
+    result = index.query(query_embeddings=vectors[:20], n_results=1)
+    assert index._ivf is not None
+    assert [hits[0] for hits in result["ids"]] == ids[:20]
+
+
+def test_persisted_index_is_memory_mapped(tmp_path):
+    ids, vectors, metadatas = _data()
+    index = LocalVectorIndex("games", path=str(tmp_path))
+    index.add(ids, metadatas=metadatas, embeddings=vectors)
+    index.persist()
+
+    reopened = LocalVectorIndex("games", path=str(tmp_path))
+    assert reopened.id == index.id
+    assert isinstance(reopened._vectors, np.memmap)
+    assert reopened.get(ids=["doc-7"])["metadatas"] == [metadatas[7]]
+
+    reopened.upsert(["doc-7"], metadatas=[{"platform": "PC", "year": 2024}], embeddings=vectors[7:8])
+    assert reopened.count() == len(ids)
+    assert reopened.query(query_embeddings=vectors[7:8], n_results=1)["metadatas"][0][0]["year"] == 2024
+
+
+def test_vector_store_search_embeds_all_queries_at_once():
+    from lib.documents import Document
+    from lib.vector_db import VectorStore
+
+    calls = []
+
+    def embed(texts):
+        calls.append(list(texts))
+        return [[float(len(t)), 1.0, float(t.count("a"))] for t in texts]
+
+    store = VectorStore(LocalVectorIndex("games", embedding_function=embed), embedding_function=embed)
+    assert store.distance_metric == "cosine"
+    store.add([Document(id=name, content=name, metadata={"Name": name}) for name in ("a", "aaaa", "bbbbbbbb")])
+    calls.clear()
+
+    results = store.search(["aaaa", "bbbbbbbb"], n_results=1)
+    assert len(calls) == 1
+    assert [r.query for r in results] == ["aaaa", "bbbbbbbb"]
+    assert [r.hits[0].id for r in results] == ["aaaa", "bbbbbbbb"]
+    assert results[0].metadatas == [{"Name": "aaaa"}]
+
+    # A lone string is one query, not one per character
+    calls.clear()
+    result = store.query("aaaa", n_results=1)
+    assert calls == [["aaaa"]]
+    assert result["ids"] == [["aaaa"]]